@@ -0,0 +1,257 @@
+import collections
+import contextlib
+import heapq
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+
+# LLM 호출 입장 제어 (분당 요청 수 / 분당 토큰 수 예산)
+#
+# 부하가 몰리면 모든 워커가 동시에 chat.completions.create 를 보내 429 가 쏟아지고, 모두가 재시도를 함께 기다린다.
+# AIAnalysis 는 요청을 보내기 직전마다 (재시도와 헤징 요청도 각각) admit() 으로 입장권을 받아야 하며,
+# 예산이 모자라면 기다리거나 거절된다.
+#
+# - 예산: 최근 60초 동안 허가된 호출 수(AI_RPM)와 토큰 수(AI_TPM). 0 이면 그 제한은 없다.
+#   여러 gunicorn 워커가 같은 SQLite 파일(AI_BUDGET_PATH)의 허가 기록을 함께 쓰므로 예산은 서버 전체 기준이다.
+# - 토큰 추정: 프롬프트는 메시지 글자 수(UTF-8 바이트 / 3, 실제 사용량과의 비율로 보정),
+#   응답은 호출 종류(single/stream/section/summary/pregenerate)별 최근 실제 응답 토큰 수의 p90.
+#   호출이 끝나면 settle() 로 허가 기록을 실제 사용량(usage)으로 고친다.
+# - 대기열: 프로세스 안에서는 우선순위(PRIORITIES), 같은 우선순위는 마감이 이른 순으로 맨 앞 요청만 예산을 확인한다.
+#   마감(요청의 남은 마감 시간에서 예상 응답 시간 reserve 를 뺀 것과 AI_ADMIT_MAX_WAIT 중 작은 것) 안에 예산이
+#   생기지 않을 것으로 보이면 기다리지 않고 바로 AdmissionRejected 를 올린다. 입장해도 마감 안에 응답을 받을 수
+#   없는 경우(마감이 이미 reserve 보다 가까움)도 예산을 쓰지 않고 바로 거절한다. 호출하는 쪽은 결정적 해석(fallback)을 쓴다.
+# - 관측: 대기 시간은 saju_ai_queue_wait_seconds{priority, outcome}, 결과는 saju_ai_admission_total 로 내보내고
+#   stats() (/api/ai/stats 의 admission) 에서 대기열 길이, 허가/거절 수, 대기 시간 p50/p95, 현재 창 사용량을 본다.
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'ai_budget.sqlite3')
+# 우선순위 (작을수록 먼저): 화면 요청 > 대량 계산(/api/batch) > 오프라인 사전 생성
+PRIORITIES = {'interactive': 0, 'batch': 1, 'background': 2}
+# 응답 토큰 관측값이 없을 때 쓰는 호출 종류별 추정치
+DEFAULT_COMPLETION_TOKENS = {'single': 4000, 'stream': 4000, 'summary': 1200, 'section': 1200, 'pregenerate': 1200}
+BYTES_PER_TOKEN = 3
+TOKENS_PER_MESSAGE = 4
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class Ticket:
+    # 입장권: 허가 id 와 허가할 때 쓴 추정치 (raw_prompt = 보정 전 글자 수 기반 추정)
+    __slots__ = ('id', 'call', 'prompt_tokens', 'completion_tokens', 'raw_prompt')
+
+    def __init__(self, ticket_id, call, prompt_tokens, completion_tokens, raw_prompt):
+        self.id = ticket_id
+        self.call = call
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.raw_prompt = raw_prompt
+
+
+class TokenBudget:
+    # 여러 프로세스가 공유하는 이동 창(window) 예산. 허가 하나가 grants 테이블의 한 행이다.
+    def __init__(self, path=DEFAULT_PATH, rpm=0, tpm=0, window=60.0):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS grants (id INTEGER PRIMARY KEY, at REAL NOT NULL,'
+                         ' tokens INTEGER NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS grants_at ON grants (at)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def try_acquire(self, tokens):
+        # 예산이 있으면 (허가 id, 0), 없으면 (None, 예산이 생길 때까지 남은 초)
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                conn.execute('DELETE FROM grants WHERE at <= ?', (now - self.window,))
+                rows = conn.execute('SELECT at, tokens FROM grants ORDER BY at').fetchall()
+                wait = self._wait(rows, tokens, now)
+                if wait > 0:
+                    conn.execute('COMMIT')
+                    return None, wait
+                grant_id = conn.execute('INSERT INTO grants (at, tokens) VALUES (?, ?)', (now, tokens)).lastrowid
+                conn.execute('COMMIT')
+                return grant_id, 0.0
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _wait(self, rows, tokens, now):
+        # 오래된 허가가 창 밖으로 나가면서 요청 수와 토큰 수가 모두 예산 안에 들어오는 데 걸리는 시간
+        wait = 0.0
+        if self.rpm and len(rows) >= self.rpm:
+            wait = rows[len(rows) - self.rpm][0] + self.window - now
+        used = sum(t for _, t in rows)
+        if self.tpm and rows and used + tokens > self.tpm:
+            # 창이 비어 있으면 한 번에 예산보다 큰 요청도 허가한다 (영원히 못 들어가는 일이 없도록).
+            excess = used + tokens - self.tpm
+            for at, t in rows:
+                excess -= t
+                if excess <= 0:
+                    break
+            wait = max(wait, at + self.window - now)
+        return max(0.0, wait)
+
+    def settle(self, grant_id, tokens):
+        # 추정치로 기록한 허가를 실제 사용 토큰 수로 고친다.
+        with self._connect() as conn:
+            conn.execute('UPDATE grants SET tokens = ? WHERE id = ?', (int(tokens), grant_id))
+
+    def usage(self):
+        with self._connect() as conn:
+            count, tokens = conn.execute('SELECT count(*), coalesce(sum(tokens), 0) FROM grants WHERE at > ?',
+                                         (time.time() - self.window,)).fetchone()
+        return {'requests': count, 'tokens': tokens, 'rpm': self.rpm, 'tpm': self.tpm}
+
+
+class AdmissionScheduler:
+    def __init__(self, budget, max_wait=10.0, window=200):
+        self.budget = budget
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        # 맨 앞 요청이 예산을 받을 것으로 예상되는 시각 (monotonic). 뒤 요청의 즉시 거절 판단에 쓴다.
+        self._free_at = 0.0
+        self._completions = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._prompt_ratio = 1.0
+        self._waits = collections.deque(maxlen=500)
+        self._counts = collections.Counter()
+
+    @classmethod
+    def from_env(cls):
+        # AI_RPM, AI_TPM 이 모두 0(기본)이면 입장 제어를 쓰지 않는다 (None 반환).
+        rpm = int(os.getenv('AI_RPM', 0))
+        tpm = int(os.getenv('AI_TPM', 0))
+        if not rpm and not tpm:
+            return None
+        budget = TokenBudget(os.getenv('AI_BUDGET_PATH', DEFAULT_PATH), rpm=rpm, tpm=tpm)
+        return cls(budget, max_wait=float(os.getenv('AI_ADMIT_MAX_WAIT', 10)))
+
+    def estimate(self, messages, call='single'):
+        # (프롬프트 토큰 추정, 응답 토큰 추정)
+        return self._estimate(messages, call)[1:]
+
+    def _estimate(self, messages, call):
+        # (보정 전 프롬프트 추정, 보정한 프롬프트 추정, 응답 추정)
+        size = sum(len(m.get('content', '').encode('utf-8')) for m in messages)
+        raw = math.ceil(size / BYTES_PER_TOKEN) + TOKENS_PER_MESSAGE * len(messages)
+        with self._cond:
+            prompt = math.ceil(raw * self._prompt_ratio)
+            observed = sorted(self._completions[call])
+        if observed:
+            completion = observed[min(len(observed) - 1, int(len(observed) * 0.9))]
+        else:
+            completion = DEFAULT_COMPLETION_TOKENS.get(call, DEFAULT_COMPLETION_TOKENS['single'])
+        return raw, prompt, completion
+
+    def admit(self, messages, call='single', priority='interactive', deadline=None, reserve=0.0):
+        # 입장권(Ticket)을 돌려준다. 마감 안에 예산을 받을 수 없으면 AdmissionRejected.
+        # deadline: resilience.Deadline (남은 시간까지만 기다린다)
+        # reserve: 입장 후 응답을 받는 데 걸릴 것으로 예상되는 초. 마감에서 빼고 기다린다.
+        raw, prompt, completion = self._estimate(messages, call)
+        limit_seconds = self.max_wait if deadline is None else min(self.max_wait, deadline.remaining() - reserve)
+        started = time.monotonic()
+        if limit_seconds <= 0:
+            # 지금 입장해도 마감 안에 끝나지 않는다. 예산을 쓰지 않고 바로 거절한다.
+            self._record(priority, 0.0, False)
+            raise AdmissionRejected(f"AI 호출 마감 임박 ({priority}, 예상 응답 {reserve:.2f}s)")
+        limit = started + limit_seconds
+        entry = (PRIORITIES[priority], limit, next(self._seq))
+        grant_id = None
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self._cond.notify_all()
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._queue[0] is entry:
+                        grant_id, wait = self.budget.try_acquire(prompt + completion)
+                        if grant_id is not None:
+                            self._free_at = now
+                            break
+                        self._free_at = now + wait
+                        if now + wait > limit:
+                            break
+                        self._cond.wait(min(wait, limit - now))
+                    else:
+                        # 앞 요청이 예산을 받기로 예상된 시각이 이미 마감 뒤면 기다려도 소용없다.
+                        if max(now, self._free_at) >= limit:
+                            break
+                        self._cond.wait(limit - now)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        self._record(priority, waited, grant_id is not None)
+        if grant_id is None:
+            raise AdmissionRejected(f"AI 호출 예산 부족 ({priority}, {waited:.2f}s 대기)")
+        return Ticket(grant_id, call, prompt, completion, raw)
+
+    def settle(self, ticket, prompt_tokens=None, completion_tokens=None):
+        # 호출이 끝난 뒤 실제 사용량(알 수 있으면)으로 허가 기록과 추정치를 고친다.
+        if ticket is None:
+            return
+        with self._cond:
+            if completion_tokens is not None:
+                self._completions[ticket.call].append(int(completion_tokens))
+            if prompt_tokens and ticket.raw_prompt:
+                # 글자 수 기반 추정 대비 실제 프롬프트 토큰 비율 (지수 이동 평균)
+                self._prompt_ratio = 0.8 * self._prompt_ratio + 0.2 * (prompt_tokens / ticket.raw_prompt)
+        actual = (prompt_tokens if prompt_tokens is not None else ticket.prompt_tokens) + \
+            (completion_tokens if completion_tokens is not None else ticket.completion_tokens)
+        if actual != ticket.prompt_tokens + ticket.completion_tokens:
+            self.budget.settle(ticket.id, actual)
+
+    def _record(self, priority, waited, admitted):
+        outcome = 'admitted' if admitted else 'rejected'
+        metrics.observe('saju_ai_queue_wait_seconds', waited, priority=priority, outcome=outcome)
+        metrics.inc('saju_ai_admission_total', priority=priority, outcome=outcome)
+        with self._cond:
+            self._waits.append(waited)
+            self._counts[outcome] += 1
+            self._counts[f'{outcome}_{priority}'] += 1
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            counts = dict(self._counts)
+            queued = len(self._queue)
+            completions = {call: sorted(values)[int(len(values) * 0.9)] if values else None
+                           for call, values in self._completions.items()}
+            prompt_ratio = self._prompt_ratio
+
+        def pick(q):
+            return round(waits[min(len(waits) - 1, int(len(waits) * q))], 4) if waits else None
+
+        return {
+            'queued': queued,
+            'admitted': counts.get('admitted', 0),
+            'rejected': counts.get('rejected', 0),
+            'by_priority': {p: {'admitted': counts.get(f'admitted_{p}', 0), 'rejected': counts.get(f'rejected_{p}', 0)}
+                            for p in PRIORITIES},
+            'wait_seconds': {'p50': pick(0.5), 'p95': pick(0.95), 'max': round(waits[-1], 4) if waits else None},
+            'window': self.budget.usage(),
+            'completion_tokens_p90': completions,
+            'prompt_ratio': round(prompt_ratio, 3),
+            'max_wait': self.max_wait
+        }
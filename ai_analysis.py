@@ -1,83 +1,751 @@
+import asyncio
+import functools
+import hashlib
 import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-load_dotenv()
+from admission import AdmissionRejected, AdmissionScheduler
+from analysis_cache import AnalysisCache, make_cache_key
+from json_stream import IncrementalJSONParser
+from resilience import DeadlineExceeded, LatencyPolicy
+from single_flight import SingleFlight
+import text_store
+import metrics
 
-class AIAnalysis:
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
-        else:
-            self.client = None
 
-    def get_deep_analysis(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context):
-        if not self.client:
-            return None
+def _load_dotenv():
+    # 프로젝트 폴더에 .env 가 있을 때만 python-dotenv 를 가져온다 (배포 환경은 보통 환경 변수만 쓴다).
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+    if os.path.exists(path):
+        from dotenv import load_dotenv
+        load_dotenv(path)
 
-        ohaeng_str = ", ".join([f"{k}({v}%)" for k, v in ohaeng['percentages'].items()])
-        
-        pillars_summary = (
-            f"연:[{pillars['year']['gan']}{pillars['year']['zhi']}] "
-            f"월:[{pillars['month']['gan']}{pillars['month']['zhi']}] "
-            f"일:[{pillars['day']['gan']}{pillars['day']['zhi']}] "
-            f"시:[{pillars['hour']['gan']}{pillars['hour']['zhi']}]"
-        )
-        
-        day_stem = pillars['day']['gan']
-
-        prompt = f"""
-# Role: 2030 맞춤형 라이프 전략가 & 현대 명리학 마스터
-당신은 사용자의 '{birth_context}'라는 생애 주기적 배경을 깊이 고려하여 조언하는 전문 분석가입니다.
 
-# Input Data
-- 이름: {name}, 성별: {gender}, 나이/생년: {birth_context}
-- 본원(일간): {day_stem}
-- 사주 원국: {pillars_summary}
-- 십신 구성: {ten_stars_list}
-- 오행 점수: {ohaeng_str}
-- 현재 대운: {current_daewun}
+_load_dotenv()
 
-# Analysis Roadmap & Output JSON Structure
-모든 답변은 다음 키를 가진 JSON 형식으로 출력하세요. 각 필드는 예시처럼 **최소 8~12문장 이상의 풍부한 장문**으로, 사용자가 읽었을 때 전율이 느껴질 정도의 깊이 있는 서술형으로 작성하세요.
+# openai SDK 는 가져오는 데만 0.6초 넘게 걸리므로 (python -X importtime) 기본으로는 첫 호출 때 가져온다.
+# AI_PRELOAD=1 이면 이 모듈을 읽을 때 가져온다 (gunicorn --preload 로 마스터에서 한 번 가져와 워커가 fork 로 공유).
+# 어느 쪽이든 클라이언트(HTTP 연결 풀)는 프로세스마다 처음 쓸 때 만든다 (fork 전에 만든 연결은 자식에서 쓰지 않는다).
+AI_PRELOAD = os.getenv('AI_PRELOAD', '0') == '1'
+if AI_PRELOAD:
+    import openai  # noqa: F401
+
+# 프롬프트 문구나 출력 구조를 바꾸면 올려서 이전 캐시가 재사용되지 않게 한다.
+# 2: 사용자 데이터를 뺀 정적 접두어(system) + 간결한 JSON 사용자 데이터(user)로 나눔
+PROMPT_VERSION = 2
 
-1. total_summary: [평생사주 총평] 삶의 목적, 전체적인 운의 흐름, 타고난 기질과 미래에 대한 낭만적인 통찰을 에세이처럼 서술하세요.
-2. gmhs: [생애주기 분석] 근묘화실(년/월/일/시) 기반.
+# 호출 방식: 'single' = 9개 섹션을 한 번에 요청, 'fanout' = 섹션 묶음별로 나누어 동시에 요청
+AI_MODE = os.getenv('AI_MODE', 'single')
+# fanout 모드에서 한 분석당 동시에 보내는 요청 수
+AI_FANOUT_CONCURRENCY = int(os.getenv('AI_FANOUT_CONCURRENCY', 6))
+
+# 출력 JSON 섹션별 작성 지시문 (프롬프트의 Analysis Roadmap 항목).
+# {current_daewun} 은 정적 접두어에서는 입력 JSON 의 daewoon 필드를 가리키는 말로, 사전 생성에서는 대운 간지로 채운다.
+SECTION_SPECS = [
+    ('total_summary', "[평생사주 총평] 삶의 목적, 전체적인 운의 흐름, 타고난 기질과 미래에 대한 낭만적인 통찰을 에세이처럼 서술하세요."),
+    ('gmhs', """[생애주기 분석] 근묘화실(년/월/일/시) 기반.
    - year: 초년기(0~19세) - 부모운, 성장 환경, 성격의 뿌리 (최소 5문장)
    - month: 청년기(20~39세) - 사회생활, 직업적 도전, 자아실현 (최소 5문장)
    - day: 중년기(40~59세) - 자산 형성, 인생의 꽃, 가정운 (최소 5문장)
-   - hour: 말년기(60세~) - 결실, 자녀복, 노후의 평온함 (최소 5문장)
-3. daewoon_trend: [대운의 흐름] 현재 대운({current_daewun})을 중심으로 10년 주기의 변화가 사용자 인생에 주는 의미와 다가올 기회에 대한 아주 상세하고 풍부한 서사.
+   - hour: 말년기(60세~) - 결실, 자녀복, 노후의 평온함 (최소 5문장)"""),
+    ('daewoon_trend', """[대운의 흐름] 현재 대운({current_daewun})을 중심으로 10년 주기의 변화가 사용자 인생에 주는 의미와 다가올 기회에 대한 아주 상세하고 풍부한 서사.
    - 대운의 핵심 키워드나 슬로건을 포함할 것.
    - 10년의 흐름을 초반, 중반, 후반으로 나누어 스토리텔링 (최소 15~20문장 이상).
-   - 직업, 재물, 대인관계 측면에서의 구체적이고 현실적인 행동 지침 포함.
-4. health_analysis: [건강 & 체질] 오행 밸런스에 근거한 구체적인 신체적 특징, 취약 부위, 맞춤형 힐링 제안.
-5. social_analysis: [사회운 & 적성] 대인관계 스타일, 조직 적응도, 추천 직업 군 및 성공 전략.
-6. personality_deep: [인성 & 성향] 내면의 인품, 숨겨진 재능, 감정 다스리는 법에 대한 깊은 분석.
-7. love_romance: [애정 & 인연] 연애 패턴, 배우자 복, 행복한 관계를 위한 조언.
-8. wealth_strategy: [재물 운용 전략] 돈을 모으는 법, 투자 성향, 손실 방지 비책.
-9. today_luck: [오늘의 에너지] 오늘 하루를 위한 강렬하고 따뜻한 격언.
+   - 직업, 재물, 대인관계 측면에서의 구체적이고 현실적인 행동 지침 포함."""),
+    ('health_analysis', "[건강 & 체질] 오행 밸런스에 근거한 구체적인 신체적 특징, 취약 부위, 맞춤형 힐링 제안."),
+    ('social_analysis', "[사회운 & 적성] 대인관계 스타일, 조직 적응도, 추천 직업 군 및 성공 전략."),
+    ('personality_deep', "[인성 & 성향] 내면의 인품, 숨겨진 재능, 감정 다스리는 법에 대한 깊은 분석."),
+    ('love_romance', "[애정 & 인연] 연애 패턴, 배우자 복, 행복한 관계를 위한 조언."),
+    ('wealth_strategy', "[재물 운용 전략] 돈을 모으는 법, 투자 성향, 손실 방지 비책."),
+    ('today_luck', "[오늘의 에너지] 오늘 하루를 위한 강렬하고 따뜻한 격언."),
+]
+
+# fanout 모드의 요청 단위. 긴 섹션(총평, 근묘화실, 대운)은 단독으로, 짧은 섹션은 둘씩 묶는다.
+SECTION_GROUPS = [
+    ['total_summary'],
+    ['gmhs'],
+    ['daewoon_trend'],
+    ['health_analysis', 'social_analysis'],
+    ['personality_deep', 'love_romance'],
+    ['wealth_strategy', 'today_luck'],
+]
+
+# 정적 접두어: 역할, 입력 형식, 9개 섹션 지시문, 품질 지시문. 사용자 데이터가 전혀 없어 모든 호출에서 바이트 단위로 같다.
+# OpenAI 는 1024 토큰 이상의 같은 접두어를 자동으로 캐시하므로 (cached_tokens) 두 번째 호출부터 이 부분의
+# 입력 비용과 첫 토큰까지의 시간이 줄어든다. 사용자마다 다른 값은 모두 뒤쪽 user 메시지(JSON)에만 둔다.
+SYSTEM_PROMPT = """당신은 현대적 감각을 가진 사주 분석 전문가입니다. 반드시 JSON 형식으로만 답변하며, 값은 항상 문자열이어야 합니다.
+
+# Role: 2030 맞춤형 라이프 전략가 & 현대 명리학 마스터
+당신은 사용자의 생애 주기적 배경(입력의 birth)을 깊이 고려하여 조언하는 전문 분석가입니다.
+
+# Input Data
+사용자 메시지는 다음 필드를 가진 JSON 입니다.
+- name: 이름, gender: 성별(male/female), birth: 나이/생년
+- day_stem: 본원(일간)
+- pillars: 사주 원국 (연, 월, 일, 시 순서의 간지)
+- ten_gods: 십신 구성 (십신별 개수)
+- ohaeng: 오행 점수 (%)
+- daewoon: 현재 대운
+- keys: 이번에 작성할 출력 키 목록
+
+# Analysis Roadmap & Output JSON Structure
+모든 답변은 입력의 keys 에 있는 키만 가진 JSON 형식으로 출력하세요. 각 필드는 예시처럼 **최소 8~12문장 이상의 풍부한 장문**으로, 사용자가 읽었을 때 전율이 느껴질 정도의 깊이 있는 서술형으로 작성하세요.
+
+{roadmap}
 
 # Instruction for Quality
 1. [Tone]: 전문 용어(십성, 오행 등)를 현대적인 심리학 용어와 비유(예: 단단한 원석, 촉촉한 단비)로 풀어내어 공감을 극대화하세요.
 2. [Volume]: 각 칸을 채우는 텍스트는 단순히 정보를 주는 게 아니라, 한 권의 자기계발서나 위로의 편지처럼 느껴지도록 풍성하게 작성하세요.
-3. [Context]: 사용자의 연령({birth_context})을 고려하여 현재 가장 고민할 법한 지점을 정확히 짚어주세요.
-"""
+3. [Context]: 사용자의 연령(입력의 birth)을 고려하여 현재 가장 고민할 법한 지점을 정확히 짚어주세요.""".format(roadmap="\n".join(
+    f"{i}. {key}: {text.replace('{current_daewun}', '입력의 daewoon')}"
+    for i, (key, text) in enumerate(SECTION_SPECS, 1)
+))
+
+# 접두어 지문. 로그와 /api/ai/stats 에 남겨 배포 간 접두어가 바뀌었는지(캐시가 초기화되는지) 확인한다.
+PROMPT_PREFIX_HASH = hashlib.sha256(SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:12]
+PROMPT_ID = f"v{PROMPT_VERSION}-{PROMPT_PREFIX_HASH}"
+
+class AIAnalysis:
+    def __init__(self):
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        # 동기 클라이언트는 client 속성에서 처음 쓸 때 만든다 (만든 프로세스 id 와 함께 둔다).
+        self._client = None
+        self._client_pid = None
+        self._client_lock = threading.Lock()
+        # ASGI 모드용 비동기 클라이언트. 이벤트 루프(프로세스)당 하나를 만들어 HTTP 연결 풀을 공유한다.
+        self._async_client = None
+        self.cache = AnalysisCache.from_env()
+        # 같은 입력으로 동시에 들어온 요청은 LLM 을 한 번만 호출하고 결과를 나눠 받는다 (None 이면 끔)
+        self.coalescer = SingleFlight.from_env()
+        # 마감 시간, 재시도, 헤징, 서킷 브레이커
+        self.policy = LatencyPolicy.from_env()
+        # 분당 요청/토큰 예산에 따른 입장 제어 (AI_RPM/AI_TPM 이 없으면 None)
+        self.scheduler = AdmissionScheduler.from_env()
+        self.mode = AI_MODE
+        self.fanout_concurrency = AI_FANOUT_CONCURRENCY
+        # 호출 방식별 최근 전체 지연 시간 (single 과 fanout 비교용, summary = 사전 생성 해설 사용 시 총평만 요청)
+        self._timings = {'single': deque(maxlen=500), 'fanout': deque(maxlen=500), 'summary': deque(maxlen=500)}
+        self._timings_lock = threading.Lock()
+        # 호출 종류별 누적 토큰 (calls, prompt, cached, completion)
+        self._tokens = {}
+        self._tokens_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # OpenAI 동기 클라이언트 (API 키가 없으면 None). 처음 쓸 때, 또는 fork 된 자식 프로세스에서 처음 쓸 때 만든다.
+        if not self.api_key:
+            return None
+        pid = os.getpid()
+        if self._client_pid != pid:
+            with self._client_lock:
+                if self._client_pid != pid:
+                    from openai import OpenAI
+                    # 재시도는 LatencyPolicy 가 마감 시간 안에서 직접 하므로 SDK 재시도는 끈다.
+                    self._client = OpenAI(api_key=self.api_key, max_retries=0)
+                    self._client_pid = pid
+        return self._client
+
+    def get_deep_analysis(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                          fallback=None, pregenerated=None, priority='interactive'):
+        # 같은 입력의 이전 결과가 캐시에 있으면 LLM 호출 없이 바로 돌려준다.
+        # 같은 입력의 요청이 이미 진행 중이면 새로 호출하지 않고 그 결과를 기다린다 (single-flight).
+        # fallback: AI 결과 대신 쓸 기본 해석 (deterministic_sections 결과). fanout 모드에서 실패한 섹션,
+        #           모든 시도가 실패했거나 서킷 브레이커가 열려 있을 때 쓴다.
+        # pregenerated: 사전 생성 해설 섹션 (text_store.pregenerated_sections). 있으면 LLM 에는 total_summary 만 요청한다.
+        # priority: 입장 제어 우선순위 (admission.PRIORITIES). 마감 안에 예산을 받지 못하면 fallback 을 쓴다.
+        cache_key = self._cache_key(name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                                    pregenerated)
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if not self.client:
+            return None
+        if self.policy.short_circuit():
+            return _degraded(fallback, pregenerated)
 
+        flight = self._acquire_flight(cache_key)
+        if flight is not None and not flight.leader:
+            return flight.result
+        args = (name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context)
+        result = None
         try:
-            response = self.client.chat.completions.create(
+            if pregenerated:
+                result = _with_pregenerated(self._request_analysis(*args, sections=['total_summary'],
+                                                                   priority=priority), pregenerated)
+                complete = result is not None
+            elif self.mode == 'fanout':
+                complete = False
+                for result, complete in self._fanout_results(args, fallback, priority):
+                    pass
+            else:
+                result = self._request_analysis(*args, priority=priority)
+                complete = result is not None
+            # 일부 섹션이 기본 해석으로 대체된 결과는 캐시하지 않는다.
+            if complete and self.cache:
+                self.cache.put(cache_key, result)
+            if result is None:
+                result = _degraded(fallback, pregenerated)
+        finally:
+            self._release_flight(flight, result)
+        return result
+
+    def stream_deep_analysis(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                             fallback=None, pregenerated=None, priority='interactive'):
+        # get_deep_analysis 의 스트리밍 버전 (제너레이터).
+        # 응답 JSON 을 받는 대로 점진적으로 해석하여 다음 이벤트를 내보낸다.
+        #   {'type': 'delta', 'path': 'total_summary', 'text': '...'}   작성 중인 섹션에 새로 붙은 글
+        #   {'type': 'section', 'path': 'gmhs.year', 'value': '...'}    완성된 섹션
+        #   {'type': 'done', 'result': dict 또는 None}                   마지막 이벤트 (전체 결과)
+        # pregenerated 가 있으면 그 섹션들을 먼저 바로 내보내고 total_summary 만 스트리밍한다.
+        cache_key = self._cache_key(name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                                    pregenerated)
+        cached = self.cache.get(cache_key) if self.cache else None
+        if cached is not None:
+            yield from _replay_sections(cached)
+            return
+
+        if not self.client:
+            yield {'type': 'done', 'result': None}
+            return
+        if self.policy.short_circuit('stream'):
+            yield from _replay_sections(_degraded(fallback, pregenerated))
+            return
+
+        # 같은 입력의 요청이 진행 중이면 그 결과를 기다렸다가 캐시 적중처럼 섹션 단위로 내보낸다.
+        flight = self._acquire_flight(cache_key)
+        if flight is not None and not flight.leader:
+            yield from _replay_sections(flight.result)
+            return
+        result = None
+        args = (name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context)
+        try:
+            if pregenerated:
+                for path, value in _flatten_sections(pregenerated):
+                    yield {'type': 'section', 'path': path, 'value': value}
+                summary = yield from self._stream_single(*args, sections=['total_summary'], priority=priority)
+                result = _with_pregenerated(summary, pregenerated)
+                if result is not None and self.cache:
+                    self.cache.put(cache_key, result)
+            elif self.mode == 'fanout':
+                # 섹션 묶음 요청이 끝나는 순서대로 해당 섹션들을 내보낸다.
+                complete, sent = False, set()
+                for result, complete in self._fanout_results(args, fallback, priority):
+                    for path, value in _flatten_sections(result or {}):
+                        if path not in sent:
+                            sent.add(path)
+                            yield {'type': 'section', 'path': path, 'value': value}
+                if complete and self.cache:
+                    self.cache.put(cache_key, result)
+            else:
+                result = yield from self._stream_single(*args, priority=priority)
+                if result is not None and self.cache:
+                    self.cache.put(cache_key, result)
+            if result is None and fallback:
+                # 실패: 작성 중이던 섹션까지 기본 해석으로 덮어쓴다.
+                result = _degraded(fallback, pregenerated)
+                for path, value in _flatten_sections(result):
+                    yield {'type': 'section', 'path': path, 'value': value}
+        finally:
+            self._release_flight(flight, result)
+        yield {'type': 'done', 'result': result}
+
+    def _stream_single(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                       sections=None, priority='interactive'):
+        # 단일 요청 스트리밍. delta/section 이벤트를 내보내고 전체 결과(실패 시 None)를 반환한다.
+        started = time.perf_counter()
+        messages = self._build_messages(name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                                        sections=sections)
+        parser = IncrementalJSONParser()
+        chunks = []
+        result = None
+        usage = None
+        deadline = self.policy.new_deadline()
+        # 연결 시도별 입장권 (마지막 것이 실제로 글을 받은 시도)
+        tickets = []
+
+        def connect(timeout):
+            tickets.append(self._admit(messages, 'stream', priority, deadline))
+            return self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "당신은 현대적 감각을 가진 사주 분석 전문가입니다. 반드시 JSON 형식으로만 답변하며, 값은 항상 문자열이어야 합니다."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 response_format={ "type": "json_object" },
                 temperature=0.7,
-                timeout=120
+                timeout=min(timeout, deadline.remaining()),
+                stream=True,
+                stream_options={"include_usage": True}
             )
-            return json.loads(response.choices[0].message.content)
+
+        try:
+            # 연결 단계(429/5xx)만 재시도한다. 이미 내보낸 글이 있으면 다시 시작할 수 없다.
+            sent = time.perf_counter()
+            stream = self.policy.call(connect, deadline, name='stream', hedge=False)
+            for chunk in stream:
+                if deadline.remaining() <= 0:
+                    stream.close()
+                    raise DeadlineExceeded("AI 분석 마감 시간 초과")
+                # 사용량(usage)은 마지막 청크(choices 없음)에 온다.
+                usage = getattr(chunk, 'usage', None) or usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if not text:
+                    continue
+                if not chunks:
+                    # 첫 토큰까지 시간 (입장 대기 제외, 접두어 캐시 적중이면 줄어든다)
+                    metrics.observe('saju_llm_ttft_seconds', time.perf_counter() - sent, call='stream')
+                chunks.append(text)
+                for kind, path, value in parser.feed(text):
+                    if kind == 'delta':
+                        yield {'type': 'delta', 'path': path, 'text': value}
+                    else:
+                        yield {'type': 'section', 'path': path, 'value': value}
+            parser.close()
+            result = json.loads(''.join(chunks))
+            self._record_timing('single' if sections is None else 'summary', time.perf_counter() - started)
+            _record_llm('stream', started)
+        except AdmissionRejected as e:
+            print(f"AI 분석 생략: {e}")
+            result = None
+        except Exception as e:
+            print(f"AI 분석 오류: {e}")
+            _record_llm('stream', started, e)
+            if chunks:
+                self.policy.record_failure(e)
+            result = None
+        finally:
+            self._record_usage('stream', usage)
+            # 실패한 연결 시도는 추정치대로 두고, 마지막 시도는 사용량으로 고친다.
+            # 사용량이 오지 않았으면 받은 글 길이로 응답 토큰 수를 어림한다.
+            for ticket in tickets[:-1]:
+                self._settle(ticket, [])
+            if tickets:
+                self._settle(tickets[-1], [usage] if usage else [],
+                             completion_estimate=len(''.join(chunks).encode('utf-8')) // 3 if chunks else None)
+        return result
+
+    def _request_analysis(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                          sections=None, priority='interactive'):
+        if not self.client:
+            return None
+
+        started = time.perf_counter()
+        messages = self._build_messages(name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                                        sections=sections)
+        try:
+            result = self._complete_json(messages, priority=priority)
+            self._record_timing('single' if sections is None else 'summary', time.perf_counter() - started)
+            return result
         except Exception as e:
             print(f"AI 분석 오류: {e}")
             return None
+
+    def _complete_json(self, messages, call='single', deadline=None, priority='interactive'):
+        # LatencyPolicy(마감 시간/재시도/헤징/브레이커)에 따라 호출한다. 시도 하나가 attempt(timeout) 이다.
+        # 입장 제어가 켜져 있으면 시도마다 (재시도, 헤징 요청 포함) 보내기 직전에 같은 마감 시간 안에서 입장권을
+        # 받는다. 브레이커가 막은 시도는 입장권을 받지 않으며, 못 받으면 AdmissionRejected (재시도하지 않음).
+        deadline = deadline or self.policy.new_deadline()
+
+        def attempt(timeout):
+            ticket = self._admit(messages, call, priority, deadline)
+            started = time.perf_counter()
+            usage = None
+            try:
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    response_format={ "type": "json_object" },
+                    temperature=0.7,
+                    timeout=min(timeout, deadline.remaining())
+                )
+                usage = response.usage
+                self._record_usage(call, usage)
+                with metrics.stage('llm_decode'):
+                    result = json.loads(response.choices[0].message.content)
+            except Exception as e:
+                _record_llm(call, started, e)
+                raise
+            finally:
+                self._settle(ticket, [usage])
+            _record_llm(call, started)
+            return result
+
+        with metrics.stage('llm'):
+            return self.policy.call(attempt, deadline, name=call)
+
+    def _admit(self, messages, call, priority, deadline):
+        # 시도 하나의 입장권 (입장 제어가 꺼져 있으면 None). 최근 응답 시간 p95 를 마감에서 떼어 두어
+        # 입장해도 마감 안에 끝나지 않을 시도는 예산을 쓰지 않고 바로 거절된다.
+        if self.scheduler is None:
+            return None
+        with metrics.stage('llm_admit'):
+            return self.scheduler.admit(messages, call, priority, deadline,
+                                        reserve=self.policy.expected_seconds(call))
+
+    def _settle(self, ticket, usages, completion_estimate=None):
+        # 허가 기록을 실제 사용량으로 고친다. usages: 그 시도의 response.usage (실패해 없으면 None)
+        if ticket is None:
+            return
+        usages = [u for u in usages if u is not None]
+        if usages:
+            self.scheduler.settle(ticket, sum(u.prompt_tokens for u in usages),
+                                  sum(u.completion_tokens for u in usages))
+        else:
+            self.scheduler.settle(ticket, completion_tokens=completion_estimate)
+
+    def _record_usage(self, call, usage):
+        # 응답 usage 한 건을 로그, /metrics, token_stats() 에 남긴다. cached: 프롬프트 중 접두어 캐시에서 읽은 토큰
+        if usage is None:
+            return
+        prompt = usage.prompt_tokens or 0
+        completion = usage.completion_tokens or 0
+        cached = getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', None) or 0
+        for kind, count in (('prompt', prompt), ('cached', cached), ('completion', completion)):
+            metrics.inc('saju_llm_tokens_total', count, call=call, kind=kind)
+        with self._tokens_lock:
+            self._tokens.setdefault(call, Counter()).update(calls=1, prompt=prompt, cached=cached,
+                                                             completion=completion)
+        print(f"AI 토큰 [{call}] prompt={prompt} cached={cached} completion={completion} ({PROMPT_ID})")
+
+    def token_stats(self):
+        # 호출 종류별 누적 토큰과 접두어 캐시 적중 비율 (cached / prompt)
+        with self._tokens_lock:
+            calls = {call: dict(counts) for call, counts in self._tokens.items()}
+        for counts in calls.values():
+            counts['cached_ratio'] = round(counts['cached'] / counts['prompt'], 3) if counts['prompt'] else 0.0
+        return {'prompt': PROMPT_ID, 'prefix_chars': len(SYSTEM_PROMPT), 'calls': calls}
+
+    def _fanout_results(self, args, fallback, priority='interactive'):
+        # 섹션 묶음(SECTION_GROUPS)마다 작은 요청을 만들어 동시에 보낸다 (제너레이터).
+        # 묶음 하나가 끝날 때마다 (지금까지 합친 결과, 모든 섹션 성공 여부) 를 내보낸다.
+        # 실패한 묶음의 섹션은 fallback(기본 해석)으로 채우고, 모든 묶음이 실패하면 결과는 None 이다.
+        if not self.client:
+            yield None, False
+            return
+        fallback = fallback or {}
+        started = time.perf_counter()
+        # 모든 묶음이 같은 마감 시간을 나눠 쓴다.
+        deadline = self.policy.new_deadline()
+        merged = {}
+        failed_groups = []
+        # 응답은 왔지만 요청한 섹션 일부가 빠진 묶음 (빠진 섹션은 기본 해석이므로 결과를 캐시하지 않는다)
+        partial_groups = []
+        group_timings = {}
+
+        def run(keys):
+            t0 = time.perf_counter()
+            data = self._complete_json(self._build_messages(*args, sections=keys), call='section',
+                                       deadline=deadline, priority=priority)
+            return data, time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=max(1, self.fanout_concurrency)) as executor:
+            futures = {executor.submit(run, keys): keys for keys in SECTION_GROUPS}
+            for future in as_completed(futures):
+                keys = futures[future]
+                try:
+                    data, elapsed = future.result()
+                    group_timings['+'.join(keys)] = round(elapsed, 2)
+                except Exception as e:
+                    print(f"AI 분석 오류 ({', '.join(keys)}): {e}")
+                    data = None
+                    failed_groups.append(keys)
+                if _merge_group(merged, keys, data, fallback) and data is not None:
+                    print(f"AI 분석 섹션 누락 ({', '.join(keys)}): 기본 해석으로 채움")
+                    partial_groups.append(keys)
+                if len(failed_groups) == len(SECTION_GROUPS):
+                    yield None, False
+                else:
+                    yield merged, (not failed_groups and not partial_groups
+                                   and len(group_timings) == len(SECTION_GROUPS))
+
+        total = time.perf_counter() - started
+        if len(failed_groups) < len(SECTION_GROUPS):
+            self._record_timing('fanout', total)
+        print(f"AI fan-out 분석: 전체 {total:.2f}s, 묶음별 {group_timings}, 실패 {len(failed_groups)}개, "
+              f"섹션 누락 {len(partial_groups)}개")
+
+    async def get_deep_analysis_async(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun,
+                                      birth_context, fallback=None, pregenerated=None, priority='interactive'):
+        # get_deep_analysis 의 asyncio 버전 (asgi.py). 대기 중인 LLM 호출이 스레드를 점유하지 않는다.
+        # SQLite 캐시 조회/저장은 블로킹이므로 스레드에서 실행한다.
+        cache_key = self._cache_key(name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                                    pregenerated)
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+        if not self.client:
+            return None
+        if self.policy.short_circuit():
+            return _degraded(fallback, pregenerated)
+
+        flight = None
+        if self.coalescer is not None:
+            recheck = functools.partial(self.cache.get, cache_key) if self.cache else None
+            flight = await self.coalescer.acquire_async(cache_key, recheck)
+        if flight is not None and not flight.leader:
+            return flight.result
+        args = (name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context)
+        result = None
+        try:
+            if self.mode == 'fanout' and not pregenerated:
+                result, complete = await self._fanout_async(args, fallback, priority)
+            else:
+                sections = ['total_summary'] if pregenerated else None
+                started = time.perf_counter()
+                try:
+                    result = await self._complete_json_async(self._build_messages(*args, sections=sections),
+                                                             priority=priority)
+                    self._record_timing('single' if sections is None else 'summary', time.perf_counter() - started)
+                except Exception as e:
+                    print(f"AI 분석 오류: {e}")
+                    result = None
+                result = _with_pregenerated(result, pregenerated)
+                complete = result is not None
+            if complete and self.cache:
+                await asyncio.to_thread(self.cache.put, cache_key, result)
+            if result is None:
+                result = _degraded(fallback, pregenerated)
+        finally:
+            self._release_flight(flight, result)
+        return result
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._async_client
+
+    async def _complete_json_async(self, messages, call='single', deadline=None, priority='interactive'):
+        # 입장권 대기는 블로킹(조건 변수, SQLite)이므로 스레드에서 기다린다. 시도마다 입장권을 받는 것은 동기 버전과 같다.
+        deadline = deadline or self.policy.new_deadline()
+
+        async def attempt(timeout):
+            ticket = None
+            if self.scheduler is not None:
+                ticket = await asyncio.to_thread(self._admit, messages, call, priority, deadline)
+            started = time.perf_counter()
+            usage = None
+            try:
+                response = await self._get_async_client().chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    response_format={ "type": "json_object" },
+                    temperature=0.7,
+                    timeout=min(timeout, deadline.remaining())
+                )
+                usage = response.usage
+                self._record_usage(call, usage)
+                result = json.loads(response.choices[0].message.content)
+            except Exception as e:
+                _record_llm(call, started, e)
+                raise
+            finally:
+                if ticket is not None:
+                    await asyncio.to_thread(self._settle, ticket, [usage])
+            _record_llm(call, started)
+            return result
+
+        return await self.policy.call_async(attempt, deadline, name=call)
+
+    async def _fanout_async(self, args, fallback, priority='interactive'):
+        # _fanout_results 의 asyncio 버전. 반환값: (합친 결과 또는 None, 모든 섹션 성공 여부)
+        fallback = fallback or {}
+        started = time.perf_counter()
+        deadline = self.policy.new_deadline()
+        semaphore = asyncio.Semaphore(max(1, self.fanout_concurrency))
+
+        async def run(keys):
+            async with semaphore:
+                return await self._complete_json_async(self._build_messages(*args, sections=keys), call='section',
+                                                       deadline=deadline, priority=priority)
+
+        results = await asyncio.gather(*(run(keys) for keys in SECTION_GROUPS), return_exceptions=True)
+        merged = {}
+        failed = 0
+        partial = 0
+        for keys, data in zip(SECTION_GROUPS, results):
+            if isinstance(data, Exception):
+                print(f"AI 분석 오류 ({', '.join(keys)}): {data}")
+                data = None
+                failed += 1
+            if _merge_group(merged, keys, data, fallback) and data is not None:
+                print(f"AI 분석 섹션 누락 ({', '.join(keys)}): 기본 해석으로 채움")
+                partial += 1
+
+        total = time.perf_counter() - started
+        if failed == len(SECTION_GROUPS):
+            return None, False
+        self._record_timing('fanout', total)
+        print(f"AI fan-out 분석: 전체 {total:.2f}s, 실패 {failed}개, 섹션 누락 {partial}개")
+        return merged, failed == 0 and partial == 0
+
+    def _cache_key(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                   pregenerated):
+        # 프롬프트 판과 접두어 지문(PROMPT_ID)이 키에 들어가므로 지시문을 고치면 이전 캐시는 쓰이지 않는다.
+        # 사전 생성 해설을 섞은 결과는 해설 판(TEXTS_VERSION)이 바뀌면 다시 만들어지도록 키를 나눈다.
+        version = PROMPT_ID if not pregenerated else f"{PROMPT_ID}+texts{text_store.TEXTS_VERSION}"
+        return make_cache_key(version, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context)
+
+    def _acquire_flight(self, cache_key):
+        # single-flight 참여. 다른 워커가 먼저 처리했으면 공유 캐시에서 결과를 다시 확인한다.
+        if self.coalescer is None:
+            return None
+        recheck = functools.partial(self.cache.get, cache_key) if self.cache else None
+        return self.coalescer.acquire(cache_key, recheck)
+
+    def _release_flight(self, flight, result):
+        # leader 는 캐시 저장 후 호출하여, 기다리던 요청에 결과를 넘기고 잠금을 푼다.
+        if flight is not None:
+            self.coalescer.release(flight, result)
+
+    def coalescing_stats(self):
+        if self.coalescer is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.coalescer.stats()}
+
+    def _record_timing(self, mode, seconds):
+        with self._timings_lock:
+            self._timings[mode].append(seconds)
+
+    def timing_stats(self):
+        # 호출 방식별 전체 지연 시간 요약. 두 방식을 모두 써 본 경우 중앙값 비율도 함께 보여준다.
+        with self._timings_lock:
+            samples = {mode: sorted(values) for mode, values in self._timings.items()}
+        stats = {}
+        for mode, values in samples.items():
+            if not values:
+                stats[mode] = {'count': 0}
+                continue
+            stats[mode] = {
+                'count': len(values),
+                'p50': round(values[len(values) // 2], 3),
+                'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+                'max': round(values[-1], 3)
+            }
+        if stats['single'].get('count') and stats['fanout'].get('count'):
+            stats['fanout_vs_single_p50'] = round(stats['fanout']['p50'] / stats['single']['p50'], 3)
+        return stats
+
+    def _build_messages(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                        sections=None):
+        # 정적 접두어(system) + 사용자 데이터(user, 공백 없는 JSON). sections: 요청할 출력 키 목록 (None 이면 9개 전체)
+        # 섹션 묶음(fan-out)이나 총평만 요청할 때도 접두어는 같고 keys 만 달라진다.
+        data = {
+            'name': name,
+            'gender': gender,
+            'birth': birth_context,
+            'day_stem': pillars['day']['gan'],
+            'pillars': [pillars[p]['gan'] + pillars[p]['zhi'] for p in ('year', 'month', 'day', 'hour')],
+            'ten_gods': ten_stars_list,
+            'ohaeng': ohaeng['percentages'],
+            'daewoon': current_daewun,
+            'keys': [key for key, _ in SECTION_SPECS if sections is None or key in sections]
+        }
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(data, ensure_ascii=False, separators=(',', ':'))}
+        ]
+
+
+def _merge_group(merged, keys, data, fallback):
+    # fan-out 묶음 하나의 응답을 합친다. 응답이 없거나 빠진 섹션은 fallback 으로 채운다.
+    # 반환값: 응답에서 빠져 fallback 으로 채운 섹션 목록 (응답이 없으면 keys 전체)
+    missing = []
+    for key in keys:
+        if data is not None and key in data:
+            merged[key] = data[key]
+            continue
+        missing.append(key)
+        if key in fallback:
+            merged[key] = fallback[key]
+    return missing
+
+
+def _with_pregenerated(data, pregenerated):
+    # total_summary 만 요청한 응답에 사전 생성 섹션을 합친다. 응답이 없으면 None.
+    if data is None or not pregenerated:
+        return data
+    return {**pregenerated, 'total_summary': data.get('total_summary', '')}
+
+
+def _degraded(fallback, pregenerated):
+    # LLM 결과가 없을 때 쓸 결과: 기본 해석 위에 사전 생성 해설을 덮는다 (total_summary 는 기본 해석).
+    if not pregenerated:
+        return fallback
+    return {**(fallback or {}), **pregenerated}
+
+
+def _record_llm(call, started, error=None):
+    # OpenAI 호출 시간과 실패(시간 초과 / 기타) 수를 /metrics 에 누적한다.
+    metrics.observe('saju_llm_seconds', time.perf_counter() - started, call=call,
+                    outcome='ok' if error is None else 'error')
+    if error is not None:
+        metrics.inc('saju_llm_errors_total', call=call,
+                    kind='timeout' if _is_timeout(error) else 'error')
+
+
+def _is_timeout(error):
+    # openai 를 아직 가져오지 않았다면 SDK 예외일 수 없다 (분류하려고 SDK 를 가져오지 않는다).
+    openai = sys.modules.get('openai')
+    return openai is not None and isinstance(error, openai.APITimeoutError)
+
+
+def build_ai_args(name, gender, birth_year, pillars, interpretations, now=None):
+    # 결정적 계산 결과로 get_deep_analysis / stream_deep_analysis 인자 튜플을 만든다.
+    # 사전 생성 해설 저장소(data/texts.bin)가 있으면 해당 섹션도 함께 넘겨 LLM 은 total_summary 만 쓰게 한다.
+    now = now or datetime.now()
+    birth_context = f"{birth_year}년생 ({now.year - birth_year + 1}세)"
+
+    ten_gods_all = []
+    for p_key in interpretations['ten_gods']:
+        ten_gods_all.append(interpretations['ten_gods'][p_key]['gan'])
+        ten_gods_all.append(interpretations['ten_gods'][p_key]['zhi'])
+    counts = Counter(ten_gods_all)
+    ten_stars_list = ", ".join([f"{k} {v}" for k, v in counts.items()])
+
+    first = interpretations['daewoon'][0]
+    current_daewun = f"{first['age']}세 대운 ({first['gan']}{first['zhi']})"
+
+    return (name, gender, pillars, interpretations['ohaeng_analysis'],
+            ten_stars_list, current_daewun, birth_context,
+            deterministic_sections(interpretations),
+            text_store.pregenerated_sections(pillars, interpretations, gender))
+
+
+def deterministic_sections(interpretations):
+    # SajuLogic.interpret() 결과를 AI 출력과 같은 섹션 구조로 옮긴다 (AI 섹션 실패 시 대체용).
+    return {
+        'total_summary': interpretations['core'],
+        'gmhs': {period: interpretations['gmhs'][period]['desc'] for period in ['year', 'month', 'day', 'hour']},
+        'daewoon_trend': "\n".join(f"{dw['age']}세~ {dw['gan']}{dw['zhi']} {dw['text']}" for dw in interpretations['daewoon']),
+        'health_analysis': interpretations['advice'],
+        'social_analysis': interpretations['career'],
+        'personality_deep': interpretations['core'],
+        'love_romance': interpretations['love'],
+        'wealth_strategy': interpretations['wealth'],
+        'today_luck': interpretations['today_luck']['desc']
+    }
+
+
+def _replay_sections(result):
+    # 이미 완성된 결과(캐시 적중, 합쳐진 요청)를 스트리밍 이벤트로 내보낸다.
+    for path, value in _flatten_sections(result or {}):
+        yield {'type': 'section', 'path': path, 'value': value}
+    yield {'type': 'done', 'result': result}
+
+
+def _flatten_sections(data, prefix=''):
+    # {'gmhs': {'year': ...}} → ('gmhs.year', ...) 처럼 섹션 경로와 값으로 펼친다.
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flatten_sections(value, path)
+        else:
+            yield path, value
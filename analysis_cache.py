@@ -0,0 +1,150 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# AI 심층 분석 결과 영구 캐시 (SQLite)
+#
+# 같은 입력(이름, 원국, 성별, 나이 정보, 십성 구성, 현재 대운, 프롬프트 버전)으로
+# 다시 요청하면 LLM 호출 없이 저장된 결과를 돌려준다.
+# - TTL: 만료된 항목은 조회 시 무시되고 정리 시 삭제된다.
+# - 용량 제한: 항목 수가 max_entries 를 넘으면 가장 오래 조회되지 않은 것부터 지운다 (LRU).
+# - 여러 gunicorn 워커가 같은 파일을 공유하므로 WAL 모드로 열고 호출마다 연결을 새로 만든다.
+
+# 날짜에 따라 달라지는 섹션. 키에 날짜가 없으므로 저장하지 않고, 이전에 저장된 값도 돌려주지 않는다.
+# (캐시 적중 시 오늘의 운세는 결정적 계산 결과가 그대로 쓰인다)
+DATED_KEYS = ('today_luck',)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'ai_analysis.sqlite3')
+
+
+def make_cache_key(prompt_version, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context):
+    # 프롬프트에 들어가는 값만 모아 정규화한 뒤 해시한다.
+    # 원국은 표시용 문자열 대신 천간/지지 인덱스만 사용한다.
+    payload = {
+        'v': prompt_version,
+        'name': name,
+        'gender': gender,
+        'pillars': [[pillars[k]['gan_idx'], pillars[k]['zhi_idx']] for k in ['year', 'month', 'day', 'hour']],
+        'ohaeng': sorted((ohaeng.get('percentages') or {}).items()),
+        'ten_stars': ten_stars_list,
+        'daewun': current_daewun,
+        'birth_context': birth_context
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path=DEFAULT_PATH, ttl_seconds=7 * 24 * 3600, max_entries=10000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis ('
+                ' key TEXT PRIMARY KEY,'
+                ' value TEXT NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS analysis_accessed ON analysis (accessed_at)')
+
+    @classmethod
+    def from_env(cls):
+        # 환경 변수로 설정. AI_CACHE_ENABLED=0 이면 캐시를 쓰지 않는다 (None 반환).
+        if os.getenv('AI_CACHE_ENABLED', '1') == '0':
+            return None
+        return cls(
+            path=os.getenv('AI_CACHE_PATH', DEFAULT_PATH),
+            ttl_seconds=float(os.getenv('AI_CACHE_TTL', 7 * 24 * 3600)),
+            max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', 10000))
+        )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT value FROM analysis WHERE key = ? AND created_at > ?',
+                    (key, now - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE analysis SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            print(f"AI 캐시 조회 오류: {e}")
+            row = None
+        self._count(row is not None)
+        return _without_dated(json.loads(row[0])) if row is not None else None
+
+    def put(self, key, value):
+        now = time.time()
+        raw = json.dumps(_without_dated(value), ensure_ascii=False)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO analysis (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, raw, now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"AI 캐시 저장 오류: {e}")
+
+    def _evict(self, conn, now):
+        # 만료 항목 삭제 후, 용량을 넘는 만큼 가장 오래 조회되지 않은 항목부터 삭제
+        conn.execute('DELETE FROM analysis WHERE created_at <= ?', (now - self.ttl_seconds,))
+        excess = conn.execute('SELECT COUNT(*) FROM analysis').fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM analysis WHERE key IN '
+                '(SELECT key FROM analysis ORDER BY accessed_at ASC LIMIT ?)',
+                (excess,)
+            )
+
+    def stats(self):
+        try:
+            with self._connect() as conn:
+                entries = conn.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+
+def _without_dated(value):
+    if not isinstance(value, dict):
+        return value
+    return {k: v for k, v in value.items() if k not in DATED_KEYS}
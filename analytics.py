@@ -0,0 +1,396 @@
+import argparse
+import collections
+import datetime
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import jeolgi
+from batch import FORMATS, parse_records, text_lines
+from gunghap import GENDER_CODES
+from saju_logic import OHAENG_KEYS, TEN_GOD_ORDER, SajuLogic
+
+# 대량 원국 통계 (map-reduce)
+#
+# 수억 건의 출생 정보를 한 건씩 get_gan_zhi / get_ohaeng_distribution / _get_all_sip_seong 으로 돌리지 않고,
+# 열(column) 단위 이진 파일을 mmap 으로 열어 CHUNK_ROWS 행씩 잘라 프로세스 풀에 나눠 준다.
+# 작업자는 자기 구간만 읽어 배치 함수(get_gan_zhi_batch, get_ohaeng_distribution_batch, get_ten_gods_batch)로
+# 원국을 계산하고 np.bincount 로 부분 집계를 만든다. 부분 집계는 작은 정수 배열이라 합치기만 하면 된다.
+#
+#   ohaeng_by_cohort        출생 연도 묶음(--cohort-years)별 오행 개수 분포 (오행마다 0~8개인 원국 수)
+#   ten_gods_by_day_master  일간별 십성 빈도 (일간을 뺀 7글자)
+#   daewoon_by_gender       성별 대운 진행 방향 (순행/역행, _daewoon_start 와 같은 규칙)
+#
+#   python analytics.py convert users.csv -o births.bin        (CSV/NDJSON: birth_date, birth_time, gender)
+#   python analytics.py run births.bin -o stats.json --workers 8
+#
+# 파일 구조 (births.bin): 16바이트 헤더 + int32[count] + int8[count]
+#   헤더 = magic(b'BRTH'), version(u16), reserved(u16), count(u64)
+#   birth  : 1900-01-01 00:00 한국 표준시 기준 분 (음수면 1900년 이전). int32 라 약 -2180~5983년까지 담는다
+#            (convert 는 범위 밖의 줄을 건너뛴 수로 센다)
+#   gender : 0 남, 1 여 (gunghap.GENDER_CODES), -1 모름 (대운 방향 집계에서만 빠진다)
+#
+# 부모 프로세스는 구간 번호만 넘기고 부분 집계만 받으며, 동시에 풀에 올리는 구간 수를 제한하고
+# 작업자는 다 읽은 구간의 mmap 페이지를 내려놓으므로 메모리 사용량은 입력 크기와 무관하다
+# (작업자당 구간 하나 분량의 임시 배열).
+
+MAGIC = b'BRTH'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQ')
+# 작업 단위 (행). 작업자 하나가 동시에 쥐는 임시 배열은 행당 100바이트 남짓이다.
+CHUNK_ROWS = 1 << 19
+UNKNOWN_GENDER = -1
+# birth 열이 담을 수 있는 값 (분)
+BIRTH_MIN, BIRTH_MAX = int(np.iinfo(np.int32).min), int(np.iinfo(np.int32).max)
+
+# 프로세스마다 하나씩 (_init_worker)
+_saju = None
+_files = {}
+
+
+def _init_worker():
+    global _saju
+    _saju = SajuLogic(interpret_cache_size=0)
+
+
+def to_birth_minutes(year, month, day, hour, minute):
+    # 한국 표준시 → birth 열 값
+    return (datetime.date(year, month, day).toordinal() - jeolgi.EPOCH_ORDINAL) * 1440 + hour * 60 + minute
+
+
+def civil_from_minutes(minutes):
+    # birth 열 배열 → (년, 월, 일, 시, 분) 배열. 그레고리력 일수 → 날짜 공식 (get_gan_zhi_batch 일수 계산의 역)
+    minutes = np.asarray(minutes, dtype=np.int64)
+    days = minutes // 1440
+    minute_of_day = minutes - days * 1440
+    z = days - 25567 + 719468  # 1900-01-01 → 1970-01-01 → 0000-03-01
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    hour = minute_of_day // 60
+    return year, month, day, hour, minute_of_day - hour * 60
+
+
+class BirthsWriter:
+    # births.bin 을 순서대로 쓴다. 열 단위 파일이라 gender 열은 임시 파일에 모았다가 close() 때 뒤에 붙인다.
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._out = open(path, 'wb')
+        self._out.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        self._genders = open(f'{path}.gender.tmp', 'w+b')
+
+    def write(self, births, genders):
+        # 범위를 먼저 확인하므로 ValueError 가 나도 파일에는 그 전까지 쓴 행만 남는다 (헤더 건수와 일치).
+        births = np.asarray(births, dtype=np.int64)
+        genders = np.asarray(genders, dtype=np.int8)
+        if births.shape != genders.shape:
+            raise ValueError("births and genders must have the same length")
+        if len(births) and (births.min() < BIRTH_MIN or births.max() > BIRTH_MAX):
+            raise ValueError("birth minutes out of int32 range")
+        births.astype('<i4').tofile(self._out)
+        genders.tofile(self._genders)
+        self.count += len(births)
+
+    def close(self):
+        self._genders.seek(0)
+        while True:
+            block = self._genders.read(1 << 20)
+            if not block:
+                break
+            self._out.write(block)
+        self._out.seek(0)
+        self._out.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, self.count))
+        self._out.close()
+        self._genders.close()
+        os.remove(self._genders.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_births(path, births, genders):
+    # 배열 두 개로 births.bin 을 한 번에 쓴다 (벤치마크, 시험용 데이터).
+    with BirthsWriter(path) as writer:
+        writer.write(births, genders)
+
+
+def open_births(path):
+    # births.bin 을 mmap 으로 열어 {'count', 'births', 'genders'} numpy 뷰를 돌려준다 (복사 없음).
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _, count = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version != FORMAT_VERSION or len(mm) != HEADER.size + 5 * count:
+        raise ValueError(f"births file format mismatch: {path}")
+    return {
+        'mmap': mm,
+        'count': count,
+        'births': np.frombuffer(mm, dtype='<i4', count=count, offset=HEADER.size),
+        'genders': np.frombuffer(mm, dtype=np.int8, count=count, offset=HEADER.size + 4 * count)
+    }
+
+
+def _columns(path):
+    # 작업자 프로세스마다 파일을 한 번만 연다.
+    columns = _files.get(path)
+    if columns is None:
+        columns = _files[path] = open_births(path)
+    return columns
+
+
+def _release(columns, start, stop):
+    # 다 읽은 구간의 mmap 페이지를 프로세스 RSS 에서 내린다 (파일 페이지 캐시에는 남는다).
+    # 이렇게 하지 않으면 읽은 만큼 RSS 가 늘어 입력이 커질수록 작업자 메모리가 커진다.
+    if not hasattr(mmap, 'MADV_DONTNEED'):
+        return
+    mm = columns['mmap']
+    for offset, itemsize in ((HEADER.size, 4), (HEADER.size + 4 * columns['count'], 1)):
+        lo = (offset + start * itemsize) // mmap.PAGESIZE * mmap.PAGESIZE
+        hi = offset + stop * itemsize
+        mm.madvise(mmap.MADV_DONTNEED, lo, hi - lo)
+
+
+class Aggregates:
+    # 부분/전체 집계. merge() 로 합치며 모든 값이 개수라 합치는 순서와 무관하다.
+    def __init__(self, cohort_years=10):
+        self.cohort_years = cohort_years
+        self.records = 0
+        self.skipped = 0
+        self.unknown_gender = 0
+        # ohaeng[묶음 - cohort_first, 오행, 개수 0~8] = 원국 수
+        self.cohort_first = 0
+        self.ohaeng = np.zeros((0, 5, 9), dtype=np.int64)
+        # ten_gods[일간, 십성 번호] = 글자 수, day_masters[일간] = 원국 수
+        self.ten_gods = np.zeros((10, 10), dtype=np.int64)
+        self.day_masters = np.zeros(10, dtype=np.int64)
+        # daewoon[성별, 0 순행 / 1 역행] = 원국 수
+        self.daewoon = np.zeros((2, 2), dtype=np.int64)
+
+    def merge(self, other):
+        self.records += other.records
+        self.skipped += other.skipped
+        self.unknown_gender += other.unknown_gender
+        if len(other.ohaeng):
+            if not len(self.ohaeng):
+                self.cohort_first, self.ohaeng = other.cohort_first, other.ohaeng.copy()
+            else:
+                first = min(self.cohort_first, other.cohort_first)
+                last = max(self.cohort_first + len(self.ohaeng), other.cohort_first + len(other.ohaeng))
+                merged = np.zeros((last - first, 5, 9), dtype=np.int64)
+                for part in (self, other):
+                    merged[part.cohort_first - first:part.cohort_first - first + len(part.ohaeng)] += part.ohaeng
+                self.cohort_first, self.ohaeng = first, merged
+        self.ten_gods += other.ten_gods
+        self.day_masters += other.day_masters
+        self.daewoon += other.daewoon
+        return self
+
+    def to_dict(self):
+        width = self.cohort_years
+        cohorts = []
+        for i, hist in enumerate(self.ohaeng):
+            charts = int(hist[0].sum())
+            if not charts:
+                continue
+            start = (self.cohort_first + i) * width
+            mean = hist @ np.arange(9) / charts
+            cohorts.append({
+                'cohort': f'{start}-{start + width - 1}' if width > 1 else str(start),
+                'charts': charts,
+                'mean': {key: round(float(mean[e]), 4) for e, key in enumerate(OHAENG_KEYS)},
+                'histogram': {key: hist[e].tolist() for e, key in enumerate(OHAENG_KEYS)}
+            })
+        ten_gods = {}
+        for stem, counts in enumerate(self.ten_gods):
+            if self.day_masters[stem]:
+                ten_gods[SajuLogic.CHEONGAN[stem]] = {
+                    'charts': int(self.day_masters[stem]),
+                    'counts': {name: int(n) for name, n in zip(TEN_GOD_ORDER, counts)}
+                }
+        daewoon = {}
+        for gender, code in GENDER_CODES.items():
+            forward, backward = (int(n) for n in self.daewoon[code])
+            total = forward + backward
+            daewoon[gender] = {'forward': forward, 'backward': backward,
+                               'forward_ratio': round(forward / total, 4) if total else None}
+        return {
+            'records': self.records,
+            'charts': self.records - self.skipped,
+            'skipped': self.skipped,
+            'unknown_gender': self.unknown_gender,
+            'cohort_years': width,
+            'ohaeng_by_cohort': cohorts,
+            'ten_gods_by_day_master': ten_gods,
+            'daewoon_by_gender': daewoon
+        }
+
+
+def aggregate_chunk(path, start, stop, cohort_years=10):
+    # 작업 단위: births.bin 의 [start, stop) 행 → Aggregates
+    saju = _saju or SajuLogic(interpret_cache_size=0)
+    columns = _columns(path)
+    part = Aggregates(cohort_years)
+    part.records = stop - start
+    year, month, day, hour, minute = civil_from_minutes(columns['births'][start:stop])
+    genders = columns['genders'][start:stop].copy()
+    _release(columns, start, stop)
+    # birth 열(int32)은 약 -2180~5983년을 담으므로, 그중 get_gan_zhi_batch 가 받지 않는 1년 이전 행을 건너뛴다.
+    valid = (year >= 1) & (year <= 9999)
+    if not valid.all():
+        part.skipped = int(len(valid) - valid.sum())
+        year, month, day, hour, minute, genders = (a[valid] for a in (year, month, day, hour, minute, genders))
+    if not len(year):
+        return part
+    pillars = saju.get_gan_zhi_batch(year, month, day, hour, minute)
+
+    # 오행: (묶음, 오행, 개수) 칸마다 원국 수
+    counts = saju.get_ohaeng_distribution_batch(pillars)
+    cohort = year // cohort_years
+    part.cohort_first = int(cohort.min())
+    size = int(cohort.max()) - part.cohort_first + 1
+    base = (cohort - part.cohort_first) * 45
+    keys = (base[:, None] + np.arange(5) * 9 + counts).ravel()
+    part.ohaeng = np.bincount(keys, minlength=size * 45).reshape(size, 5, 9)
+
+    # 십성: (일간, 십성) 칸마다 글자 수. 일간 열(-1)은 뺀다.
+    day_gan = pillars['day']['gan_idx'].astype(np.int64)
+    gods = np.delete(saju.get_ten_gods_batch(pillars), 4, axis=1)
+    part.ten_gods = np.bincount((day_gan[:, None] * 10 + gods).ravel(), minlength=100).reshape(10, 10)
+    part.day_masters = np.bincount(day_gan, minlength=10)
+
+    # 대운 방향: 양년생 남자 / 음년생 여자는 순행 (_daewoon_start)
+    known = (genders == GENDER_CODES['male']) | (genders == GENDER_CODES['female'])
+    part.unknown_gender = int(len(known) - known.sum())
+    yang_year = pillars['year']['gan_idx'][known] % 2 == 0
+    male = genders[known] == GENDER_CODES['male']
+    backward = yang_year != male
+    part.daewoon = np.bincount(genders[known].astype(np.int64) * 2 + backward, minlength=4).reshape(2, 2)
+    return part
+
+
+def make_pool(workers=None):
+    # batch.make_pool 과 같이 spawn 방식 (작업자는 파일을 직접 mmap 하므로 부모 메모리를 물려받을 필요가 없다).
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+def run(path, workers=None, chunk_rows=CHUNK_ROWS, cohort_years=10, max_pending=None, progress_interval=5.0):
+    # births.bin 전체를 집계한다. workers=1 이면 풀 없이 이 프로세스에서 계산한다.
+    count = open_births(path)['count']
+    ranges = ((start, min(start + chunk_rows, count)) for start in range(0, count, chunk_rows))
+    total = Aggregates(cohort_years)
+    started = last_report = time.perf_counter()
+
+    def report(force=False):
+        nonlocal last_report
+        now = time.perf_counter()
+        if progress_interval and (force or now - last_report >= progress_interval):
+            last_report = now
+            rate = total.records / (now - started) if now > started else 0.0
+            print(f"{total.records:,}/{count:,}건 ({total.records / count:.1%}), {rate:,.0f}건/s",
+                  file=sys.stderr)
+
+    if workers == 1:
+        for start, stop in ranges:
+            total.merge(aggregate_chunk(path, start, stop, cohort_years))
+            report()
+        return total, time.perf_counter() - started
+
+    with make_pool(workers) as pool:
+        max_pending = max_pending or 2 * (workers or os.cpu_count() or 1)
+        pending = collections.deque()
+        for start, stop in ranges:
+            pending.append(pool.submit(aggregate_chunk, path, start, stop, cohort_years))
+            if len(pending) >= max_pending:
+                total.merge(pending.popleft().result())
+                report()
+        while pending:
+            total.merge(pending.popleft().result())
+            report()
+    return total, time.perf_counter() - started
+
+
+def convert(lines, fmt, path, block_rows=CHUNK_ROWS):
+    # CSV/NDJSON 출생 정보(birth_date, birth_time, gender) → births.bin. 반환값: (쓴 수, 건너뛴 수)
+    # 날짜/시각이 잘못되었거나 birth 열(int32)에 담기지 않는 줄(약 5983년 이후)은 건너뛴 수로 센다.
+    births, genders = [], []
+    skipped = 0
+    with BirthsWriter(path) as writer:
+        for _, record in parse_records(lines, fmt):
+            try:
+                year, month, day = map(int, str(record['birth_date']).split('-'))
+                hour, minute = map(int, str(record['birth_time']).split(':'))
+                if not (0 <= hour <= 23 and 0 <= minute <= 59):
+                    raise ValueError("invalid time")
+                birth = to_birth_minutes(year, month, day, hour, minute)
+                if not BIRTH_MIN <= birth <= BIRTH_MAX:
+                    raise ValueError("birth out of range")
+                births.append(birth)
+            except (KeyError, ValueError, TypeError):
+                skipped += 1
+                continue
+            genders.append(GENDER_CODES.get(record.get('gender'), UNKNOWN_GENDER))
+            if len(births) >= block_rows:
+                writer.write(births, genders)
+                births, genders = [], []
+        writer.write(births, genders)
+        written = writer.count
+    return written, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="대량 원국 통계 (오행 분포, 일간별 십성, 성별 대운 방향)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    conv = commands.add_parser('convert', help="CSV/NDJSON → births.bin")
+    conv.add_argument('input', help="입력 파일 경로")
+    conv.add_argument('-o', '--output', default='births.bin', help="출력 births.bin 경로")
+    conv.add_argument('-f', '--format', choices=FORMATS, help="입력 형식 (기본: 확장자로 판단, 없으면 csv)")
+    agg = commands.add_parser('run', help="births.bin 집계")
+    agg.add_argument('input', help="births.bin 경로")
+    agg.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    agg.add_argument('-w', '--workers', type=int, default=None, help="작업자 프로세스 수 (기본: CPU 수, 1 이면 풀 없이)")
+    agg.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="작업 단위 행 수")
+    agg.add_argument('--cohort-years', type=int, default=10, help="오행 분포를 묶는 출생 연도 폭")
+    agg.add_argument('--progress-interval', type=float, default=5.0, help="진행 상황 출력 간격 (초, 0 이면 끔)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        fmt = args.format or ('ndjson' if args.input.endswith(('.ndjson', '.jsonl')) else 'csv')
+        with open(args.input, 'rb') as f:
+            written, skipped = convert(text_lines(f), fmt, args.output)
+        print(f"{written:,}건 저장 (건너뜀 {skipped:,}) → {args.output}", file=sys.stderr)
+        return 0
+
+    if args.chunk_rows < 1 or args.cohort_years < 1:
+        parser.error("--chunk-rows 와 --cohort-years 는 1 이상이어야 합니다")
+    total, elapsed = run(args.input, args.workers, args.chunk_rows, args.cohort_years,
+                         progress_interval=args.progress_interval)
+    raw = json.dumps(total.to_dict(), ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(raw)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(raw + '\n')
+    rate = total.records / elapsed if elapsed else 0.0
+    print(f"{total.records:,}건 집계 (건너뜀 {total.skipped:,}), {elapsed:.1f}s, {rate:,.0f}건/s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,207 @@
-from flask import Flask, render_template, request
-from saju_logic import SajuLogic
-from ai_analysis import AIAnalysis
-from datetime import datetime
+import copy
+import datetime
+import functools
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import Flask, render_template, request, jsonify, url_for, abort, redirect, Response, stream_with_context, g
+from markupsafe import Markup
+from saju_logic import RULESET_VERSION, SajuLogic
+from chart import STEMS, BRANCHES
+from ai_analysis import AIAnalysis, build_ai_args
+from fragment_cache import FragmentCache
+from job_queue import JobQueue
+import text_store
+import batch
+import metrics
 
 app = Flask(__name__)
-saju = SajuLogic()
+saju = SajuLogic(interpret_cache_size=int(os.getenv('INTERPRET_CACHE_SIZE', 4096)))
 ai = AIAnalysis()
+jobs = JobQueue(
+    max_workers=int(os.getenv('AI_JOB_WORKERS', 4)),
+    max_queue=int(os.getenv('AI_JOB_QUEUE', 32))
+)
+# 1이면 작업 큐에서 스트리밍 모드로 AI를 호출하여 섹션을 완성되는 대로 결과 화면에 보낸다 (SSE).
+# SSE 연결은 글이 끝날 때까지 열려 있으므로, 동기 워커(Procfile 의 gthread)에서는 화면 하나가 스레드 하나를 잡는다.
+# 그래서 기본은 끄고(결과 화면이 /api/jobs/<id> 를 조회), 이벤트 루프에서 SSE 를 보내는 asgi.py 가 기본으로 켠다.
+AI_STREAM = os.getenv('AI_STREAM', '0') == '1'
+# AI 결과를 기다리는 동안 결과 화면의 AI 섹션에 표시할 문구
+AI_PENDING_TEXT = "✨ AI가 심층 분석을 작성하고 있습니다..."
+profiler = metrics.RequestProfiler.from_env()
+# /api/batch 설정. 프로세스 풀은 첫 배치 요청 때 만든다.
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 500))
+# 배치 AI 분석은 화면 요청과 별도로 분당 호출 수와 배치당 최대 건수를 제한한다.
+batch_ai_limiter = batch.RateLimiter(float(os.getenv('AI_BATCH_RPM', 30)))
+BATCH_AI_MAX = int(os.getenv('AI_BATCH_MAX', 100))
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+# /api/timeline 한 페이지의 최대 항목 수 (월운 100년치)
+TIMELINE_PAGE_MAX = 1200
+# /api/reverse 응답의 최대 구간 수
+REVERSE_LIMIT_MAX = 20000
+# GET /api/chart 응답을 브라우저/CDN 이 재검증 없이 쓸 수 있는 시간 (초). 규칙 판이 바뀌면 ETag 가 바뀐다.
+CHART_MAX_AGE = int(os.getenv('CHART_MAX_AGE', 86400))
+# result.html 의 원국 조각(partials/) 렌더링 결과 캐시 (None 이면 끔)
+fragments = FragmentCache.from_env()
+RESULT_FRAGMENTS = {
+    'saju_table': 'partials/saju_table.html',
+    'daewoon_list': 'partials/daewoon_list.html'
+}
+
+def prewarm_interpret_cache(path):
+    # 자주 조회되는 출생 정보 파일(batch.py 와 같은 CSV/NDJSON 형식)로 해석 캐시를 미리 채운다.
+    fmt = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+    def births():
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            for _, record in batch.parse_records(f, fmt):
+                try:
+                    year, month, day = map(int, record['birth_date'].split('-'))
+                    hour, minute = map(int, record['birth_time'].split(':'))
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    continue
+                yield year, month, day, hour, minute, record.get('gender', 'male')
+
+    count = saju.prewarm_interpret_cache(births())
+    print(f"해석 캐시 미리 채움: {count}건 ({path})")
+
+if os.getenv('INTERPRET_PREWARM_FILE'):
+    prewarm_interpret_cache(os.getenv('INTERPRET_PREWARM_FILE'))
+
+def chart_key(saju_chart, gender):
+    # 결정적 계산 결과(원국, 오행, 해석)를 정하는 값: 규칙 판 + 원국 인덱스(Chart.code) + 성별.
+    # /api/chart 의 ETag 와 결과 화면 조각 캐시 키로 쓴다.
+    return f"r{RULESET_VERSION}-{saju_chart.code:06x}-{gender}"
+
+def build_chart(form):
+    # 폼 입력으로 결정적인 사주 계산(원국, 오행, 해석, AI 입력값)을 모두 끝낸다.
+    name = form.get('name')
+    gender = form.get('gender')
+    birth_date_str = form.get('birth_date')
+    birth_time_str = form.get('birth_time')
+
+    with metrics.stage('parse'):
+        year, month, day = map(int, birth_date_str.split('-'))
+        hour, minute = map(int, birth_time_str.split(':'))
+
+    # 원국은 간결한 Chart 로 계산하고, 템플릿/AI 에 넘길 때만 dict 로 펼친다.
+    with metrics.stage('gan_zhi'):
+        saju_chart = saju.get_chart(year, month, day, hour, minute)
+        pillars = saju_chart.to_dict()
+        ohaeng = saju.get_ohaeng_distribution(pillars)
+    with metrics.stage('interpret'):
+        interpretations = saju.interpret(pillars, ohaeng, {'gender': gender})
+
+    return {
+        'name': name,
+        'gender': gender,
+        'birth_date': birth_date_str,
+        'birth_time': birth_time_str,
+        'pillars': pillars,
+        'ohaeng': ohaeng,
+        'interp': interpretations,
+        'key': chart_key(saju_chart, gender),
+        'ai_args': build_ai_args(name, gender, year, pillars, interpretations)
+    }
+
+def apply_ai(interpretations, ai_data):
+    # AI 결과로 해석 텍스트를 덮어쓴다. ai_data 가 없으면 기본 해석을 그대로 둔다.
+    if not ai_data:
+        return interpretations
+
+    interpretations['total_summary'] = ai_data.get('total_summary', "평생 운세 데이터를 생성 중입니다.")
+    interpretations['personality_deep'] = ai_data.get('personality_deep', "성향 분석 데이터를 생성 중입니다.")
+    interpretations['social_analysis'] = ai_data.get('social_analysis', "사회운 분석 데이터를 생성 중입니다.")
+    interpretations['health_analysis'] = ai_data.get('health_analysis', "건강 분석 데이터를 생성 중입니다.")
+    interpretations['daewoon_trend'] = ai_data.get('daewoon_trend', "대운의 흐름 분석 데이터를 생성 중입니다.")
+    interpretations['love_romance'] = ai_data.get('love_romance', interpretations['love'])
+    interpretations['wealth_strategy'] = ai_data.get('wealth_strategy', interpretations['wealth'])
+
+    interpretations['core'] = ai_data.get('personality_deep', interpretations['core'])
+    interpretations['advice'] = ai_data.get('health_analysis', interpretations['advice'])
+
+    if 'gmhs' in ai_data and isinstance(ai_data['gmhs'], dict):
+        for period in ['year', 'month', 'day', 'hour']:
+            if period in ai_data['gmhs'] and period in interpretations['gmhs']:
+                interpretations['gmhs'][period]['desc'] = ai_data['gmhs'][period]
+
+    if 'today_luck' in ai_data:
+        interpretations['today_luck']['desc'] = str(ai_data['today_luck'])
+    return interpretations
+
+def mark_ai_pending(interpretations):
+    # AI 섹션 자리에 작성 중 문구를 채운다. 실제 내용은 결과 화면이 SSE로 받아 교체한다.
+    for key in ['total_summary', 'personality_deep', 'social_analysis', 'health_analysis',
+                'daewoon_trend', 'love_romance', 'wealth_strategy']:
+        interpretations[key] = AI_PENDING_TEXT
+    return interpretations
+
+def render_fragments(chart):
+    # 원국으로만 정해지는 결과 화면 조각 (이름 → HTML). 같은 원국 키로 렌더링한 적이 있으면 다시 렌더링하지 않는다.
+    html = {}
+    for name, template in RESULT_FRAGMENTS.items():
+        render = functools.partial(render_template, template, pillars=chart['pillars'], interp=chart['interp'])
+        html[name] = Markup(fragments.get_or_render(name, chart['key'], render) if fragments else render())
+    return html
+
+def render_result(chart, ai_data, job_id=None):
+    # job_id 가 주어지면 결과 화면이 /api/jobs/<job_id>/events 를 구독하여 AI 섹션을 채운다.
+    # (AI_STREAM 이 꺼져 있으면 /api/jobs/<job_id> 를 조회하다가 작업이 끝나면 다시 불러온다.)
+    with metrics.stage('render'):
+        return render_template('result.html',
+                               fragments=render_fragments(chart),
+                               name=chart['name'],
+                               gender=chart['gender'],
+                               birth_date=chart['birth_date'],
+                               birth_time=chart['birth_time'],
+                               pillars=chart['pillars'],
+                               ohaeng=chart['ohaeng'],
+                               interp=apply_ai(chart['interp'], ai_data),
+                               job_id=job_id,
+                               ai_stream=AI_STREAM)
+
+def sse_event(seq, event):
+    data = {k: v for k, v in event.items() if k != 'type'}
+    return f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_end(job):
+    return f"event: end\ndata: {json.dumps({'status': job['status'], 'ai_ready': job['result'] is not None})}\n\n"
+
+def sse_cursor(last_event_id):
+    # 재연결 시 브라우저가 보내는 Last-Event-ID 다음 번호부터 보낸다.
+    try:
+        return int(last_event_id or -1) + 1
+    except ValueError:
+        return 0
+
+@app.before_request
+def start_timing():
+    g.request_started = time.perf_counter()
+    g.profile = profiler.start()
+
+@app.after_request
+def finish_timing(response):
+    # 구간별 시간을 Server-Timing 헤더로 내보내고 요청 히스토그램에 누적한다.
+    # 스트리밍 응답(SSE, 배치)은 본문을 보내기 전까지의 시간만 포함된다.
+    total = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unknown'
+    timings = g.get('server_timing', []) + [('total', total)]
+    response.headers['Server-Timing'] = ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings)
+    metrics.observe('saju_request_seconds', total, endpoint=endpoint)
+    metrics.inc('saju_requests_total', endpoint=endpoint, status=response.status_code)
+    if g.profile is not None:
+        print(f"프로파일 저장: {profiler.finish(g.profile, endpoint)}")
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -17,74 +213,258 @@ def loading():
 
 @app.route('/result', methods=['POST'])
 def result():
-    name = request.form.get('name')
-    gender = request.form.get('gender')
-    birth_date_str = request.form.get('birth_date')
-    birth_time_str = request.form.get('birth_time')
-    
+    # 동기 방식 (자바스크립트 없이 폼을 제출한 경우의 호환 경로)
     try:
-        year, month, day = map(int, birth_date_str.split('-'))
-        hour, minute = map(int, birth_time_str.split(':'))
-        
-        pillars = saju.get_gan_zhi(year, month, day, hour, minute)
-        ohaeng = saju.get_ohaeng_distribution(pillars)
-        interpretations = saju.interpret(pillars, ohaeng, {'gender': gender})
-        
-        now = datetime.now()
-        age = now.year - year + 1
-        birth_context = f"{year}년생 ({age}세)"
-        
-        ten_gods_all = []
-        for p_key in interpretations['ten_gods']:
-            ten_gods_all.append(interpretations['ten_gods'][p_key]['gan'])
-            ten_gods_all.append(interpretations['ten_gods'][p_key]['zhi'])
-        
-        from collections import Counter
-        counts = Counter(ten_gods_all)
-        ten_stars_list = ", ".join([f"{k} {v}" for k, v in counts.items()])
-        
-        current_daewun = f"{interpretations['daewoon'][0]['age']}세 대운 ({interpretations['daewoon'][0]['gan']}{interpretations['daewoon'][0]['zhi']})"
-
-        ai_data = ai.get_deep_analysis(
-            name, gender, pillars, 
-            interpretations['ohaeng_analysis'], 
-            ten_stars_list, 
-            current_daewun,
-            birth_context
-        )
-        
-        if ai_data:
-            interpretations['total_summary'] = ai_data.get('total_summary', "평생 운세 데이터를 생성 중입니다.")
-            interpretations['personality_deep'] = ai_data.get('personality_deep', "성향 분석 데이터를 생성 중입니다.")
-            interpretations['social_analysis'] = ai_data.get('social_analysis', "사회운 분석 데이터를 생성 중입니다.")
-            interpretations['health_analysis'] = ai_data.get('health_analysis', "건강 분석 데이터를 생성 중입니다.")
-            interpretations['daewoon_trend'] = ai_data.get('daewoon_trend', "대운의 흐름 분석 데이터를 생성 중입니다.")
-            interpretations['love_romance'] = ai_data.get('love_romance', interpretations['love'])
-            interpretations['wealth_strategy'] = ai_data.get('wealth_strategy', interpretations['wealth'])
-            
-            interpretations['core'] = ai_data.get('personality_deep', interpretations['core']) 
-            interpretations['advice'] = ai_data.get('health_analysis', interpretations['advice'])
-            
-            if 'gmhs' in ai_data and isinstance(ai_data['gmhs'], dict):
-                for period in ['year', 'month', 'day', 'hour']:
-                    if period in ai_data['gmhs'] and period in interpretations['gmhs']:
-                        interpretations['gmhs'][period]['desc'] = ai_data['gmhs'][period]
-            
-            if 'today_luck' in ai_data:
-                interpretations['today_luck']['desc'] = str(ai_data['today_luck'])
-
-        return render_template('result.html', 
-                               name=name, 
-                               gender=gender,
-                               birth_date=birth_date_str,
-                               birth_time=birth_time_str,
-                               pillars=pillars, 
-                               ohaeng=ohaeng, 
-                               interp=interpretations)
+        chart = build_chart(request.form)
+        ai_data = ai.get_deep_analysis(*chart['ai_args'])
+        return render_result(chart, ai_data)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return f"Error occurred: {str(e)}", 400
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    # 사주 계산은 즉시 끝내고 AI 분석만 백그라운드 큐에 넣는다.
+    try:
+        chart = build_chart(request.form)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    analyze = ai.stream_deep_analysis if AI_STREAM else ai.get_deep_analysis
+    job = jobs.submit(chart, analyze, *chart['ai_args'])
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stream': AI_STREAM,
+        'status_url': url_for('job_status', job_id=job['id']),
+        'events_url': url_for('job_events', job_id=job['id']),
+        'result_url': url_for('job_result', job_id=job['id'])
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'ai_ready': job['result'] is not None,
+        'result_url': url_for('job_result', job_id=job['id'])
+    })
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    # AI 섹션을 Server-Sent Events 로 전달한다.
+    #   event: delta   → 작성 중인 섹션에 새로 붙은 글 {path, text}
+    #   event: section → 완성된 섹션 {path, value}
+    #   event: end     → 작업 종료 {status}
+    # 재연결 시 브라우저가 보내는 Last-Event-ID 다음 이벤트부터 이어서 보낸다.
+    # 연결 하나가 작업이 끝날 때까지 워커 스레드를 잡으므로, ASGI 모드에서는 asgi.py 가 이 경로를 대신 처리한다.
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    cursor = sse_cursor(request.headers.get('Last-Event-ID'))
+
+    def generate():
+        nonlocal cursor
+        while True:
+            events, finished = jobs.wait_events(job, cursor, timeout=15)
+            for seq, event in events:
+                yield sse_event(seq, event)
+                cursor = seq + 1
+            if finished and not events:
+                yield sse_end(job)
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/stats')
+def job_stats():
+    return jsonify(jobs.stats())
+
+def get_batch_pool():
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = batch.make_pool(BATCH_WORKERS)
+        return _batch_pool
+
+@app.route('/api/batch', methods=['POST'])
+def batch_compute():
+    # CSV / NDJSON 출생 정보를 받아 사주 계산 결과를 입력 순서대로 NDJSON 으로 스트리밍한다.
+    # 본문을 그대로 보내거나 multipart 의 'file' 필드로 업로드한다.
+    # ?format=csv|ndjson (기본: Content-Type 으로 판단), ?ai=1 이면 AI 분석 포함 (최대 AI_BATCH_MAX 건)
+    upload = request.files.get('file')
+    content_type = (upload.mimetype if upload else request.mimetype) or ''
+    fmt = request.args.get('format') or ('ndjson' if 'json' in content_type else 'csv')
+    if fmt not in batch.FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(batch.FORMATS)}"}), 400
+    with_ai = request.args.get('ai') == '1'
+    pool = get_batch_pool()
+    source = None
+    if upload:
+        # 업로드 파일은 뷰 함수가 끝나면 닫히므로 응답 생성 동안 읽을 임시 파일로 옮겨 둔다.
+        source = tempfile.TemporaryFile()
+        upload.save(source)
+        source.seek(0)
+
+    def generate():
+        # 본문은 응답을 보내면서 조금씩 읽는다 (전체를 메모리에 올리지 않음)
+        lines = batch.text_lines(source or request.stream)
+        rows = batch.run_batch(lines, fmt, pool, chunk_size=BATCH_CHUNK_SIZE, max_pending=2 * BATCH_WORKERS,
+                               ai=ai if with_ai else None, ai_limiter=batch_ai_limiter, ai_max=BATCH_AI_MAX)
+        try:
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False) + '\n'
+        finally:
+            if source:
+                source.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/timeline')
+def luck_timeline():
+    # 대운/세운/월운 타임라인을 페이지 단위로 돌려준다. 요청한 페이지 분량만 생성한다.
+    # ?birth_date=YYYY-MM-DD&birth_time=HH:MM&gender=male|female&granularity=decade|year|month (기본 month)
+    # &start=...&end=... (ISO 날짜/시각, 기본: 출생 시각부터 100년) &limit=N (기본 120)
+    # 다음 페이지는 응답의 next_cursor 를 ?cursor= 로 넘긴다 (start 대신 쓰임). 마지막 페이지면 next_cursor 는 null.
+    args = request.args
+    try:
+        year, month, day = map(int, args['birth_date'].split('-'))
+        hour, minute = map(int, args.get('birth_time', '12:00').split(':'))
+        gender = args.get('gender', 'male')
+        if gender not in ('male', 'female'):
+            raise ValueError("gender must be male or female")
+        birth = datetime.datetime(year, month, day, hour, minute)
+        start = datetime.datetime.fromisoformat(args.get('cursor') or args.get('start') or birth.isoformat())
+        end = datetime.datetime.fromisoformat(args['end']) if args.get('end') else start + datetime.timedelta(days=36525)
+        limit = max(1, min(int(args.get('limit', 120)), TIMELINE_PAGE_MAX))
+        pillars = saju.get_chart(year, month, day, hour, minute).to_dict()
+        items = saju.iter_luck_timeline(pillars, gender, year, start, end, args.get('granularity', 'month'))
+        page = list(itertools.islice(items, limit + 1))
+    except KeyError as e:
+        return jsonify({'error': f"missing parameter: {e.args[0]}"}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    next_cursor = page.pop()['start'] if len(page) > limit else None
+    return jsonify({'items': page, 'next_cursor': next_cursor})
+
+@app.route('/api/reverse')
+def reverse_lookup():
+    # 원국(일부만 있어도 됨)이 나오는 출생 시각 구간을 찾는다.
+    # ?year=경오&month=신사&day=경진&hour=계미 (아는 기둥만) &start=...&end=... (ISO, 선택) &limit=N (기본 1000)
+    args = request.args
+    try:
+        pillars = {}
+        for key in ('year', 'month', 'day', 'hour'):
+            value = args.get(key)
+            if value:
+                if len(value) != 2 or value[0] not in STEMS or value[1] not in BRANCHES:
+                    raise ValueError(f"{key} must be a stem and branch such as 갑자")
+                pillars[key] = {'gan_idx': STEMS.index(value[0]), 'zhi_idx': BRANCHES.index(value[1])}
+        start = datetime.datetime.fromisoformat(args['start']) if args.get('start') else None
+        end = datetime.datetime.fromisoformat(args['end']) if args.get('end') else None
+        limit = max(1, min(int(args.get('limit', 1000)), REVERSE_LIMIT_MAX))
+        ranges = saju.find_birth_datetimes(pillars, start, end, limit=limit + 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'ranges': [{'start': a.isoformat(timespec='minutes'), 'end': b.isoformat(timespec='minutes')}
+                   for a, b in ranges[:limit]],
+        'truncated': len(ranges) > limit
+    })
+
+@app.route('/api/chart')
+def chart_json():
+    # 결정적 사주 계산 결과(원국, 오행 분포, 해석)를 JSON 으로 돌려준다. 같은 입력이면 응답이 같아 브라우저/CDN 이 캐시할 수 있다.
+    # ?birth_date=YYYY-MM-DD&birth_time=HH:MM (기본 12:00) &gender=male|female (기본 male)
+    # 쿼리가 정규형(위 순서, 0 채움, 다른 파라미터 없음)이 아니면 정규형 URL 로 301 (캐시 항목을 하나로 모은다).
+    # ETag 는 chart_key (규칙 판 + 원국 인덱스 + 성별) 이며, If-None-Match 가 맞으면 해석 계산 없이 304.
+    # 오늘의 운세(today_luck)는 날짜에 따라 바뀌므로 넣지 않는다.
+    args = request.args
+    try:
+        year, month, day = map(int, args['birth_date'].split('-'))
+        hour, minute = map(int, args.get('birth_time', '12:00').split(':'))
+        gender = args.get('gender', 'male')
+        if gender not in ('male', 'female'):
+            raise ValueError("gender must be male or female")
+        datetime.datetime(year, month, day, hour, minute)
+        saju_chart = saju.get_chart(year, month, day, hour, minute)
+    except KeyError as e:
+        return jsonify({'error': f"missing parameter: {e.args[0]}"}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    birth_date, birth_time = f"{year:04d}-{month:02d}-{day:02d}", f"{hour:02d}:{minute:02d}"
+    canonical = f"birth_date={birth_date}&birth_time={birth_time}&gender={gender}"
+    cache_control = f"public, max-age={CHART_MAX_AGE}"
+    if request.query_string.decode('latin-1') != canonical:
+        response = redirect(f"{request.path}?{canonical}", code=301)
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    etag = chart_key(saju_chart, gender)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        with metrics.stage('gan_zhi'):
+            pillars = saju_chart.to_dict()
+            ohaeng = saju.get_ohaeng_distribution(pillars)
+        with metrics.stage('interpret'):
+            interp = saju.interpret(pillars, ohaeng, {'gender': gender})
+        interp.pop('today_luck', None)
+        response = jsonify({
+            'birth_date': birth_date,
+            'birth_time': birth_time,
+            'gender': gender,
+            'ruleset': RULESET_VERSION,
+            'chart': saju_chart.code,
+            'pillars': pillars,
+            'ohaeng': ohaeng,
+            'interp': interp
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+@app.route('/api/interpret/stats')
+def interpret_stats():
+    # 결정적 해석 LRU 캐시와 오늘의 운세 캐시, 결과 화면 조각 캐시 적중률
+    return jsonify({**saju.interpret_cache_stats(), 'fragments': fragments.stats() if fragments else None})
+
+@app.route('/api/ai/stats')
+def ai_stats():
+    # AI 캐시 적중률, 동일 요청 합치기(single-flight) 횟수, 서킷 브레이커 상태와 재시도/헤징 횟수,
+    # 사전 생성 해설 저장소 상태, 호출 방식(single/fanout/summary)별 지연 시간, 입장 제어(예산 대기열) 상태,
+    # 프롬프트 판/접두어 지문과 호출 종류별 토큰 사용량 (prompt, 접두어 캐시 적중 cached, completion)
+    return jsonify({
+        'mode': ai.mode,
+        'cache': ai.cache.stats() if ai.cache else None,
+        'coalescing': ai.coalescing_stats(),
+        'policy': ai.policy.stats(),
+        'admission': ai.scheduler.stats() if ai.scheduler else None,
+        'texts': text_store.get_store().stats() if text_store.get_store() else None,
+        'latency_seconds': ai.timing_stats(),
+        'tokens': ai.token_stats()
+    })
+
+@app.route('/result/<job_id>')
+def job_result(job_id):
+    # 작업이 끝나기 전에 열면 기본 해석을 먼저 보여주고, AI 섹션은 SSE 로 도착하는 대로 채운다
+    # (AI_STREAM 이 꺼져 있으면 작업이 끝난 뒤 다시 불러온다).
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404)
+    chart = copy.deepcopy(job['context'])
+    if job['finished_at'] is not None:
+        return render_result(chart, job['result'])
+    mark_ai_pending(chart['interp'])
+    return render_result(chart, None, job_id=job['id'])
+
 if __name__ == '__main__':
     app.run(debug=True)
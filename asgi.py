@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+
+# ASGI 모드는 SSE(/api/jobs/<id>/events)를 이벤트 루프에서 보내므로 AI 스트리밍을 기본으로 켠다 (app.AI_STREAM 참고).
+os.environ.setdefault('AI_STREAM', '1')
+
+import metrics  # noqa: E402
+from app import app, ai, build_chart, jobs, render_result, sse_cursor, sse_end, sse_event  # noqa: E402
+
+# ASGI 진입점 (비동기 모드)
+#
+#   uvicorn asgi:application --workers 2
+#   gunicorn asgi:application -k uvicorn.workers.UvicornWorker --workers 2
+#
+# POST /result 는 여기서 직접 처리한다. 사주 계산과 템플릿 렌더링(CPU 작업)은 스레드 풀에서 실행하고,
+# OpenAI 호출은 AsyncOpenAI 로 await 하므로 응답을 기다리는 요청이 스레드를 차지하지 않는다.
+# 프로세스 하나가 수백 개의 LLM 요청을 동시에 기다릴 수 있다 (연결 풀은 AIAnalysis 의 AsyncOpenAI 하나를 공유).
+# GET /api/jobs/<id>/events(SSE)도 여기서 직접 보낸다. WsgiToAsgi 로 감싸면 연결마다 스레드 하나가 작업이 끝날 때까지
+# 묶이지만, 여기서는 작업 큐를 짧게 조회하고 이벤트 루프에서 쉬므로 화면 수만큼 스레드가 필요하지 않다.
+# 나머지 경로(/, /loading, /api/jobs 등)는 Flask 앱을 그대로 WsgiToAsgi 로 감싸 처리한다.
+
+# 사주 계산/렌더링용 스레드 수 (이벤트 루프 밖에서 실행)
+ASGI_CPU_THREADS = int(os.getenv('ASGI_CPU_THREADS', 4))
+# SSE 연결이 새 AI 이벤트를 확인하는 간격과 keep-alive 주석을 보내는 간격 (초)
+SSE_POLL_SECONDS = float(os.getenv('ASGI_SSE_POLL', 0.1))
+SSE_KEEPALIVE_SECONDS = 15
+
+cpu_executor = ThreadPoolExecutor(max_workers=ASGI_CPU_THREADS, thread_name_prefix='saju-cpu')
+flask_asgi = WsgiToAsgi(app)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, status, body, content_type='text/html; charset=utf-8', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+                   + [(k.encode(), v.encode()) for k, v in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def render_in_context(chart, ai_data):
+    # url_for 등을 쓰는 템플릿이므로 Flask 요청 컨텍스트 안에서 렌더링한다.
+    with app.test_request_context('/result', method='POST'):
+        return render_result(chart, ai_data)
+
+
+async def result(scope, receive, send):
+    # Flask 의 /result 와 같은 결과를 비동기로 만든다.
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    timings = []
+    status = 200
+    try:
+        body = await read_body(receive)
+        form = {k: v[0] for k, v in urllib.parse.parse_qs(body.decode('utf-8')).items()}
+
+        t0 = time.perf_counter()
+        chart = await loop.run_in_executor(cpu_executor, build_chart, form)
+        timings.append(('chart', time.perf_counter() - t0))
+
+        t0 = time.perf_counter()
+        ai_data = await ai.get_deep_analysis_async(*chart['ai_args'])
+        timings.append(('llm', time.perf_counter() - t0))
+
+        t0 = time.perf_counter()
+        html = await loop.run_in_executor(cpu_executor, render_in_context, chart, ai_data)
+        timings.append(('render', time.perf_counter() - t0))
+        response_body = html.encode('utf-8')
+    except Exception as e:
+        traceback.print_exc()
+        status = 400
+        response_body = f"Error occurred: {str(e)}".encode('utf-8')
+
+    total = time.perf_counter() - started
+    timings.append(('total', total))
+    server_timing = ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings)
+    await send_response(send, status, response_body, headers=[('server-timing', server_timing)])
+    metrics.observe('saju_request_seconds', total, endpoint='result')
+    metrics.inc('saju_requests_total', endpoint='result', status=status)
+
+
+async def job_events(scope, receive, send, job):
+    # Flask 의 /api/jobs/<id>/events 와 같은 이벤트 스트림 (이벤트 번호, Last-Event-ID 재연결 포함)
+    cursor = sse_cursor(dict(scope.get('headers', [])).get(b'last-event-id', b'').decode('latin-1'))
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')]
+    })
+    metrics.inc('saju_requests_total', endpoint='job_events', status=200)
+    idle = 0.0
+    try:
+        while not disconnected.is_set():
+            events, finished = jobs.wait_events(job, cursor, timeout=0)
+            if finished and not events:
+                await send({'type': 'http.response.body', 'body': sse_end(job).encode('utf-8')})
+                return
+            if events:
+                body = ''.join(sse_event(seq, event) for seq, event in events)
+                cursor = events[-1][0] + 1
+                idle = 0.0
+            elif idle >= SSE_KEEPALIVE_SECONDS:
+                body = ": keep-alive\n\n"
+                idle = 0.0
+            else:
+                await asyncio.sleep(SSE_POLL_SECONDS)
+                idle += SSE_POLL_SECONDS
+                continue
+            await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+    finally:
+        watcher.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            cpu_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    content_type = dict(scope.get('headers', [])).get(b'content-type', b'')
+    if (scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/result'
+            and content_type.startswith(b'application/x-www-form-urlencoded')):
+        await result(scope, receive, send)
+        return
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        parts = scope['path'].split('/')
+        # /api/jobs/<id>/events (없는 작업이면 Flask 가 404 를 돌려준다)
+        if len(parts) == 5 and parts[1:3] == ['api', 'jobs'] and parts[4] == 'events':
+            job = jobs.get(parts[3])
+            if job is not None:
+                await job_events(scope, receive, send, job)
+                return
+    await flask_asgi(scope, receive, send)
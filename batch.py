@@ -0,0 +1,221 @@
+import argparse
+import collections
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from saju_logic import SajuLogic
+
+# 대량 사주 계산 (POST /api/batch 와 명령행 공용)
+#
+# CSV 또는 NDJSON 으로 들어온 출생 정보를 한 줄씩 읽어 chunk_size 개씩 묶고,
+# 프로세스 풀에서 원국/오행/십성/대운을 계산한 뒤 입력 순서대로 NDJSON 한 줄씩 내보낸다.
+# 동시에 처리 중인 묶음 수를 제한하므로 파일 크기와 관계없이 메모리 사용량이 일정하다.
+#
+# 입력 필드: name, gender(male/female), birth_date(YYYY-MM-DD), birth_time(HH:MM), id(선택)
+# 출력 한 줄: {"line": 입력 번호, "id", "name", "pillars", "ohaeng", "ten_gods", "daewoon"}
+#            잘못된 입력은 {"line": 번호, "id", "error": "..."} 로 내보내고 계속 진행한다.
+#
+# AI 분석은 with_ai=True 일 때만 수행하며, 일반 화면 요청과 별도로 RateLimiter 로 분당 호출 수를 제한한다.
+
+FORMATS = ('csv', 'ndjson')
+
+# 프로세스 풀 작업자마다 하나씩 만든다 (_init_worker)
+_saju = None
+
+
+def _init_worker():
+    global _saju
+    _saju = SajuLogic()
+
+
+def parse_records(lines, fmt):
+    # 텍스트 줄 이터레이터를 (입력 번호, 레코드 dict 또는 오류 문자열) 로 바꾼다 (제너레이터)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {k.strip(): (v or '').strip() for k, v in record.items() if k}
+    elif fmt == 'ndjson':
+        for line_num, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = f"invalid JSON: {e}"
+            if not isinstance(record, (dict, str)):
+                record = "record must be a JSON object"
+            yield line_num, record
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+
+def compute_record(saju, record, with_ai=False):
+    # 레코드 하나의 결정적 사주 계산. with_ai 이면 AI 분석 인자(ai_args)도 함께 돌려준다.
+    name = record.get('name', '')
+    gender = record.get('gender')
+    if gender not in ('male', 'female'):
+        raise ValueError("gender must be 'male' or 'female'")
+    year, month, day = map(int, str(record['birth_date']).split('-'))
+    hour, minute = map(int, str(record['birth_time']).split(':'))
+
+    pillars = saju.get_gan_zhi(year, month, day, hour, minute)
+    ohaeng = saju.get_ohaeng_distribution(pillars)
+    interpretations = saju.interpret(pillars, ohaeng, {'gender': gender})
+
+    row = {
+        'name': name,
+        'pillars': {k: {'gan': v['gan'], 'zhi': v['zhi']} for k, v in pillars.items()},
+        'ohaeng': ohaeng,
+        'ten_gods': interpretations['ten_gods'],
+        'daewoon': [{'age': dw['age'], 'gan': dw['gan'], 'zhi': dw['zhi']}
+                    for dw in interpretations['daewoon']]
+    }
+    ai_args = None
+    if with_ai:
+        from ai_analysis import build_ai_args
+        ai_args = build_ai_args(name, gender, year, pillars, interpretations)
+    return row, ai_args
+
+
+def compute_chunk(chunk, with_ai=False):
+    # 프로세스 풀 작업 단위. chunk: [(입력 번호, 레코드), ...] → [(출력 dict, ai_args), ...]
+    saju = _saju or SajuLogic()
+    results = []
+    for line_num, record in chunk:
+        record_id = record.get('id') if isinstance(record, dict) else None
+        if isinstance(record, str):
+            results.append(({'line': line_num, 'id': record_id, 'error': record}, None))
+            continue
+        try:
+            row, ai_args = compute_record(saju, record, with_ai)
+        except (KeyError, ValueError, TypeError) as e:
+            error = f"missing field: {e}" if isinstance(e, KeyError) else str(e)
+            results.append(({'line': line_num, 'id': record_id, 'error': error}, None))
+            continue
+        results.append(({'line': line_num, 'id': record_id, **row}, ai_args))
+    return results
+
+
+class RateLimiter:
+    # 분당 호출 수 제한 (토큰 버킷). acquire() 는 토큰이 생길 때까지 기다린다.
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, float(per_minute))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def text_lines(stream, encoding='utf-8-sig'):
+    # 바이트 스트림(요청 본문, 업로드 파일)을 줄 단위 텍스트로 읽는다.
+    return io.TextIOWrapper(stream, encoding=encoding, newline='')
+
+
+def make_pool(workers=None):
+    # gunicorn 스레드 안에서 fork 하지 않도록 spawn 방식으로 만든다.
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+def run_batch(lines, fmt, pool, chunk_size=500, max_pending=None, ai=None, ai_limiter=None, ai_max=0):
+    # 결과 dict 를 입력 순서대로 내보낸다 (제너레이터).
+    # max_pending: 동시에 풀에 올려 두는 묶음 수 (기본: 작업자 수의 2배)
+    # ai: AIAnalysis. 주어지면 앞에서부터 ai_max 건까지 ai_limiter 속도로 AI 분석을 붙인다.
+    max_pending = max_pending or 2 * (os.cpu_count() or 1)
+    with_ai = ai is not None and ai_max > 0
+    records = parse_records(lines, fmt)
+    pending = collections.deque()
+    ai_used = 0
+
+    def fill():
+        while len(pending) < max_pending:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                return
+            pending.append(pool.submit(compute_chunk, chunk, with_ai))
+
+    fill()
+    while pending:
+        results = pending.popleft().result()
+        fill()
+        for row, ai_args in results:
+            if ai_args is not None:
+                if ai_used < ai_max:
+                    ai_used += 1
+                    if ai_limiter:
+                        ai_limiter.acquire()
+                    row['ai'] = ai.get_deep_analysis(*ai_args, priority='batch')
+                else:
+                    row['ai'] = None
+                    row['ai_skipped'] = 'limit'
+            yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV/NDJSON 출생 정보를 사주 계산 결과 NDJSON 으로 변환")
+    parser.add_argument('input', help="입력 파일 경로 ('-' 이면 표준 입력)")
+    parser.add_argument('-o', '--output', default='-', help="출력 파일 경로 (기본: 표준 출력)")
+    parser.add_argument('-f', '--format', choices=FORMATS,
+                        help="입력 형식 (기본: 확장자로 판단, 없으면 csv)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="프로세스 수")
+    parser.add_argument('--chunk-size', type=int, default=500, help="작업 단위 레코드 수")
+    parser.add_argument('--ai', action='store_true', help="AI 심층 분석 포함 (OPENAI_API_KEY 필요)")
+    parser.add_argument('--ai-rpm', type=float, default=float(os.getenv('AI_BATCH_RPM', 30)),
+                        help="AI 분당 호출 수 제한")
+    parser.add_argument('--ai-max', type=int, default=int(os.getenv('AI_BATCH_MAX', 100)),
+                        help="AI 분석할 최대 레코드 수")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = 'ndjson' if args.input.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+    ai = None
+    if args.ai:
+        from ai_analysis import AIAnalysis
+        ai = AIAnalysis()
+
+    src = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8-sig', newline='')
+    dst = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    count = errors = 0
+    try:
+        with make_pool(args.workers) as pool:
+            for row in run_batch(src, fmt, pool, chunk_size=args.chunk_size, max_pending=2 * args.workers, ai=ai,
+                                 ai_limiter=RateLimiter(args.ai_rpm), ai_max=args.ai_max):
+                dst.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+                errors += 'error' in row
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    elapsed = time.perf_counter() - started
+    print(f"{count}건 처리 (오류 {errors}건), {elapsed:.1f}s, {count / elapsed if elapsed else 0:.0f}건/s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+
+import numpy as np
+
+from common import metadata, write_result
+
+import analytics
+
+# 대량 원국 통계 (analytics.py) 처리량 벤치마크
+#
+# 시드 고정 무작위 출생 정보로 births.bin (기본 2천만 건, 블록 단위로 써서 메모리 일정)을 만들고
+# workers 수별 처리량(건/s)과 1개 대비 속도 향상, 부모/작업자 프로세스 최대 RSS 를 잰다.
+#   python benchmarks/analytics.py --records 20000000 --workers 1 2 4 8 -o bench-analytics.json
+
+
+def make_births(path, records, seed, block=1 << 22):
+    rng = np.random.default_rng(seed)
+    lo = analytics.to_birth_minutes(1920, 1, 1, 0, 0)
+    hi = analytics.to_birth_minutes(2020, 12, 31, 23, 59)
+    with analytics.BirthsWriter(path) as writer:
+        for start in range(0, records, block):
+            size = min(block, records - start)
+            writer.write(rng.integers(lo, hi, size, dtype=np.int64), rng.integers(0, 2, size, dtype=np.int8))
+
+
+def max_rss_mb(who):
+    # ru_maxrss 는 리눅스에서 KB 단위
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def run(records=20_000_000, workers=(1,), chunk_rows=analytics.CHUNK_ROWS, seed=20240101, path=None):
+    own = path is None
+    path = path or os.path.join(tempfile.mkdtemp(prefix='saju-analytics-'), 'births.bin')
+    if own or not os.path.exists(path):
+        make_births(path, records, seed)
+    records = analytics.open_births(path)['count']
+    results = {}
+    base = None
+    try:
+        for count in workers:
+            total, elapsed = analytics.run(path, count, chunk_rows, progress_interval=0)
+            rate = total.records / elapsed
+            base = base or rate
+            results[str(count)] = {
+                'seconds': round(elapsed, 3),
+                'records_per_second': round(rate),
+                'speedup': round(rate / base, 2),
+                'efficiency': round(rate / base / count, 2)
+            }
+            print(f"workers={count}: {elapsed:.2f}s, {rate:,.0f}건/s", file=sys.stderr)
+    finally:
+        if own:
+            os.remove(path)
+    return {
+        'records': records,
+        'chunk_rows': chunk_rows,
+        'workers': results,
+        'max_rss_mb': {'parent': max_rss_mb(resource.RUSAGE_SELF), 'worker': max_rss_mb(resource.RUSAGE_CHILDREN)}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="대량 원국 통계 처리량 벤치마크")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument('--records', type=int, default=20_000_000, help="생성할 출생 정보 수")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1], help="비교할 작업자 프로세스 수")
+    parser.add_argument('--chunk-rows', type=int, default=analytics.CHUNK_ROWS, help="작업 단위 행 수")
+    parser.add_argument('--input', help="이미 만든 births.bin (없으면 만들고, 지정하면 남겨 둔다)")
+    args = parser.parse_args(argv)
+    write_result({
+        'kind': 'analytics',
+        'meta': {**metadata(), 'records': args.records, 'workers': args.workers},
+        'result': run(args.records, args.workers, args.chunk_rows, path=args.input)
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
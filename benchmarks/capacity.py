@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT, metadata, write_result
+
+# 동기(gunicorn gthread) 배포와 비동기(ASGI, uvicorn) 배포의 동시 사용자 수용량 비교
+#
+# 같은 OpenAI 대역 서버 지연 시간에서 동시 사용자 수를 늘려 가며 load_test.py 를 실행하고,
+# 배포 방식별 처리량과 p50/p95 를 한 JSON 으로 모은다.
+#   python benchmarks/capacity.py --levels 8,32,128,256 --duration 10 --latency 1.0 -o bench-capacity.json
+
+DEPLOYMENTS = {
+    # Procfile 과 같은 구성 (워커 1개, 스레드 8개)
+    'sync': "gunicorn app:app --worker-class gthread --threads 8 --workers {workers} --bind 127.0.0.1:{port} "
+            "--timeout 300 --log-level warning",
+    'async': "uvicorn asgi:application --workers {workers} --port {port} --log-level warning",
+}
+
+
+def run_level(name, cmd, concurrency, args):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        path = f.name
+    try:
+        subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'load_test.py'),
+                        '--app-cmd', cmd.replace('{workers}', str(args.workers)),
+                        '--port', str(args.port), '--concurrency', str(concurrency),
+                        '--duration', str(args.duration), '--latency', str(args.latency),
+                        '--jitter', str(args.jitter), '-o', path], check=True)
+        with open(path, encoding='utf-8') as f:
+            result = json.load(f)['result']
+    finally:
+        os.remove(path)
+    latency = result['latency']
+    row = {
+        'deployment': name,
+        'concurrency': concurrency,
+        'throughput_rps': result['throughput_rps'],
+        'p50_ms': latency.get('p50_ms'),
+        'p95_ms': latency.get('p95_ms'),
+        'p99_ms': latency.get('p99_ms'),
+        'ok': result['ok'],
+        'errors': result['requests'] - result['ok']
+    }
+    print(f"{name:>5} c={concurrency:<4} {row['throughput_rps']:>8} rps  p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms",
+          file=sys.stderr)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="동기/비동기 배포 동시 사용자 수용량 비교")
+    parser.add_argument('-o', '--output', default='-')
+    parser.add_argument('--levels', default='8,32,128,256', help="동시 사용자 수 목록 (쉼표 구분)")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=1.0, help="대역 서버 응답 지연 (초)")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=1, help="배포별 프로세스 수")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--deployments', default='sync,async')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name in args.deployments.split(','):
+        for level in map(int, args.levels.split(',')):
+            rows.append(run_level(name, DEPLOYMENTS[name], level, args))
+    write_result({
+        'kind': 'capacity',
+        'meta': {**metadata(), 'latency_s': args.latency, 'jitter_s': args.jitter,
+                 'duration_s': args.duration, 'workers': args.workers},
+        'results': rows
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# 벤치마크 공통: 결과 JSON 메타데이터와 백분위수 계산
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def summarize(seconds, scale=1000.0, unit='ms'):
+    # 지연 시간 목록(초) → {count, mean, p50, p95, p99, max} (unit 단위)
+    values = sorted(seconds)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        f'mean_{unit}': round(sum(values) / len(values) * scale, 4),
+        f'p50_{unit}': round(percentile(values, 0.50) * scale, 4),
+        f'p95_{unit}': round(percentile(values, 0.95) * scale, 4),
+        f'p99_{unit}': round(percentile(values, 0.99) * scale, 4),
+        f'max_{unit}': round(values[-1] * scale, 4)
+    }
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def write_result(result, path):
+    raw = json.dumps(result, ensure_ascii=False, indent=2)
+    if path in (None, '-'):
+        print(raw)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(raw + '\n')
+        print(f"결과 저장: {path}", file=sys.stderr)
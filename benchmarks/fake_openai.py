@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 로컬 OpenAI chat-completions 대역 서버 (부하 테스트용)
+#
+# POST /v1/chat/completions 에 대해 마지막 메시지 JSON 의 keys (없으면 프롬프트의 "N. 키:" 목록)에 맞는
+# JSON 을 돌려준다. stream=true 이면 SSE 조각으로 보낸다. 지연 시간, 흔들림(jitter), 오류율을 설정할 수 있다.
+#
+# OpenAI 처럼 1024 토큰 이상의 같은 접두어를 128 토큰 단위로 기억해 usage.prompt_tokens_details.cached_tokens 로
+# 알려 준다. --prefill-per-1k 를 주면 캐시되지 않은 프롬프트 1k 토큰마다 첫 응답 전에 그만큼 더 기다린다.
+# 토큰 수는 UTF-8 3바이트를 1토큰으로 어림한다 (한국어 1글자 ≈ 1토큰).
+#
+#   python benchmarks/fake_openai.py --port 8099 --latency 1.5 --jitter 0.5 --error-rate 0.02
+#   OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=fake gunicorn app:app ...
+
+SECTION_RE = re.compile(r'^\d+\. (\w+):', re.MULTILINE)
+DEFAULT_SECTIONS = ['total_summary', 'gmhs', 'daewoon_trend', 'health_analysis', 'social_analysis',
+                    'personality_deep', 'love_romance', 'wealth_strategy', 'today_luck']
+BYTES_PER_TOKEN = 3
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+
+class FakeOpenAIConfig:
+    def __init__(self, latency=1.0, jitter=0.0, error_rate=0.0, chars=400, chunk_chars=20, chunk_delay=0.0,
+                 seed=None, prefill_per_1k=0.0, cache_entries=10000):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.chars = chars
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.prefill_per_1k = prefill_per_1k
+        self.cache_entries = cache_entries
+        self.prefixes = OrderedDict()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def draw(self):
+        # (응답 전 대기 시간, 오류 여부)
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.error_rate
+            self.errors += failed
+        return delay, failed
+
+    def cache(self, prompt):
+        # 이미 본 가장 긴 접두어의 토큰 수 (1024 이상, 128 단위). 이번 프롬프트의 접두어도 모두 기억한다 (LRU).
+        raw = prompt.encode('utf-8')
+        digest = hashlib.sha1()
+        blocks = []
+        start = 0
+        for cut in range(CACHE_MIN_TOKENS * BYTES_PER_TOKEN, len(raw) + 1, CACHE_BLOCK_TOKENS * BYTES_PER_TOKEN):
+            digest.update(raw[start:cut])
+            blocks.append((cut // BYTES_PER_TOKEN, digest.digest()))
+            start = cut
+        cached = 0
+        with self.lock:
+            for tokens, key in blocks:
+                if key in self.prefixes:
+                    cached = tokens
+                self.prefixes[key] = True
+                self.prefixes.move_to_end(key)
+            while len(self.prefixes) > self.cache_entries:
+                self.prefixes.popitem(last=False)
+            self.prompt_tokens += count_tokens(prompt)
+            self.cached_tokens += cached
+        return cached
+
+
+def count_tokens(text):
+    return math.ceil(len(text.encode('utf-8')) / BYTES_PER_TOKEN)
+
+
+def prompt_text(messages):
+    # 접두어 캐시와 토큰 수를 셀 때 쓰는 직렬화 (역할 + 내용, 순서대로)
+    return ''.join(f"{m.get('role', '')}\n{m.get('content', '')}\n" for m in messages)
+
+
+def requested_keys(messages):
+    # 사용자 데이터 JSON 의 keys, 없으면 프롬프트의 "N. 키:" 목록
+    try:
+        keys = json.loads(messages[-1].get('content', '')).get('keys')
+    except (IndexError, ValueError, AttributeError):
+        keys = None
+    if keys:
+        return keys
+    return SECTION_RE.findall('\n'.join(m.get('content', '') for m in messages)) or DEFAULT_SECTIONS
+
+
+def build_content(messages, chars):
+    keys = requested_keys(messages)
+    text = ('가상 분석 문장입니다. ' * (chars // 12 + 1))[:chars]
+    data = {}
+    for key in keys:
+        if key == 'gmhs':
+            data[key] = {period: text for period in ['year', 'month', 'day', 'hour']}
+        else:
+            data[key] = text
+    return json.dumps(data, ensure_ascii=False), count_tokens(prompt_text(messages))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        raw = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json(200, {'requests': self.config.requests, 'errors': self.config.errors,
+                                  'prompt_tokens': self.config.prompt_tokens,
+                                  'cached_tokens': self.config.cached_tokens})
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        delay, failed = self.config.draw()
+        time.sleep(delay)
+        if failed:
+            status = self.config.random.choice([429, 500, 503])
+            self._send_json(status, {'error': {'message': 'fake upstream error', 'type': 'server_error'}})
+            return
+
+        messages = body.get('messages', [])
+        content, prompt_tokens = build_content(messages, self.config.chars)
+        cached_tokens = self.config.cache(prompt_text(messages))
+        if self.config.prefill_per_1k:
+            # 캐시되지 않은 프롬프트를 읽는 시간 (첫 토큰 전에 든다)
+            time.sleep(self.config.prefill_per_1k * (prompt_tokens - cached_tokens) / 1000)
+        completion_tokens = count_tokens(content)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens,
+                 'prompt_tokens_details': {'cached_tokens': cached_tokens}}
+        base = {'id': 'chatcmpl-fake', 'created': int(time.time()), 'model': body.get('model', 'gpt-4o')}
+
+        if not body.get('stream'):
+            self._send_json(200, {**base, 'object': 'chat.completion', 'usage': usage, 'choices': [{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': content}
+            }]})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        step = self.config.chunk_chars
+        for i in range(0, len(content), step):
+            chunk = {**base, 'object': 'chat.completion.chunk', 'choices': [{
+                'index': 0, 'finish_reason': None, 'delta': {'content': content[i:i + step]}
+            }]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            if self.config.chunk_delay:
+                time.sleep(self.config.chunk_delay)
+        last = {**base, 'object': 'chat.completion.chunk', 'usage': usage,
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'delta': {}}]}
+        self.wfile.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def make_server(host='127.0.0.1', port=8099, **config):
+    handler = type('FakeOpenAIHandler', (Handler,), {'config': FakeOpenAIConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI chat-completions 대역 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=1.0, help="응답 전 대기 시간 (초)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="대기 시간 ± 범위 (초)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="429/5xx 응답 비율 (0~1)")
+    parser.add_argument('--chars', type=int, default=400, help="섹션당 글자 수")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="스트리밍 조각 사이 대기 (초)")
+    parser.add_argument('--prefill-per-1k', type=float, default=0.0,
+                        help="캐시되지 않은 프롬프트 1k 토큰당 첫 응답 전 추가 대기 (초)")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                         error_rate=args.error_rate, chars=args.chars, chunk_delay=args.chunk_delay,
+                         seed=args.seed, prefill_per_1k=args.prefill_per_1k)
+    print(f"fake OpenAI: http://{args.host}:{server.server_address[1]}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from common import metadata, summarize, write_result
+
+from chart import Chart, pack_batch
+from gunghap import CompatibilityIndex
+from saju_logic import SajuLogic
+
+# 궁합 상위 k 검색 벤치마크
+#
+# 시드 고정 무작위 출생 정보로 모집단(기본 500만 원국)을 만들고, 색인 생성 시간과
+# 질의(top_k) 지연 시간을 workers 수별로 잰다.
+#   python benchmarks/gunghap.py --population 5000000 --workers 1 4 -o bench-gunghap.json
+
+
+def make_population(size, seed, saju):
+    rng = np.random.default_rng(seed)
+    pillars = saju.get_gan_zhi_batch(rng.integers(1940, 2010, size), rng.integers(1, 13, size),
+                                     rng.integers(1, 29, size), rng.integers(0, 24, size), rng.integers(0, 60, size))
+    return pack_batch(pillars), rng.integers(0, 2, size).astype(np.int8)
+
+
+def run(population=5_000_000, queries=20, k=10, workers=(1,), seed=20240101):
+    saju = SajuLogic(interpret_cache_size=0)
+    codes, genders = make_population(population, seed, saju)
+    started = time.perf_counter()
+    index = CompatibilityIndex(codes, genders, saju)
+    build_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(seed + 1)
+    rows = rng.integers(0, population, queries)
+    benchmarks = {}
+    for count in workers:
+        index.top_k(Chart(int(codes[rows[0]])), k, workers=count)  # 예열 (스레드 풀 생성)
+        samples = []
+        for row in rows:
+            chart = Chart(int(codes[row]))
+            gender = 'female' if genders[row] == 0 else 'male'
+            t0 = time.perf_counter()
+            index.top_k(chart, k, gender=gender, exclude=[int(row)], workers=count)
+            samples.append(time.perf_counter() - t0)
+        benchmarks[f'top_k_workers_{count}'] = summarize(samples)
+    return {
+        'kind': 'gunghap',
+        'meta': {**metadata(), 'population': population, 'queries': queries, 'k': k, 'seed': seed},
+        'index': {'build_seconds': round(build_seconds, 4), 'bytes': index.nbytes()},
+        'benchmarks': benchmarks
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="궁합 상위 k 검색 벤치마크")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument('--population', type=int, default=5_000_000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--seed', type=int, default=20240101)
+    args = parser.parse_args(argv)
+    write_result(run(args.population, args.queries, args.k, sorted(set(args.workers)), args.seed), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import ROOT, metadata, write_result
+from fake_openai import make_server
+
+# 콜드 스타트 시간 예산 검사
+#
+# 새 파이썬 프로세스에서 두 가지를 --runs 번씩 재고 중앙값을 예산과 비교한다. 하나라도 넘으면 종료 코드 1.
+#   1. python -X importtime -c "import app" : app 과 그 아래 모듈을 가져오는 데 걸린 시간 (누적 상위 모듈 포함)
+#   2. 프로세스 시작 → import app → 첫 POST /result 응답까지의 벽시계 시간 (로컬 OpenAI 대역 서버, 지연 0)
+# 또한 import app 만으로 --forbid 모듈(기본: openai, AI_PRELOAD=1 로 잴 때는 검사 안 함)이 올라오면 실패로 본다.
+#   python benchmarks/importtime.py --import-budget-ms 800 --result-budget-ms 2500 -o bench-importtime.json
+#   python benchmarks/importtime.py --preload   (AI_PRELOAD=1: openai 를 import 때 가져오는 경우와 비교)
+
+FORM = {'name': '홍길동', 'gender': 'male', 'birth_date': '1990-05-15', 'birth_time': '10:30'}
+
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+modules = sorted(sys.modules)
+response = app.app.test_client().post('/result', data=json.loads(sys.argv[1]))
+finished = time.perf_counter()
+print(json.dumps({'status': response.status_code, 'import_ms': (imported - started) * 1000,
+                  'request_ms': (finished - imported) * 1000, 'modules': modules}))
+'''
+
+
+def child_env(fake_url, preload):
+    env = dict(os.environ,
+               OPENAI_BASE_URL=fake_url,
+               OPENAI_API_KEY='fake-key',
+               AI_CACHE_ENABLED='0',
+               AI_PRELOAD='1' if preload else '0',
+               METRICS_DIR=tempfile.mkdtemp(prefix='saju-metrics-'))
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+
+def parse_importtime(stderr):
+    # -X importtime 출력 → [(깊이, 모듈, 누적 us)]. 줄 형식: "import time: self | cumulative | <들여쓰기>name"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(parts[1])))
+    return rows
+
+
+def measure_import(env):
+    # (import app 누적 ms, app 바로 아래 모듈별 누적 ms)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    rows = parse_importtime(proc.stderr)
+    total = next(us for depth, name, us in rows if depth == 0 and name == 'app')
+    # 가져온 순서상 app 줄보다 앞에 나오는 깊이 1 줄이 app 이 직접 가져온 모듈이다.
+    app_at = max(i for i, (depth, name, _) in enumerate(rows) if depth == 0 and name == 'app')
+    start = max((i for i, (depth, _, _) in enumerate(rows[:app_at]) if depth == 0), default=-1) + 1
+    children = {name: us / 1000 for depth, name, us in rows[start:app_at] if depth == 1}
+    return total / 1000, children
+
+
+def measure_first_result(env):
+    # 프로세스 시작부터 첫 /result 응답까지 (ms) 와 자식 프로세스가 잰 구간, import app 직후(첫 요청 전) 모듈 목록
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', PROBE, json.dumps(FORM, ensure_ascii=False)], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - started) * 1000
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    if probe['status'] != 200:
+        raise RuntimeError(f"/result 응답 {probe['status']}: {proc.stderr[-500:]}")
+    return wall, probe
+
+
+def run(runs=5, preload=False, forbid=('openai',), top=10):
+    fake = make_server(port=0, latency=0.0)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    try:
+        env = child_env(f'http://127.0.0.1:{fake.server_address[1]}/v1', preload)
+        imports, walls, requests, children = [], [], [], {}
+        loaded = set()
+        for _ in range(runs):
+            total, modules = measure_import(env)
+            imports.append(total)
+            for name, ms in modules.items():
+                children.setdefault(name, []).append(ms)
+            wall, probe = measure_first_result(env)
+            walls.append(wall)
+            requests.append(probe['request_ms'])
+            loaded.update(probe['modules'])
+    finally:
+        fake.shutdown()
+    slowest = sorted(((statistics.median(v), k) for k, v in children.items()), reverse=True)[:top]
+    return {
+        'import_app_ms': round(statistics.median(imports), 1),
+        'first_result_ms': round(statistics.median(walls), 1),
+        'first_request_ms': round(statistics.median(requests), 1),
+        'runs': {'import_app_ms': [round(v, 1) for v in imports], 'first_result_ms': [round(v, 1) for v in walls]},
+        'slowest_imports_ms': {name: round(ms, 1) for ms, name in slowest},
+        'forbidden_loaded': [] if preload else sorted(m for m in forbid if m in loaded)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="콜드 스타트(import app, 첫 /result) 시간 예산 검사")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument('--runs', type=int, default=5, help="측정 횟수 (중앙값 사용)")
+    parser.add_argument('--import-budget-ms', type=float, default=800, help="import app 예산 (0 이면 검사 안 함)")
+    parser.add_argument('--result-budget-ms', type=float, default=2500,
+                        help="프로세스 시작 → 첫 /result 예산 (0 이면 검사 안 함)")
+    parser.add_argument('--forbid', nargs='*', default=['openai'], help="import app 만으로 올라오면 안 되는 모듈")
+    parser.add_argument('--preload', action='store_true', help="AI_PRELOAD=1 로 측정")
+    args = parser.parse_args(argv)
+
+    result = run(max(1, args.runs), args.preload, args.forbid)
+    failures = []
+    if args.import_budget_ms and result['import_app_ms'] > args.import_budget_ms:
+        failures.append(f"import app {result['import_app_ms']}ms > {args.import_budget_ms}ms")
+    if args.result_budget_ms and result['first_result_ms'] > args.result_budget_ms:
+        failures.append(f"첫 /result {result['first_result_ms']}ms > {args.result_budget_ms}ms")
+    if result['forbidden_loaded']:
+        failures.append(f"import app 에서 가져오면 안 되는 모듈: {', '.join(result['forbidden_loaded'])}")
+    write_result({
+        'kind': 'importtime',
+        'meta': {**metadata(), 'runs': args.runs, 'preload': args.preload,
+                 'budget': {'import_app_ms': args.import_budget_ms, 'first_result_ms': args.result_budget_ms}},
+        'result': result,
+        'failures': failures
+    }, args.output)
+    for failure in failures:
+        print(f"예산 초과: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import argparse
+import collections
+import http.client
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from common import ROOT, metadata, summarize, write_result
+from fake_openai import make_server
+from micro import make_corpus
+
+# 종단간 부하 테스트
+#
+# 로컬 OpenAI 대역 서버(fake_openai.py)를 띄우고, 그 주소를 OPENAI_BASE_URL 로 넘겨 gunicorn 으로 앱을 실행한 뒤
+# 여러 스레드에서 POST /result 를 보내 처리량과 p50/p95/p99 를 JSON 으로 남긴다. 네트워크 없이 재현 가능하다.
+#   python benchmarks/load_test.py --concurrency 16 --duration 30 --latency 1.5 --jitter 0.5 -o bench-load.json
+# 이미 떠 있는 서버를 대상으로 하려면 --url 을 준다 (이 경우 대역 서버/gunicorn 을 띄우지 않는다).
+# AI 결과 캐시는 끈 상태(AI_CACHE_ENABLED=0)로 실행하여 매 요청이 LLM 호출을 포함하게 한다.
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not become ready: {url}")
+
+
+def parse_server_timing(header):
+    # 'parse;dur=0.02, llm;dur=1500.1' → {'parse': 0.02, 'llm': 1500.1} (ms)
+    timings = {}
+    for part in (header or '').split(','):
+        name, _, rest = part.strip().partition(';')
+        if rest.startswith('dur='):
+            timings[name] = float(rest[4:])
+    return timings
+
+
+class LoadRunner:
+    def __init__(self, base_url, path, concurrency, duration, requests, corpus):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = path
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.corpus = corpus
+        self._lock = threading.Lock()
+        self._issued = 0
+        self.latencies = []
+        self.statuses = collections.Counter()
+        self.errors = collections.Counter()
+        self.stage_ms = collections.defaultdict(list)
+
+    def _next_index(self):
+        with self._lock:
+            if self.requests and self._issued >= self.requests:
+                return None
+            self._issued += 1
+            return self._issued - 1
+
+    def _worker(self, deadline):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=300)
+        while time.monotonic() < deadline:
+            index = self._next_index()
+            if index is None:
+                break
+            year, month, day, hour, minute, gender = self.corpus[index % len(self.corpus)]
+            body = urllib.parse.urlencode({
+                'name': f'부하{index}', 'gender': gender,
+                'birth_date': f'{year:04d}-{month:02d}-{day:02d}', 'birth_time': f'{hour:02d}:{minute:02d}'
+            })
+            started = time.perf_counter()
+            try:
+                conn.request('POST', self.path, body=body,
+                             headers={'Content-Type': 'application/x-www-form-urlencoded'})
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                with self._lock:
+                    self.errors[type(e).__name__] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=300)
+                continue
+            elapsed = time.perf_counter() - started
+            timings = parse_server_timing(response.getheader('Server-Timing'))
+            with self._lock:
+                self.latencies.append(elapsed)
+                self.statuses[response.status] += 1
+                for name, ms in timings.items():
+                    self.stage_ms[name].append(ms / 1000)
+        conn.close()
+
+    def run(self):
+        deadline = time.monotonic() + (self.duration if self.duration else 1e9)
+        threads = [threading.Thread(target=self._worker, args=(deadline,)) for _ in range(self.concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        ok = sum(count for status, count in self.statuses.items() if status < 400)
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': len(self.latencies) + sum(self.errors.values()),
+            'ok': ok,
+            'throughput_rps': round(ok / elapsed, 3) if elapsed else None,
+            'latency': summarize(self.latencies),
+            'status_counts': {str(k): v for k, v in sorted(self.statuses.items())},
+            'transport_errors': dict(self.errors),
+            'server_timing': {name: summarize(values) for name, values in sorted(self.stage_ms.items())}
+        }
+
+
+def start_app(args, fake_url, port):
+    env = dict(os.environ,
+               OPENAI_BASE_URL=fake_url,
+               OPENAI_API_KEY='fake-key',
+               AI_CACHE_ENABLED='0',
+               METRICS_DIR=tempfile.mkdtemp(prefix='saju-metrics-'))
+    if args.app_cmd:
+        cmd = args.app_cmd.format(port=port).split()
+    else:
+        if shutil.which('gunicorn') is None:
+            raise SystemExit("gunicorn 이 필요합니다 (pip install gunicorn) 또는 --app-cmd / --url 을 지정하세요")
+        cmd = ['gunicorn', 'app:app', '--worker-class', 'gthread', '--threads', str(args.threads),
+               '--workers', str(args.workers), '--bind', f'127.0.0.1:{port}', '--timeout', '300',
+               '--log-level', 'warning']
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="/result 종단간 부하 테스트 (OpenAI 대역 서버 사용)")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument('--url', help="이미 실행 중인 앱 주소 (예: http://127.0.0.1:8000)")
+    parser.add_argument('--path', default='/result', help="요청 경로")
+    parser.add_argument('--concurrency', type=int, default=8, help="동시 요청 수")
+    parser.add_argument('--duration', type=float, default=20, help="실행 시간 (초, 0 이면 --requests 까지)")
+    parser.add_argument('--requests', type=int, default=0, help="총 요청 수 (0 이면 --duration 동안)")
+    parser.add_argument('--port', type=int, default=8765, help="앱 포트")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn 워커 수")
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn 워커당 스레드 수")
+    parser.add_argument('--app-cmd', help="gunicorn 대신 쓸 실행 명령 ({port} 치환)")
+    parser.add_argument('--latency', type=float, default=1.0, help="대역 서버 응답 지연 (초)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="대역 서버 지연 ± 범위 (초)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="대역 서버 429/5xx 비율")
+    parser.add_argument('--seed', type=int, default=20240101)
+    args = parser.parse_args(argv)
+
+    corpus = make_corpus(1000, args.seed)
+    fake = app = None
+    base_url = args.url
+    try:
+        if base_url is None:
+            fake = make_server(port=0, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, seed=args.seed)
+            threading.Thread(target=fake.serve_forever, daemon=True).start()
+            fake_url = f'http://127.0.0.1:{fake.server_address[1]}/v1'
+            app = start_app(args, fake_url, args.port)
+            base_url = f'http://127.0.0.1:{args.port}'
+        wait_ready(base_url + '/')
+        runner = LoadRunner(base_url, args.path, args.concurrency, args.duration, args.requests, corpus)
+        result = runner.run()
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait(timeout=30)
+        if fake is not None:
+            fake.shutdown()
+
+    write_result({
+        'kind': 'load',
+        'meta': {**metadata(), 'url': args.url, 'path': args.path, 'concurrency': args.concurrency,
+                 'duration_s': args.duration, 'workers': args.workers, 'threads': args.threads,
+                 'fake_openai': None if args.url else {
+                     'latency_s': args.latency, 'jitter_s': args.jitter, 'error_rate': args.error_rate,
+                     'requests': fake.RequestHandlerClass.config.requests,
+                     'errors': fake.RequestHandlerClass.config.errors}},
+        'result': result
+    }, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+
+from common import metadata, summarize, write_result
+
+from saju_logic import SajuLogic
+
+# 사주 계산 마이크로 벤치마크
+#
+# 고정된 출생 일시 목록(시드 고정)에 대해 함수별 1회 호출 시간을 재고 처리량과 p50/p95/p99 를 JSON 으로 남긴다.
+#   python benchmarks/micro.py -o bench-micro.json
+# 커밋 간 비교는 같은 --corpus-size / --seed 로 실행한 두 JSON 의 ops_per_sec, p50_us 를 비교한다.
+
+
+def make_corpus(size, seed):
+    rng = random.Random(seed)
+    return [(rng.randint(1900, 2100), rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+             rng.randint(0, 59), rng.choice(['male', 'female'])) for _ in range(size)]
+
+
+def measure(fn, inputs, rounds):
+    # inputs 의 각 항목으로 fn 을 호출하며 호출별 시간을 잰다. 첫 라운드는 예열로 버린다.
+    samples = []
+    started = None
+    for r in range(rounds + 1):
+        if r == 1:
+            started = time.perf_counter()
+        for args in inputs:
+            t0 = time.perf_counter()
+            fn(*args)
+            elapsed = time.perf_counter() - t0
+            if r:
+                samples.append(elapsed)
+    total = time.perf_counter() - started
+    result = summarize(samples, scale=1e6, unit='us')
+    result['ops_per_sec'] = round(len(samples) / total, 1)
+    return result
+
+
+def run(corpus_size=2000, rounds=5, seed=20240101):
+    corpus = make_corpus(corpus_size, seed)
+    saju = SajuLogic()
+    # 캐시 없이 매번 계산하는 경우 (lru_cache(maxsize=0))
+    saju_uncached = SajuLogic(interpret_cache_size=0)
+
+    births = [c[:5] for c in corpus]
+    charts = [(saju.get_gan_zhi(*b),) for b in births]
+    daewoon_args = [(p['year']['gan_idx'], p['month']['gan_idx'], p['month']['zhi_idx'], c[5], c[2],
+                     p['day']['gan_idx']) for (p,), c in zip(charts, corpus)]
+    interpret_args = [(p, saju.get_ohaeng_distribution(p), {'gender': c[5]}) for (p,), c in zip(charts, corpus)]
+
+    benchmarks = {
+        'get_gan_zhi': measure(saju.get_gan_zhi, births, rounds),
+        'get_chart': measure(saju.get_chart, births, rounds),
+        '_get_all_sip_seong': measure(saju._get_all_sip_seong, charts, rounds),
+        'calculate_daewoon_list': measure(saju.calculate_daewoon_list, daewoon_args, rounds),
+        'interpret': measure(saju.interpret, interpret_args, rounds),
+        'interpret_uncached': measure(saju_uncached.interpret, interpret_args, rounds),
+    }
+    return {
+        'kind': 'micro',
+        'meta': {**metadata(), 'corpus_size': corpus_size, 'rounds': rounds, 'seed': seed},
+        'benchmarks': benchmarks
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="사주 계산 마이크로 벤치마크")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument('--corpus-size', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=20240101)
+    args = parser.parse_args(argv)
+    write_result(run(args.corpus_size, args.rounds, args.seed), args.output)
+
+
+if __name__ == '__main__':
+    main()
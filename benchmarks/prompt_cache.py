@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import metadata, summarize, write_result
+from fake_openai import make_server
+
+# 프롬프트 접두어 캐시 벤치마크: 이전 프롬프트 배치(사용자 데이터가 지시문 사이사이에 들어감)와
+# 정적 접두어 + JSON 사용자 데이터 배치를 같은 사용자들로 비교한다.
+#
+# 로컬 OpenAI 대역 서버(fake_openai.py)는 1024 토큰 이상 같은 접두어를 캐시하고, 캐시되지 않은 프롬프트
+# 1k 토큰마다 첫 응답 전에 --prefill-per-1k 초를 더 기다린다. 스트리밍 호출(_stream_single)의
+# 첫 토큰까지 시간(TTFT) p50/p95, 토큰 수(prompt/cached/completion)와 가격표에 따른 비용을 잰다.
+#   python benchmarks/prompt_cache.py --users 200 --concurrency 4 --prefill-per-1k 0.3 -o bench-prompt-cache.json
+
+os.environ.update(OPENAI_API_KEY='fake', AI_CACHE_ENABLED='0', AI_COALESCE='0')
+os.environ.pop('AI_RPM', None)
+os.environ.pop('AI_TPM', None)
+
+import app  # noqa: E402
+from ai_analysis import AIAnalysis, SECTION_SPECS  # noqa: E402
+
+# 100만 토큰당 달러 (gpt-4o: 입력, 캐시된 입력, 출력)
+PRICES = {'prompt': 2.50, 'cached': 1.25, 'completion': 10.00}
+NAMES = ['김민준', '이서연', '박지호', '최수아', '정예준', '강하윤', '윤도윤', '장지유']
+
+
+class LegacyPromptAnalysis(AIAnalysis):
+    # 비교 기준: 접두어를 나누기 전의 프롬프트 배치 (이름, 생년, 대운이 지시문 곳곳에 들어간다)
+    def _build_messages(self, name, gender, pillars, ohaeng, ten_stars_list, current_daewun, birth_context,
+                        sections=None):
+        ohaeng_str = ", ".join([f"{k}({v}%)" for k, v in ohaeng['percentages'].items()])
+        pillars_summary = " ".join(f"{label}:[{pillars[key]['gan']}{pillars[key]['zhi']}]" for label, key in
+                                   (('연', 'year'), ('월', 'month'), ('일', 'day'), ('시', 'hour')))
+        specs = [(key, text) for key, text in SECTION_SPECS if sections is None or key in sections]
+        roadmap = "\n".join(
+            f"{i}. {key}: {text.replace('{current_daewun}', str(current_daewun))}"
+            for i, (key, text) in enumerate(specs, 1)
+        )
+        prompt = f"""
+# Role: 2030 맞춤형 라이프 전략가 & 현대 명리학 마스터
+당신은 사용자의 '{birth_context}'라는 생애 주기적 배경을 깊이 고려하여 조언하는 전문 분석가입니다.
+
+# Input Data
+- 이름: {name}, 성별: {gender}, 나이/생년: {birth_context}
+- 본원(일간): {pillars['day']['gan']}
+- 사주 원국: {pillars_summary}
+- 십신 구성: {ten_stars_list}
+- 오행 점수: {ohaeng_str}
+- 현재 대운: {current_daewun}
+
+# Analysis Roadmap & Output JSON Structure
+모든 답변은 다음 키를 가진 JSON 형식으로 출력하세요. 각 필드는 예시처럼 **최소 8~12문장 이상의 풍부한 장문**으로, 사용자가 읽었을 때 전율이 느껴질 정도의 깊이 있는 서술형으로 작성하세요.
+
+{roadmap}
+
+# Instruction for Quality
+1. [Tone]: 전문 용어(십성, 오행 등)를 현대적인 심리학 용어와 비유(예: 단단한 원석, 촉촉한 단비)로 풀어내어 공감을 극대화하세요.
+2. [Volume]: 각 칸을 채우는 텍스트는 단순히 정보를 주는 게 아니라, 한 권의 자기계발서나 위로의 편지처럼 느껴지도록 풍성하게 작성하세요.
+3. [Context]: 사용자의 연령({birth_context})을 고려하여 현재 가장 고민할 법한 지점을 정확히 짚어주세요.
+"""
+        return [
+            {"role": "system", "content": "당신은 현대적 감각을 가진 사주 분석 전문가입니다. 반드시 JSON 형식으로만 답변하며, 값은 항상 문자열이어야 합니다."},
+            {"role": "user", "content": prompt}
+        ]
+
+
+def make_users(count, seed):
+    rng = random.Random(seed)
+    users = []
+    for _ in range(count):
+        chart = app.build_chart({
+            'name': rng.choice(NAMES),
+            'gender': rng.choice(['male', 'female']),
+            'birth_date': f"{rng.randint(1950, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'birth_time': f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+        })
+        users.append(chart['ai_args'][:7])
+    return users
+
+
+def run_variant(cls, users, concurrency, server_config):
+    # 접두어 캐시가 비어 있는 새 대역 서버로 모든 사용자를 한 번씩 스트리밍 분석한다.
+    fake = make_server(port=0, **server_config)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{fake.server_address[1]}/v1"
+    ai = cls()
+    ttft, total = [], []
+    failures = 0
+
+    def one(args):
+        started = time.perf_counter()
+        first = None
+        for event in ai._stream_single(*args):
+            if first is None and event['type'] == 'delta':
+                first = time.perf_counter() - started
+        return first, time.perf_counter() - started
+
+    try:
+        # 호출마다 찍는 토큰 로그가 결과 JSON(표준 출력)에 섞이지 않게 한다.
+        with contextlib.redirect_stdout(sys.stderr), ThreadPoolExecutor(concurrency) as pool:
+            for first, seconds in pool.map(one, users):
+                if first is None:
+                    failures += 1
+                    continue
+                ttft.append(first)
+                total.append(seconds)
+    finally:
+        fake.shutdown()
+        fake.server_close()
+
+    tokens = {'prompt': 0, 'cached': 0, 'completion': 0}
+    for counts in ai.token_stats()['calls'].values():
+        for kind in tokens:
+            tokens[kind] += counts[kind]
+    # 접두어 캐시는 입력 비용만 줄이므로 입력 비용을 따로 보여 준다.
+    prompt_cost = ((tokens['prompt'] - tokens['cached']) * PRICES['prompt']
+                   + tokens['cached'] * PRICES['cached']) / 1_000_000
+    cost = prompt_cost + tokens['completion'] * PRICES['completion'] / 1_000_000
+    return {
+        'requests': len(users),
+        'failures': failures,
+        'ttft': summarize(ttft),
+        'total': summarize(total),
+        'tokens': tokens,
+        'cached_ratio': round(tokens['cached'] / tokens['prompt'], 3) if tokens['prompt'] else 0.0,
+        'prompt_cost_usd': round(prompt_cost, 6),
+        'cost_usd': round(cost, 6),
+        'cost_usd_per_1k_requests': round(cost / len(users) * 1000, 4)
+    }
+
+
+def run(users=200, concurrency=4, seed=20240101, **server_config):
+    inputs = make_users(users, seed)
+    results = {}
+    for name, cls in (('legacy', LegacyPromptAnalysis), ('prefix', AIAnalysis)):
+        results[name] = run_variant(cls, inputs, concurrency, {**server_config, 'seed': seed})
+        row = results[name]
+        print(f"{name:>6}: TTFT p50 {row['ttft'].get('p50_ms')} ms, p95 {row['ttft'].get('p95_ms')} ms, "
+              f"cached {row['cached_ratio']:.0%}, ${row['cost_usd_per_1k_requests']}/1k", file=sys.stderr)
+    legacy, prefix = results['legacy'], results['prefix']
+    if legacy['ttft'].get('count') and prefix['ttft'].get('count'):
+        results['ttft_p50_ratio'] = round(prefix['ttft']['p50_ms'] / legacy['ttft']['p50_ms'], 3)
+    if legacy['cost_usd']:
+        results['prompt_cost_ratio'] = round(prefix['prompt_cost_usd'] / legacy['prompt_cost_usd'], 3)
+        results['cost_ratio'] = round(prefix['cost_usd'] / legacy['cost_usd'], 3)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="프롬프트 접두어 캐시 TTFT/비용 벤치마크")
+    parser.add_argument('-o', '--output', default='-', help="결과 JSON 경로 (기본: 표준 출력)")
+    parser.add_argument('--users', type=int, default=200, help="서로 다른 사용자(원국) 수")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.2, help="대역 서버 기본 응답 지연 (초)")
+    parser.add_argument('--prefill-per-1k', type=float, default=0.3,
+                        help="캐시되지 않은 프롬프트 1k 토큰당 추가 지연 (초)")
+    parser.add_argument('--chars', type=int, default=400, help="섹션당 글자 수")
+    parser.add_argument('--seed', type=int, default=20240101)
+    args = parser.parse_args(argv)
+    server_config = {'latency': args.latency, 'prefill_per_1k': args.prefill_per_1k, 'chars': args.chars}
+    write_result({
+        'kind': 'prompt_cache',
+        'meta': {**metadata(), 'users': args.users, 'concurrency': args.concurrency, 'seed': args.seed,
+                 'prices_per_1m': PRICES, **server_config},
+        'result': run(args.users, args.concurrency, args.seed, **server_config)
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import numpy as np
+
+# 간결한 원국 표현
+#
+# get_gan_zhi() 의 원국은 기둥마다 6개 키를 가진 dict 4개로 되어 있어, 분석/캐시용으로
+# 수백만 개를 메모리에 들고 있으면 원국 하나에 약 2KB 가 든다.
+# 여기서는 기둥을 60갑자 인덱스(0~59) 하나로, 원국을 그 4개를 6비트씩 묶은 24비트 정수 하나로 나타낸다.
+# 천간/지지 글자와 오행은 조회표로 구한다. 템플릿과 AIAnalysis 에는 to_dict() 로 기존 dict 를 만들어 넘긴다.
+#
+#   Chart.code = 년 | 월 << 6 | 일 << 12 | 시 << 18   (각 0~59)
+#
+# 대량 보관 시에는 pack_batch() 로 uint32 배열(원국당 4바이트)을 쓴다.
+
+# SajuLogic.CHEONGAN / JIJI / STEM_OHAENG / BRANCH_OHAENG 과 같은 순서
+STEMS = ('갑', '을', '병', '정', '무', '기', '경', '신', '임', '계')
+BRANCHES = ('자', '축', '인', '묘', '진', '사', '오', '미', '신', '유', '술', '해')
+STEM_ELEMENTS = ('wood', 'wood', 'fire', 'fire', 'earth', 'earth', 'metal', 'metal', 'water', 'water')
+BRANCH_ELEMENTS = ('water', 'earth', 'wood', 'wood', 'earth', 'fire', 'fire', 'earth', 'metal', 'metal', 'earth', 'water')
+
+PILLAR_KEYS = ('year', 'month', 'day', 'hour')
+
+# 60갑자 인덱스 → 천간/지지 인덱스
+CYCLE_STEM = tuple(i % 10 for i in range(60))
+CYCLE_BRANCH = tuple(i % 12 for i in range(60))
+# (천간 * 12 + 지지) → 60갑자 인덱스. 천간과 지지의 음양이 다르면 -1 (존재하지 않는 간지)
+CYCLE_INDEX = tuple((6 * s - 5 * b) % 60 if s % 2 == b % 2 else -1 for s in range(10) for b in range(12))
+# 60갑자 인덱스 → get_gan_zhi() 기둥 dict (to_dict 에서 복사해서 쓴다)
+PILLAR_DICTS = tuple({
+    'gan': STEMS[i % 10],
+    'zhi': BRANCHES[i % 12],
+    'gan_idx': i % 10,
+    'zhi_idx': i % 12,
+    'gan_element': STEM_ELEMENTS[i % 10],
+    'zhi_element': BRANCH_ELEMENTS[i % 12]
+} for i in range(60))
+
+
+def cycle_index(stem_idx, branch_idx):
+    index = CYCLE_INDEX[stem_idx * 12 + branch_idx]
+    if index < 0:
+        raise ValueError(f"invalid stem/branch pair: {stem_idx}, {branch_idx}")
+    return index
+
+
+class Pillar:
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def from_stem_branch(cls, stem_idx, branch_idx):
+        return cls(cycle_index(stem_idx, branch_idx))
+
+    @property
+    def gan_idx(self):
+        return CYCLE_STEM[self.index]
+
+    @property
+    def zhi_idx(self):
+        return CYCLE_BRANCH[self.index]
+
+    @property
+    def gan(self):
+        return STEMS[CYCLE_STEM[self.index]]
+
+    @property
+    def zhi(self):
+        return BRANCHES[CYCLE_BRANCH[self.index]]
+
+    @property
+    def gan_element(self):
+        return STEM_ELEMENTS[CYCLE_STEM[self.index]]
+
+    @property
+    def zhi_element(self):
+        return BRANCH_ELEMENTS[CYCLE_BRANCH[self.index]]
+
+    def to_dict(self):
+        return dict(PILLAR_DICTS[self.index])
+
+    def __eq__(self, other):
+        return isinstance(other, Pillar) and other.index == self.index
+
+    def __hash__(self):
+        return self.index
+
+    def __repr__(self):
+        return f"Pillar({self.gan}{self.zhi})"
+
+
+class Chart:
+    __slots__ = ('code',)
+
+    def __init__(self, code):
+        self.code = code
+
+    @classmethod
+    def from_indices(cls, year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi):
+        return cls(cycle_index(year_gan, year_zhi)
+                   | cycle_index(month_gan, month_zhi) << 6
+                   | cycle_index(day_gan, day_zhi) << 12
+                   | cycle_index(hour_gan, hour_zhi) << 18)
+
+    @classmethod
+    def from_pillars(cls, pillars):
+        # get_gan_zhi() 형식의 dict 에서 만든다.
+        return cls.from_indices(*(pillars[k][f] for k in PILLAR_KEYS for f in ('gan_idx', 'zhi_idx')))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(int.from_bytes(data, 'little'))
+
+    def to_bytes(self):
+        # 4바이트 레코드 (little endian)
+        return self.code.to_bytes(4, 'little')
+
+    def cycle_indices(self):
+        # (년, 월, 일, 시) 60갑자 인덱스
+        code = self.code
+        return code & 63, code >> 6 & 63, code >> 12 & 63, code >> 18 & 63
+
+    def __getitem__(self, key):
+        return Pillar(self.code >> 6 * PILLAR_KEYS.index(key) & 63)
+
+    @property
+    def year(self):
+        return Pillar(self.code & 63)
+
+    @property
+    def month(self):
+        return Pillar(self.code >> 6 & 63)
+
+    @property
+    def day(self):
+        return Pillar(self.code >> 12 & 63)
+
+    @property
+    def hour(self):
+        return Pillar(self.code >> 18 & 63)
+
+    def to_dict(self):
+        # 템플릿/API 경계용. get_gan_zhi() 와 같은 형식의 dict 를 새로 만든다.
+        return {key: dict(PILLAR_DICTS[index]) for key, index in zip(PILLAR_KEYS, self.cycle_indices())}
+
+    def __eq__(self, other):
+        return isinstance(other, Chart) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+    def __repr__(self):
+        return "Chart(" + " ".join(f"{p.gan}{p.zhi}" for p in map(self.__getitem__, PILLAR_KEYS)) + ")"
+
+
+# 배치용 numpy 조회표
+_CYCLE_INDEX_TABLE = np.array(CYCLE_INDEX, dtype=np.int32)
+
+
+def pack_batch(pillars):
+    # get_gan_zhi_batch() 결과를 uint32 Chart.code 배열로 묶는다 (원국당 4바이트).
+    code = np.zeros(len(pillars['year']['gan_idx']), dtype=np.uint32)
+    for shift, key in zip((0, 6, 12, 18), PILLAR_KEYS):
+        index = _CYCLE_INDEX_TABLE[pillars[key]['gan_idx'].astype(np.int32) * 12 + pillars[key]['zhi_idx']]
+        code |= index.astype(np.uint32) << shift
+    return code
+
+
+def unpack_batch(codes):
+    # pack_batch() 의 역. {'year': {'gan_idx': int8[N], 'zhi_idx': int8[N]}, ...}
+    codes = np.asarray(codes, dtype=np.uint32)
+    cycle_stem = np.array(CYCLE_STEM, dtype=np.int8)
+    cycle_branch = np.array(CYCLE_BRANCH, dtype=np.int8)
+    pillars = {}
+    for shift, key in zip((0, 6, 12, 18), PILLAR_KEYS):
+        index = (codes >> shift) & 63
+        pillars[key] = {'gan_idx': cycle_stem[index], 'zhi_idx': cycle_branch[index]}
+    return pillars
@@ -0,0 +1,247 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from saju_logic import SajuLogic
+
+# 오늘의 운세 일괄 생성 (하루 한 번, cron 등으로 실행)
+#
+# 오늘의 운세는 날짜와 일간(10가지)으로만 정해지므로 일간별 운세를 먼저 한 번씩 만들어 두고,
+# 저장된 사용자 목록(CSV/NDJSON 파일 또는 SQLite 테이블)을 한 번 훑으며 사용자마다 푸시 알림용 NDJSON 한 줄을 쓴다.
+# 일간은 생년월일(양력)만으로 정해지므로 (2000-01-01 = 무오일) 출생 시각이나 절기 계산은 하지 않으며,
+# 같은 생년월일은 한 번만 계산한다 (200년이라도 7만여 가지).
+#
+#   python daily_fortune.py users.csv -o fortunes.ndjson
+#   python daily_fortune.py --sqlite users.db --table users -o fortunes.ndjson --date 2024-05-01
+#   crontab: 0 6 * * * cd /srv/byeolha && python daily_fortune.py users.csv -o /data/push/fortune-$(date +\%F).ndjson
+#
+# 입력 필드: id, name(선택), birth_date(YYYY-MM-DD). 파일은 한 줄에 한 레코드여야 한다 (CSV 는 첫 줄이 헤더).
+# 출력 한 줄: {"id", "name", "day_master", "day": "YYYY-MM-DD", "date", "pillar", "title", "desc"}
+#            잘못된 레코드는 건너뛰고 개수만 센다.
+#
+# 입력을 블록 단위로 읽어 바로 써 내므로 메모리 사용량은 사용자 수와 무관하다.
+# 체크포인트(기본: 출력 경로 + '.ckpt')에 입력 위치(파일 바이트 위치 / SQLite rowid)와 출력 크기를 주기적으로 저장하므로,
+# 중단 후 같은 명령을 다시 실행하면 출력 파일을 체크포인트 시점 크기로 자르고 그 위치부터 이어서 처리한다.
+
+FORMATS = ('csv', 'ndjson')
+# 파일 입력을 한 번에 읽는 크기 (바이트) / SQLite 에서 한 번에 가져오는 행 수
+BLOCK_BYTES = 1 << 20
+BLOCK_ROWS = 20000
+# 2000-01-01 (무오일, 일간 4) 의 서수
+REF_ORDINAL = datetime.date(2000, 1, 1).toordinal()
+
+
+def make_day_master_lookup():
+    # 생년월일 문자열 → 일간 인덱스 (잘못된 날짜면 None). 결과를 기억해 두고 다시 쓴다.
+    cache = {}
+
+    def lookup(birth_date):
+        stem = cache.get(birth_date, -1)
+        if stem == -1:
+            try:
+                stem = (4 + datetime.date.fromisoformat(str(birth_date)).toordinal() - REF_ORDINAL) % 10
+            except ValueError:
+                stem = None
+            cache[birth_date] = stem
+        return stem
+
+    return lookup
+
+
+def payload_tails(saju, day):
+    # 일간별 출력 줄의 공통 뒷부분 (', "day_master": ..., "desc": "..."}\n'). 사용자마다 앞부분만 붙인다.
+    tails = []
+    for day_master, fortune in enumerate(saju.get_daily_fortunes(day)):
+        body = {'day_master': saju.CHEONGAN[day_master], 'day': day.isoformat(), **fortune}
+        tails.append(', ' + json.dumps(body, ensure_ascii=False)[1:] + '\n')
+    return tails
+
+
+def render_block(records, tails, lookup):
+    # [(id, name, birth_date), ...] → (UTF-8 NDJSON 바이트, 건너뛴 수)
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    lines = []
+    skipped = 0
+    for record_id, name, birth_date in records:
+        stem = lookup(birth_date) if record_id not in (None, '') else None
+        if stem is None:
+            skipped += 1
+            continue
+        lines.append(f'{{"id": {dumps(record_id)}, "name": {dumps(name)}{tails[stem]}')
+    return ''.join(lines).encode('utf-8'), skipped
+
+
+def file_blocks(path, fmt, offset):
+    # (레코드 목록, 다음 블록의 바이트 위치, 형식 오류 수) 를 차례로 내보낸다. offset 은 이어서 읽을 위치.
+    with open(path, 'rb') as f:
+        if fmt == 'csv':
+            header = next(csv.reader([f.readline().decode('utf-8-sig')]), [])
+            header = [name.strip() for name in header]
+            missing = [name for name in ('id', 'birth_date') if name not in header]
+            if missing:
+                raise ValueError(f"missing CSV columns: {', '.join(missing)}")
+            id_col, date_col = header.index('id'), header.index('birth_date')
+            name_col = header.index('name') if 'name' in header else None
+            width = max(id_col, date_col, name_col or 0) + 1
+            offset = max(offset, f.tell())
+        f.seek(offset)
+        while True:
+            lines = f.readlines(BLOCK_BYTES)
+            if not lines:
+                return
+            offset += sum(map(len, lines))
+            records = []
+            errors = 0
+            if fmt == 'csv':
+                for row in csv.reader(line.decode('utf-8', 'replace') for line in lines):
+                    if not row:
+                        continue
+                    if len(row) < width:
+                        errors += 1
+                        continue
+                    records.append((row[id_col].strip(), row[name_col].strip() if name_col is not None else '',
+                                    row[date_col].strip()))
+            else:
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        records.append((record.get('id'), record.get('name', ''), record['birth_date']))
+                    except (ValueError, KeyError, AttributeError):
+                        errors += 1
+            yield records, offset, errors
+
+
+def sqlite_blocks(path, table, last_rowid):
+    # (레코드 목록, 마지막 rowid, 0) 을 차례로 내보낸다. rowid 순으로 읽으므로 last_rowid 다음부터 이어진다.
+    if not table.isidentifier():
+        raise ValueError(f"invalid table name: {table}")
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        query = f'SELECT rowid, id, name, birth_date FROM "{table}" WHERE rowid > ? ORDER BY rowid LIMIT ?'
+        while True:
+            rows = conn.execute(query, (last_rowid, BLOCK_ROWS)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [(record_id, name or '', birth_date) for _, record_id, name, birth_date in rows], last_rowid, 0
+    finally:
+        conn.close()
+
+
+def load_checkpoint(path, key):
+    # 같은 날짜/입력/출력의 체크포인트만 쓴다.
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('key') == key else None
+
+
+def save_checkpoint(path, state):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run(blocks, out, state, tails, progress, checkpoint_path, checkpoint_every, progress_interval):
+    # blocks 를 처리하며 out 에 쓰고 state 를 갱신한다. progress(state) 는 진행률 문자열 (예: "42.5%")
+    lookup = make_day_master_lookup()
+    started = time.perf_counter()
+    start_written = state['written']
+    last_report = started
+    since_checkpoint = 0
+    for records, position, errors in blocks:
+        data, skipped = render_block(records, tails, lookup)
+        out.write(data)
+        state['position'] = position
+        state['output_bytes'] += len(data)
+        state['written'] += len(records) - skipped
+        state['skipped'] += skipped + errors
+        since_checkpoint += len(records) + errors
+        if since_checkpoint >= checkpoint_every:
+            _checkpoint(out, checkpoint_path, state)
+            since_checkpoint = 0
+        now = time.perf_counter()
+        if now - last_report >= progress_interval:
+            last_report = now
+            rate = (state['written'] - start_written) / (now - started)
+            print(f"{state['written']:,}건 ({progress(state)}), 건너뜀 {state['skipped']:,}, {rate:,.0f}건/s",
+                  file=sys.stderr)
+    state['done'] = True
+    _checkpoint(out, checkpoint_path, state)
+    return time.perf_counter() - started
+
+
+def _checkpoint(out, path, state):
+    # 출력이 디스크에 내려간 뒤에 위치를 기록해야 이어서 실행할 때 줄이 빠지거나 겹치지 않는다.
+    out.flush()
+    os.fsync(out.fileno())
+    save_checkpoint(path, state)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="사용자 전체의 오늘의 운세 푸시용 NDJSON 생성")
+    parser.add_argument('input', nargs='?', help="사용자 파일 (CSV/NDJSON)")
+    parser.add_argument('--sqlite', help="사용자 SQLite 데이터베이스 (input 대신)")
+    parser.add_argument('--table', default='users', help="SQLite 테이블 (id, name, birth_date 열)")
+    parser.add_argument('-f', '--format', choices=FORMATS, help="입력 파일 형식 (기본: 확장자로 판단, 없으면 csv)")
+    parser.add_argument('-o', '--output', help="출력 NDJSON 경로 (기본: fortunes-<날짜>.ndjson)")
+    parser.add_argument('--date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="운세 날짜 YYYY-MM-DD (기본: 오늘)")
+    parser.add_argument('--checkpoint', help="체크포인트 경로 (기본: 출력 경로 + .ckpt)")
+    parser.add_argument('--checkpoint-every', type=int, default=500000, help="체크포인트 간격 (레코드)")
+    parser.add_argument('--progress-interval', type=float, default=5.0, help="진행 상황 출력 간격 (초)")
+    parser.add_argument('--restart', action='store_true', help="체크포인트를 무시하고 처음부터")
+    args = parser.parse_args(argv)
+    if bool(args.input) == bool(args.sqlite):
+        parser.error("input 파일 또는 --sqlite 중 하나를 지정하세요")
+    if not args.table.isidentifier():
+        parser.error(f"잘못된 테이블 이름: {args.table}")
+
+    output = args.output or f'fortunes-{args.date.isoformat()}.ndjson'
+    checkpoint_path = args.checkpoint or f'{output}.ckpt'
+    source = os.path.abspath(args.sqlite or args.input)
+    key = [args.date.isoformat(), source, args.table if args.sqlite else None, os.path.abspath(output)]
+    state = None if args.restart else load_checkpoint(checkpoint_path, key)
+    if state and state.get('done'):
+        print(f"이미 완료됨: {output} ({state['written']:,}건)", file=sys.stderr)
+        return 0
+    if state and not os.path.exists(output):
+        state = None
+    if state:
+        print(f"체크포인트에서 이어서 실행: {state['written']:,}건 이후", file=sys.stderr)
+    else:
+        state = {'key': key, 'position': 0, 'output_bytes': 0, 'written': 0, 'skipped': 0, 'done': False}
+
+    if args.sqlite:
+        with sqlite3.connect(f'file:{args.sqlite}?mode=ro', uri=True) as conn:
+            max_rowid = conn.execute(f'SELECT max(rowid) FROM "{args.table}"').fetchone()[0] or 0
+        blocks = sqlite_blocks(args.sqlite, args.table, state['position'])
+        progress = lambda s: f"{s['position'] / max_rowid:.1%}" if max_rowid else '-'
+    else:
+        fmt = args.format or ('ndjson' if args.input.endswith(('.ndjson', '.jsonl')) else 'csv')
+        size = os.path.getsize(args.input)
+        blocks = file_blocks(args.input, fmt, state['position'])
+        progress = lambda s: f"{s['position'] / size:.1%}" if size else '-'
+
+    tails = payload_tails(SajuLogic(interpret_cache_size=0), args.date)
+    with open(output, 'r+b' if state['output_bytes'] else 'wb') as out:
+        out.truncate(state['output_bytes'])
+        out.seek(state['output_bytes'])
+        elapsed = run(blocks, out, state, tails, progress, checkpoint_path, max(1, args.checkpoint_every),
+                      args.progress_interval)
+    print(f"{state['written']:,}건 생성 (건너뜀 {state['skipped']:,}), {elapsed:.1f}s → {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
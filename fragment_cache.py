@@ -0,0 +1,56 @@
+import os
+import threading
+from collections import OrderedDict
+
+# 결과 화면 조각(HTML) 캐시
+#
+# result.html 중 원국으로만 정해지는 부분(사주 원국표와 십성, 10년 대운 목록)은 templates/partials/ 의 조각
+# 템플릿으로 나누어 두고, 렌더링한 문자열을 (조각 이름, 원국 키) 로 프로세스 메모리에 LRU 로 보관한다.
+# 원국 키는 규칙 판(RULESET_VERSION) + Chart.code + 성별이라 이름이나 AI 결과와 무관하다.
+# 같은 원국을 다시 보면 조각 템플릿을 렌더링하지 않고 저장된 문자열을 끼워 넣는다.
+
+
+class FragmentCache:
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        # FRAGMENT_CACHE_SIZE=0 이면 캐시를 쓰지 않는다 (None 반환).
+        size = int(os.getenv('FRAGMENT_CACHE_SIZE', 2048))
+        return cls(size) if size > 0 else None
+
+    def get_or_render(self, name, key, render):
+        # 저장된 조각이 있으면 돌려주고, 없으면 render() 결과를 저장하고 돌려준다.
+        # 같은 조각을 동시에 처음 렌더링하면 둘 다 렌더링한다 (결과가 같으므로 나중 것이 덮어써도 된다).
+        cache_key = (name, key)
+        with self._lock:
+            html = self._entries.get(cache_key)
+            if html is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = render()
+        with self._lock:
+            self._entries[cache_key] = html
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': sum(len(html) for html in self._entries.values())
+            }
@@ -0,0 +1,161 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from chart import Chart
+from saju_logic import SajuLogic
+
+# 궁합 상위 k 검색 (대량 원국 모집단)
+#
+# 모집단은 chart.pack_batch() 의 uint32 Chart.code 배열이다 (np.save 로 저장한 .npy 는 load() 로 mmap 해서 연다).
+# SajuLogic.get_compatibility 점수는 상대 원국의 (일주, 년주) 와 오행 개수에만 의존하므로 색인을 만들 때 원국마다
+#   pair = 성별 * 3600 + 일주 60갑자 * 60 + 년주 60갑자   (uint16)
+#   comp = 오행 개수 조합 번호                             (uint16, 8글자를 5오행에 나누는 495가지)
+# 두 열만 뽑아 둔다 (원국당 4바이트). 질의 때는 기준 원국에 대한 pair / comp 점수표(uint8)를 만든 뒤
+#   점수 = pair_table[pair] + comp_table[comp]
+# 로 모집단 전체를 한 번에 계산한다. 성별 조건은 원하지 않는 성별 칸을 0 으로 둔 점수표로 처리한다 (추가 비용 없음).
+# 점수가 작은 정수(0~255)라서 상위 k 는 argpartition 대신 최댓값부터 문턱을 내려가며 개수를 세어 고르고
+# (대개 한두 번이면 끝난다) 문턱 이상인 행만 정렬한다.
+# workers > 1 이면 행을 나눠 스레드로 계산한다 (numpy 조회/비교는 GIL 을 놓으므로 코어 수만큼 빨라진다).
+
+GENDER_CODES = {'male': 0, 'female': 1}
+# 색인 열을 만들 때 한 번에 처리하는 행 수 (임시 배열 크기 제한)
+BUILD_CHUNK = 1 << 20
+
+
+def _compositions(total, parts):
+    if parts == 1:
+        yield (total,)
+        return
+    for first in range(total + 1):
+        for rest in _compositions(total - first, parts - 1):
+            yield (first,) + rest
+
+
+# 조합 번호 → 오행 개수 (wood, fire, earth, metal, water). 오행당 4비트로 묶은 값 → 조합 번호
+COMPOSITIONS = np.array(list(_compositions(8, 5)), dtype=np.int16)
+_PACK_SHIFTS = 4 * np.arange(5)
+COMPOSITION_ID = np.full(1 << 20, 0xFFFF, dtype=np.uint16)
+COMPOSITION_ID[(COMPOSITIONS.astype(np.int32) << _PACK_SHIFTS).sum(axis=1)] = np.arange(len(COMPOSITIONS))
+
+
+class CompatibilityIndex:
+    def __init__(self, codes, genders=None, saju=None):
+        # codes: uint32 Chart.code 배열, genders: 선택, 행마다 GENDER_CODES 값 (0 남, 1 여)
+        self.saju = saju or SajuLogic(interpret_cache_size=0)
+        cycle = np.arange(60)
+        # 60갑자 → 그 기둥의 오행 개수 (4비트 묶음)
+        self._cycle_packed = self.saju.PILLAR_OHAENG_PACKED[cycle % 10 * 12 + cycle % 12].astype(np.int32)
+        codes = np.asarray(codes, dtype=np.uint32)
+        self.size = len(codes)
+        if genders is not None:
+            genders = np.asarray(genders, dtype=np.int8)
+            if len(genders) != self.size:
+                raise ValueError("genders must have one entry per chart")
+            if self.size and not ((genders == 0) | (genders == 1)).all():
+                raise ValueError("genders must be 0 (male) or 1 (female)")
+        self.has_genders = genders is not None
+        self.pair = np.empty(self.size, dtype=np.uint16)
+        self.comp = np.empty(self.size, dtype=np.uint16)
+        for start in range(0, self.size, BUILD_CHUNK):
+            chunk = codes[start:start + BUILD_CHUNK]
+            year, month, day, hour = ((chunk >> shift & 63).astype(np.int32) for shift in (0, 6, 12, 18))
+            pair = day * 60 + year
+            if genders is not None:
+                pair += genders[start:start + len(chunk)].astype(np.int32) * 3600
+            self.pair[start:start + len(chunk)] = pair
+            packed = (self._cycle_packed[year] + self._cycle_packed[month]
+                      + self._cycle_packed[day] + self._cycle_packed[hour])
+            self.comp[start:start + len(chunk)] = COMPOSITION_ID[packed]
+        # 정상 점수의 최솟값. 걸러진 행(성별 불일치, 제외)은 오행 점수(최대 GUNGHAP_ELEMENT_MAX)만 남거나 0 이라 이보다 낮다.
+        s = self.saju
+        self.floor = (s.GUNGHAP_BASE + int(s.GUNGHAP_STEM_POINTS.min()) + int(s.GUNGHAP_DAY_BRANCH_POINTS.min())
+                      + int(s.GUNGHAP_YEAR_BRANCH_POINTS.min()))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, genders_path=None, saju=None):
+        # np.save 로 저장한 Chart.code (.npy) 를 mmap 으로 읽어 색인을 만든다.
+        codes = np.load(path, mmap_mode='r')
+        genders = np.load(genders_path, mmap_mode='r') if genders_path else None
+        return cls(codes, genders, saju)
+
+    def nbytes(self):
+        return self.pair.nbytes + self.comp.nbytes
+
+    def _tables(self, chart, gender=None):
+        # 기준 원국에 대한 (pair 점수표, comp 점수표). 둘을 더하면 get_compatibility(기준, 상대)['score']
+        # gender 가 주어지면 다른 성별 칸은 0 이다.
+        if not isinstance(chart, Chart):
+            chart = Chart.from_pillars(chart)
+        year, _, day, _ = chart.cycle_indices()
+        s = self.saju
+        cycle = np.arange(60)
+        day_points = s.GUNGHAP_STEM_POINTS[day % 10, cycle % 10] + s.GUNGHAP_DAY_BRANCH_POINTS[day % 12, cycle % 12]
+        year_points = s.GUNGHAP_YEAR_BRANCH_POINTS[year % 12, cycle % 12]
+        table = (s.GUNGHAP_BASE + day_points[:, None] + year_points[None, :]).ravel().astype(np.uint8)
+        if self.has_genders:
+            halves = [table, table] if gender is None else [np.zeros_like(table)] * 2
+            if gender is not None:
+                halves[GENDER_CODES[gender]] = table
+            table = np.concatenate(halves)
+        own = COMPOSITIONS[COMPOSITION_ID[sum(self._cycle_packed[i] for i in chart.cycle_indices())]]
+        comp_table = s.gunghap_element_points(COMPOSITIONS + own).astype(np.uint8)
+        return table, comp_table
+
+    def scores(self, chart):
+        # 모집단 전체의 궁합 점수 (uint8[size])
+        pair_table, comp_table = self._tables(chart)
+        scores = pair_table.take(self.pair)
+        scores += comp_table.take(self.comp)
+        return scores
+
+    def top_k(self, chart, k=10, gender=None, exclude=(), workers=1):
+        # 점수가 높은 k 개의 (행 번호 배열, 점수 배열). 점수 내림차순, 같은 점수는 행 번호 순.
+        # gender: 이 성별(GENDER_CODES 키)인 행만, exclude: 제외할 행 번호 (예: 본인)
+        if gender is not None and not self.has_genders:
+            raise ValueError("index was built without genders")
+        tables = self._tables(chart, gender)
+        exclude = np.asarray(sorted(exclude), dtype=np.int64)
+        k = max(0, min(k, self.size))
+        workers = max(1, min(workers, self.size // BUILD_CHUNK + 1))
+        bounds = np.linspace(0, self.size, workers + 1, dtype=np.int64)
+        parts = list(zip(bounds[:-1], bounds[1:]))
+        if workers == 1:
+            found = [self._top_k_range(tables, k, exclude, *parts[0])]
+        else:
+            executor = self._get_executor(workers)
+            found = list(executor.map(lambda part: self._top_k_range(tables, k, exclude, *part), parts))
+        rows = np.concatenate([rows for rows, _ in found])
+        scores = np.concatenate([scores for _, scores in found]).astype(np.int16)
+        order = np.lexsort((rows, -scores))[:k]
+        return rows[order], scores[order]
+
+    def _top_k_range(self, tables, k, exclude, lo, hi):
+        # [lo, hi) 행의 상위 k 개 (같은 점수는 앞 행 우선). 합치면 전체 순서와 같아진다.
+        pair_table, comp_table = tables
+        scores = pair_table.take(self.pair[lo:hi])
+        scores += comp_table.take(self.comp[lo:hi])
+        skip = exclude[(exclude >= lo) & (exclude < hi)]
+        scores[skip - lo] = 0
+        if not k or not len(scores):
+            return np.empty(0, dtype=np.int64), scores[:0]
+        threshold = int(scores.max())
+        while threshold > self.floor and np.count_nonzero(scores >= threshold) < k:
+            threshold -= 1
+        threshold = max(threshold, self.floor)
+        rows = np.flatnonzero(scores >= threshold)
+        picked = scores[rows]
+        above = rows[picked > threshold]
+        rows = np.concatenate([above, rows[picked == threshold][:k - len(above)]])
+        return rows + lo, scores[rows]
+
+    def _get_executor(self, workers):
+        with self._executor_lock:
+            if self._executor is None or self._executor._max_workers < workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gunghap')
+            return self._executor
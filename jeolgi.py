@@ -0,0 +1,264 @@
+import bisect
+import datetime
+import math
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# 24절기 사전 계산표 (1900~2100년)
+#
+# data/jeolgi.bin 에 절기 시각을 "1900-01-01 00:00 UTC 기준 분" 단위의
+# int32 리틀엔디언 배열로 저장해 두고, 런타임에는 mmap 으로 열어
+# 이분 탐색(bisect / searchsorted)만 수행한다. 요청마다 천문 계산을 하지 않는다.
+#
+# 파일 구조: 16바이트 헤더 + int32[years * 24]
+#   헤더 = magic(b'JEOL'), version(u16), first_year(u16), years(u16), terms(u16), reserved(u32)
+#   각 해의 24개 절기는 소한(태양 황경 285°)부터 동지(270°)까지 시간 순서로 들어 있다.
+
+JEOLGI_NAMES = [
+    '소한', '대한', '입춘', '우수', '경칩', '춘분', '청명', '곡우',
+    '입하', '소만', '망종', '하지', '소서', '대서', '입추', '처서',
+    '백로', '추분', '한로', '상강', '입동', '소설', '대설', '동지'
+]
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'jeolgi.bin')
+TABLE_VERSION = 1
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+HEADER = struct.Struct('<4sHHHHI')
+
+# 입력 시각은 한국 표준시(UTC+9)로 간주한다.
+KST_OFFSET_MIN = 9 * 60
+# 1900-01-01의 proleptic 그레고리력 서수 (datetime.date.toordinal)
+EPOCH_ORDINAL = 693596
+
+# 절기 번호(소한=0) → 그 절기부터 시작되는 월지. 중기(홀수 번호)는 직전 절입의 월을 그대로 따른다.
+# 소한=축(1), 입춘=인(2), 경칩=묘(3), ... 대설=자(0)
+TERM_MONTH_BRANCH = [(k // 2 + 1) % 12 for k in range(24)]
+
+_table = None
+_view = None
+
+
+def _open_table(path=TABLE_PATH):
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, first_year, years, terms, _ = HEADER.unpack_from(mm, 0)
+    if magic != b'JEOL' or version != TABLE_VERSION or terms != 24:
+        raise ValueError(f"jeolgi table format mismatch: {path}")
+    # 스칼라 조회용 memoryview (bisect 가능) 와 배치 조회용 numpy 뷰를 같은 mmap 위에 둔다.
+    view = memoryview(mm)[HEADER.size:HEADER.size + years * terms * 4].cast('i')
+    array = np.frombuffer(mm, dtype='<i4', count=years * terms, offset=HEADER.size)
+    return {'mmap': mm, 'view': view, 'array': array, 'first_year': first_year, 'years': years,
+            'day_index': None}
+
+
+def get_table():
+    global _table, _view
+    if _table is None:
+        _table = _open_table()
+        _view = _table['view']
+    return _table
+
+
+def _get_day_index(table):
+    # 배치 조회용 일(日) 단위 색인. 절기 사이 간격은 14일 이상이라 하루에 절기가 최대 하나뿐이므로
+    # (그날 0시 직전 절기 인덱스, 그 다음 절기 시각) 두 배열만 있으면 searchsorted 없이 O(1)로 찾는다.
+    if table['day_index'] is None:
+        arr = table['array']
+        day_starts = np.arange(arr[-1] // 1440 + 1, dtype=np.int64) * 1440
+        base = (np.searchsorted(arr, day_starts, side='right') - 1).astype(np.int32)
+        upcoming = arr[np.minimum(base + 1, len(arr) - 1)]
+        table['day_index'] = (base, upcoming)
+    return table['day_index']
+
+
+def to_minutes(year, month, day, hour, minute):
+    # 한국 표준시 → 1900-01-01 00:00 UTC 기준 분
+    days = datetime.date(year, month, day).toordinal() - EPOCH_ORDINAL
+    return days * 1440 + hour * 60 + minute - KST_OFFSET_MIN
+
+
+def from_minutes(minutes):
+    # to_minutes 의 역변환 (한국 표준시 datetime)
+    return datetime.datetime(FIRST_YEAR, 1, 1) + datetime.timedelta(minutes=int(minutes) + KST_OFFSET_MIN)
+
+
+def find_term(minutes):
+    # 주어진 시각 직전(같은 분 포함)에 들어온 절기의 표 인덱스. 표 범위 밖이면 None.
+    view = _view if _view is not None else get_table()['view']
+    i = bisect.bisect_right(view, minutes) - 1
+    if i < 0 or i >= len(view) - 1:
+        return None
+    return i
+
+
+def saju_year_month(year, month, day, hour, minute):
+    # 절기 기준 (사주 년도, 월지 인덱스). 표 범위(1900 소한 ~ 2100 동지) 밖이면 None.
+    i = find_term(to_minutes(year, month, day, hour, minute))
+    if i is None:
+        return None
+    year_offset, term = divmod(i, 24)
+    calc_year = FIRST_YEAR + year_offset - (1 if term < 2 else 0)
+    return calc_year, TERM_MONTH_BRANCH[term]
+
+
+def saju_year_month_batch(minutes):
+    # saju_year_month 의 배치 버전. (사주 년도, 월지, 표 범위 안 여부) 배열을 돌려준다.
+    table = get_table()
+    base, upcoming = _get_day_index(table)
+    minutes = np.asarray(minutes, dtype=np.int64)
+    day = minutes // 1440
+    in_day_range = (day >= 0) & (day < len(base))
+    day = np.where(in_day_range, day, 0)
+    i = base[day] + (minutes >= upcoming[day])
+    in_range = in_day_range & (i >= 0) & (i < len(table['array']) - 1)
+    i = np.where(in_range, i, 0)
+    year_offset = i // 24
+    term = i - year_offset * 24
+    calc_year = table['first_year'] + year_offset - (term < 2)
+    branch = np.array(TERM_MONTH_BRANCH, dtype=np.int8)[term]
+    return calc_year, branch, in_range
+
+
+def term_name(index):
+    return JEOLGI_NAMES[index % 24]
+
+
+def term_minutes(index):
+    return get_table()['view'][index]
+
+
+# ---------------------------------------------------------------------------
+# 표 생성 (오프라인 전용). `python jeolgi.py` 로 data/jeolgi.bin 을 다시 만든다.
+# Meeus, "Astronomical Algorithms" 의 VSOP87 축약 급수와
+# Espenak-Meeus ΔT 다항식을 사용한다. 정밀도는 대략 ±1분 수준이다.
+# ---------------------------------------------------------------------------
+
+JD_EPOCH_1900 = 2415020.5  # 1900-01-01 00:00 UTC
+
+
+def _delta_t_seconds(year):
+    # Espenak & Meeus (2006) ΔT 다항식, 1900~2150 구간
+    if year < 1920:
+        t = year - 1900
+        return -2.79 + 1.494119 * t - 0.0598939 * t ** 2 + 0.0061966 * t ** 3 - 0.000197 * t ** 4
+    if year < 1941:
+        t = year - 1920
+        return 21.20 + 0.84493 * t - 0.076100 * t ** 2 + 0.0020936 * t ** 3
+    if year < 1961:
+        t = year - 1950
+        return 29.07 + 0.407 * t - t ** 2 / 233 + t ** 3 / 2547
+    if year < 1986:
+        t = year - 1975
+        return 45.45 + 1.067 * t - t ** 2 / 260 - t ** 3 / 718
+    if year < 2005:
+        t = year - 2000
+        return 63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3 + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5
+    if year < 2050:
+        t = year - 2000
+        return 62.92 + 0.32217 * t + 0.005589 * t ** 2
+    return -20 + 32 * ((year - 1820) / 100) ** 2 - 0.5628 * (2150 - year)
+
+
+# VSOP87 지구 일심 황경 급수 (Meeus 표 32.A 의 주요 항). (A, B, C) → A·cos(B + C·τ)
+_VSOP_L = [
+    [(175347046, 0, 0), (3341656, 4.6692568, 6283.0758500), (34894, 4.62610, 12566.15170),
+     (3497, 2.7441, 5753.3849), (3418, 2.8289, 3.5231), (3136, 3.6277, 77713.7715),
+     (2676, 4.4181, 7860.4194), (2343, 6.1352, 3930.2097), (1324, 0.7425, 11506.7698),
+     (1273, 2.0371, 529.6910), (1199, 1.1096, 1577.3435), (990, 5.233, 5884.927),
+     (902, 2.045, 26.298), (857, 3.508, 398.149), (780, 1.179, 5223.694),
+     (753, 2.533, 5507.553), (505, 4.583, 18849.228), (492, 4.205, 775.523),
+     (357, 2.920, 0.067), (317, 5.849, 11790.629), (284, 1.899, 796.298),
+     (271, 0.315, 10977.079), (243, 0.345, 5486.778), (206, 4.806, 2544.314),
+     (205, 1.869, 5573.143), (202, 2.458, 6069.777), (156, 0.833, 213.299),
+     (132, 3.411, 2942.463), (126, 1.083, 20.775), (115, 0.645, 0.980),
+     (103, 0.636, 4694.003), (102, 0.976, 15720.839), (102, 4.267, 7.114),
+     (99, 6.21, 2146.17), (98, 0.68, 155.42), (86, 5.98, 161000.69),
+     (85, 1.30, 6275.96), (85, 3.67, 71430.70), (80, 1.81, 17260.15),
+     (79, 3.04, 12036.46), (75, 1.76, 5088.63), (74, 3.50, 3154.69),
+     (74, 4.68, 801.82), (70, 0.83, 9437.76), (62, 3.98, 8827.39),
+     (61, 1.82, 7084.90), (57, 2.78, 6286.60), (56, 4.39, 14143.50),
+     (56, 3.47, 6279.55), (52, 0.19, 12139.55), (52, 1.33, 1748.02),
+     (51, 0.28, 5856.48), (49, 0.49, 1194.45), (41, 5.37, 8429.24),
+     (41, 2.40, 19651.05), (39, 6.17, 10447.39), (37, 6.04, 10213.29),
+     (37, 2.57, 1059.38), (36, 1.71, 2352.87), (36, 1.78, 6812.77),
+     (33, 0.59, 17789.85), (30, 0.44, 83996.85), (30, 2.74, 1349.87),
+     (25, 3.16, 4690.48)],
+    [(628331966747, 0, 0), (206059, 2.678235, 6283.075850), (4303, 2.6351, 12566.1517),
+     (425, 1.590, 3.523), (119, 5.796, 26.298), (109, 2.966, 1577.344),
+     (93, 2.59, 18849.23), (72, 1.14, 529.69), (68, 1.87, 398.15),
+     (67, 4.41, 5507.55), (59, 2.89, 5223.69), (56, 2.17, 155.42),
+     (45, 0.40, 796.30), (36, 0.47, 775.52), (29, 2.65, 7.11),
+     (21, 5.34, 0.98), (19, 1.85, 5486.78), (19, 4.97, 213.30),
+     (17, 2.99, 6275.96), (16, 0.03, 2544.31), (16, 1.43, 2146.17),
+     (15, 1.21, 10977.08), (12, 2.83, 1748.02), (12, 3.26, 5088.63),
+     (12, 5.27, 1194.45), (12, 2.08, 4694.00), (11, 0.77, 553.57),
+     (10, 1.30, 6286.60), (10, 4.24, 1349.87), (9, 2.70, 242.73),
+     (9, 5.64, 951.72), (8, 5.30, 2352.87), (6, 2.65, 9437.76),
+     (6, 4.67, 4690.48)],
+    [(52919, 0, 0), (8720, 1.0721, 6283.0758), (309, 0.867, 12566.152),
+     (27, 0.05, 3.52), (16, 5.19, 26.30), (16, 3.68, 155.42),
+     (10, 0.76, 18849.23), (9, 2.06, 77713.77), (7, 0.83, 775.52),
+     (5, 4.66, 1577.34), (4, 1.03, 7.11), (4, 3.44, 5573.14),
+     (3, 5.14, 796.30), (3, 6.05, 5507.55), (3, 1.19, 242.73),
+     (3, 6.12, 529.69), (3, 0.31, 398.15), (3, 2.28, 553.57),
+     (2, 4.38, 5223.69), (2, 3.75, 0.98)],
+    [(289, 5.844, 6283.076), (35, 0, 0), (17, 5.49, 12566.15),
+     (3, 5.20, 155.42), (1, 4.72, 3.52), (1, 5.30, 18849.23),
+     (1, 5.97, 242.73)],
+    [(114, 3.142, 0), (8, 4.13, 6283.08), (1, 3.84, 12566.15)],
+    [(1, 3.14, 0)],
+]
+
+
+def _sun_apparent_longitude(jde):
+    # 태양의 겉보기 황경(도). VSOP87 + FK5 보정 + 장동 + 광행차 (Meeus 25장 고정밀 방법)
+    tau = (jde - 2451545.0) / 365250.0
+    lon = 0.0
+    for power, series in enumerate(_VSOP_L):
+        lon += sum(a * math.cos(b + c * tau) for a, b, c in series) * tau ** power
+    sun = math.degrees(lon / 1e8) + 180.0
+    t = tau * 10
+    sun -= 0.09033 / 3600.0
+    omega = math.radians(125.04452 - 1934.136261 * t)
+    l_sun = math.radians(280.4665 + 36000.7698 * t)
+    l_moon = math.radians(218.3165 + 481267.8813 * t)
+    nutation = (-17.20 * math.sin(omega) - 1.32 * math.sin(2 * l_sun)
+                - 0.23 * math.sin(2 * l_moon) + 0.21 * math.sin(2 * omega))
+    return (sun + (nutation - 20.4898) / 3600.0) % 360.0
+
+
+def _solve_term(year, k):
+    # k번째 절기(소한=0)의 UTC 율리우스일
+    target = (285 + 15 * k) % 360
+    jd = JD_EPOCH_1900 + (year - 1900) * 365.2422 + 5 + k * 15.2
+    for _ in range(50):
+        jde = jd + _delta_t_seconds(2000.0 + (jd - 2451545.0) / 365.25) / 86400.0
+        diff = (target - _sun_apparent_longitude(jde) + 180.0) % 360.0 - 180.0
+        jd += diff * 365.2422 / 360.0
+        if abs(diff) < 1e-7:
+            break
+    return jd
+
+
+def build_table(path=TABLE_PATH, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+    years = last_year - first_year + 1
+    values = []
+    for year in range(first_year, last_year + 1):
+        for k in range(24):
+            values.append(int(round((_solve_term(year, k) - JD_EPOCH_1900) * 1440)))
+    if any(b <= a for a, b in zip(values, values[1:])):
+        raise ValueError("jeolgi table is not strictly increasing")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(b'JEOL', TABLE_VERSION, first_year, years, 24, 0))
+        f.write(struct.pack(f'<{len(values)}i', *values))
+    return len(values)
+
+
+if __name__ == '__main__':
+    count = build_table()
+    print(f"{count}개 절기를 {TABLE_PATH} 에 저장했습니다.")
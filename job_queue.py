@@ -0,0 +1,168 @@
+import collections
+import inspect
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# AI 분석 작업 큐
+#
+# /api/jobs 요청은 사주 계산만 즉시 끝내고, 오래 걸리는 AI 분석은 이 큐의
+# 백그라운드 스레드에서 실행한다. 동시에 실행되는 작업 수(max_workers)와
+# 대기 작업 수(max_queue)를 제한하여 LLM 호출이 몰려도 메모리/연결이 무한히 늘지 않게 한다.
+# 작업 상태는 프로세스 메모리에만 보관하므로 같은 워커에서 조회해야 한다 (Procfile 참고).
+#
+# 작업 함수가 제너레이터이면 내보내는 이벤트를 (번호, 이벤트) 로 job['events'] 에 차례로 쌓아 두고
+# (SSE 로 전달하기 위함), {'type': 'done', 'result': ...} 이벤트의 값을 최종 결과로 삼는다.
+# 섹션이 완성되면({'type': 'section', 'path': ...}) 그 섹션의 delta 이벤트는 지운다. 완성된 섹션 이벤트가
+# 글 전체를 담고 있으므로, 작업을 보관하는 동안(job_ttl) 토큰 조각마다 이벤트가 남지 않는다.
+# 이벤트 번호는 지워도 바뀌지 않으므로 SSE 재연결(Last-Event-ID)은 번호로 이어 간다.
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, max_queue=32, job_ttl=3600, latency_window=500):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-job')
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs = {}
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        # 최근 작업의 (대기 시간, 실행 시간, 전체 시간) 기록
+        self._latencies = collections.deque(maxlen=latency_window)
+
+    def submit(self, context, fn, *args):
+        # context: 결과 화면에 필요한 결정적 계산 결과. fn(*args)의 반환값이 job['result']가 된다.
+        # 대기열이 가득 차면 작업을 실행하지 않고 'rejected' 상태로 바로 끝낸다 (AI 없이 기본 해석만 표시).
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'context': context,
+            'result': None,
+            'events': [],
+            'next_event': 0,
+            'error': None,
+            'created_at': now,
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            self._expire(now)
+            self._jobs[job_id] = job
+            if self._queued >= self.max_queue:
+                job['status'] = 'rejected'
+                job['finished_at'] = now
+                self._rejected += 1
+                return job
+            self._queued += 1
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+        try:
+            result = fn(*args)
+            if inspect.isgenerator(result):
+                result = self._consume(job, result)
+            error = None
+        except Exception as e:
+            result = None
+            error = str(e)
+            print(f"AI 작업 오류 ({job['id']}): {e}")
+        with self._lock:
+            now = time.time()
+            self._running -= 1
+            job['result'] = result
+            job['error'] = error
+            job['finished_at'] = now
+            job['status'] = 'done' if error is None else 'failed'
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._latencies.append((
+                job['started_at'] - job['created_at'],
+                now - job['started_at'],
+                now - job['created_at']
+            ))
+            self._changed.notify_all()
+
+    def _consume(self, job, events):
+        result = None
+        for event in events:
+            if event.get('type') == 'done':
+                result = event.get('result')
+                continue
+            with self._lock:
+                if event.get('type') == 'section':
+                    job['events'] = [(seq, e) for seq, e in job['events']
+                                     if not (e.get('type') == 'delta' and e.get('path') == event.get('path'))]
+                job['events'].append((job['next_event'], event))
+                job['next_event'] += 1
+                self._changed.notify_all()
+        return result
+
+    def wait_events(self, job, cursor, timeout):
+        # 번호가 cursor 이상인 이벤트를 돌려준다. 새 이벤트가 없으면 작업이 끝나거나 timeout 이 될 때까지 기다린다.
+        # (timeout=0 이면 기다리지 않는다. ASGI 모드의 SSE 는 이렇게 조회하고 이벤트 루프에서 쉰다.)
+        # 반환값: ([(번호, 이벤트), ...], 작업 종료 여부)
+        with self._lock:
+            if job['next_event'] <= cursor and job['finished_at'] is None and timeout > 0:
+                self._changed.wait(timeout)
+            return [(seq, e) for seq, e in job['events'] if seq >= cursor], job['finished_at'] is not None
+
+    def _expire(self, now):
+        # 끝난 지 job_ttl 이 지난 작업은 메모리에서 지운다 (호출자가 lock 을 잡고 있어야 함)
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and now - job['finished_at'] > self.job_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            stats = {
+                'queue_depth': self._queued,
+                'in_flight': self._running,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'tracked_jobs': len(self._jobs)
+            }
+        for i, name in enumerate(['queue_wait', 'run', 'total']):
+            values = sorted(row[i] for row in latencies)
+            stats[f'{name}_seconds'] = _summarize(values)
+        return stats
+
+
+def _summarize(values):
+    if not values:
+        return {'count': 0, 'avg': None, 'p50': None, 'p95': None, 'max': None}
+
+    def pct(p):
+        return round(values[min(len(values) - 1, int(p * len(values)))], 3)
+
+    return {
+        'count': len(values),
+        'avg': round(sum(values) / len(values), 3),
+        'p50': pct(0.50),
+        'p95': pct(0.95),
+        'max': round(values[-1], 3)
+    }
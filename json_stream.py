@@ -0,0 +1,180 @@
+import json
+
+# 스트리밍용 점진적 JSON 파서
+#
+# LLM 이 토큰 단위로 보내는 JSON 텍스트를 조각(chunk)마다 feed() 하면
+# - 값이 끝난 잎(leaf) 값은 ('value', 경로, 값)
+# - 아직 끝나지 않은 문자열 값은 이번 조각에서 새로 해독된 부분을 ('delta', 경로, 텍스트)
+# 이벤트로 돌려준다. 경로는 'gmhs.year' 처럼 객체 키(배열은 인덱스)를 점으로 이은 문자열이다.
+# 문서 전체가 끝나기 전에도 섹션별로 바로 화면에 보여줄 수 있게 하기 위한 것이다.
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_WHITESPACE = ' \t\r\n'
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        # 컨테이너 스택: [종류('object'/'array'), 현재 키 또는 인덱스, 기대 상태]
+        # 기대 상태: 'key' | 'colon' | 'value' | 'comma'
+        self._stack = []
+        self._in_string = False
+        self._string_is_key = False
+        self._buf = []
+        self._escape = None  # None | '' (역슬래시 직후) | 'uXXXX' 수집 중
+        self._pending_surrogate = None
+        self._scalar = []
+        self._delta_start = 0
+        self.done = False
+
+    def feed(self, text):
+        events = []
+        for ch in text:
+            if self._in_string:
+                self._feed_string_char(ch, events)
+            else:
+                self._feed_structural_char(ch, events)
+        # 이번 조각에서 늘어난 문자열 값 부분을 delta 로 내보낸다.
+        if self._in_string and not self._string_is_key and len(self._buf) > self._delta_start:
+            events.append(('delta', self._path(), ''.join(self._buf[self._delta_start:])))
+            self._delta_start = len(self._buf)
+        return events
+
+    def _path(self):
+        return '.'.join(str(frame[1]) for frame in self._stack)
+
+    def _feed_string_char(self, ch, events):
+        if self._escape is not None:
+            if self._escape == '':
+                if ch == 'u':
+                    self._escape = 'u'
+                    return
+                if ch not in _ESCAPES:
+                    raise JSONStreamError(f"invalid escape: \\{ch}")
+                self._append_char(_ESCAPES[ch])
+                self._escape = None
+                return
+            self._escape += ch
+            if len(self._escape) == 5:
+                code = int(self._escape[1:], 16)
+                self._escape = None
+                if 0xD800 <= code <= 0xDBFF:
+                    self._pending_surrogate = code
+                elif 0xDC00 <= code <= 0xDFFF and self._pending_surrogate is not None:
+                    high = self._pending_surrogate
+                    self._pending_surrogate = None
+                    self._append_char(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+                else:
+                    self._append_char(chr(code))
+            return
+        if ch == '\\':
+            self._escape = ''
+        elif ch == '"':
+            self._in_string = False
+            value = ''.join(self._buf)
+            if self._string_is_key:
+                self._stack[-1][1] = value
+                self._stack[-1][2] = 'colon'
+            else:
+                self._complete_value(value, events)
+        else:
+            self._append_char(ch)
+
+    def _append_char(self, ch):
+        if self._pending_surrogate is not None:
+            # 짝이 없는 상위 서로게이트는 그대로 둔다 (json.loads 와 동일)
+            self._buf.append(chr(self._pending_surrogate))
+            self._pending_surrogate = None
+        self._buf.append(ch)
+
+    def _feed_structural_char(self, ch, events):
+        if self._scalar:
+            if ch in _WHITESPACE or ch in ',}]':
+                self._finish_scalar(events)
+            else:
+                self._scalar.append(ch)
+                return
+        if ch in _WHITESPACE:
+            return
+        if self.done:
+            raise JSONStreamError("trailing data after JSON document")
+
+        frame = self._stack[-1] if self._stack else None
+        state = frame[2] if frame else 'value'
+
+        if state == 'key':
+            if ch == '"':
+                self._start_string(is_key=True)
+            elif ch == '}' and frame[1] is None:
+                self._close_container(events)
+            else:
+                raise JSONStreamError(f"expected object key, got {ch!r}")
+        elif state == 'colon':
+            if ch != ':':
+                raise JSONStreamError(f"expected ':', got {ch!r}")
+            frame[2] = 'value'
+        elif state == 'comma':
+            if ch == ',':
+                if frame[0] == 'object':
+                    frame[2] = 'key'
+                else:
+                    frame[1] += 1
+                    frame[2] = 'value'
+            elif (ch == '}' and frame[0] == 'object') or (ch == ']' and frame[0] == 'array'):
+                self._close_container(events)
+            else:
+                raise JSONStreamError(f"expected ',' or end of container, got {ch!r}")
+        else:
+            if ch == '{':
+                self._stack.append(['object', None, 'key'])
+            elif ch == '[':
+                self._stack.append(['array', 0, 'value'])
+            elif ch == ']' and frame and frame[0] == 'array' and frame[1] == 0:
+                self._close_container(events)
+            elif ch == '"':
+                self._start_string(is_key=False)
+            elif ch in '-0123456789tfn':
+                self._scalar.append(ch)
+            else:
+                raise JSONStreamError(f"unexpected character {ch!r}")
+
+    def _start_string(self, is_key):
+        self._in_string = True
+        self._string_is_key = is_key
+        self._buf = []
+        self._delta_start = 0
+
+    def _finish_scalar(self, events):
+        raw = ''.join(self._scalar)
+        self._scalar = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            raise JSONStreamError(f"invalid literal: {raw!r}")
+        self._complete_value(value, events)
+
+    def _complete_value(self, value, events):
+        events.append(('value', self._path(), value))
+        self._after_value()
+
+    def _close_container(self, events):
+        self._stack.pop()
+        self._after_value()
+
+    def _after_value(self):
+        if self._stack:
+            self._stack[-1][2] = 'comma'
+        else:
+            self.done = True
+
+    def close(self):
+        # 스트림 끝. 최상위 숫자 등 구분자 없이 끝난 값을 마무리하고 문서가 완전한지 확인한다.
+        events = []
+        if self._scalar:
+            self._finish_scalar(events)
+        if not self.done or self._in_string:
+            raise JSONStreamError("incomplete JSON document")
+        return events
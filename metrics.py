@@ -0,0 +1,243 @@
+import atexit
+import bisect
+import contextlib
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+
+from flask import g, has_request_context
+
+# 구간별 지연 시간 계측 (Server-Timing 헤더, /metrics)
+#
+# stage('interpret') 처럼 감싼 구간의 시간을
+# - 요청 처리 중이면 g.server_timing 에 모아 응답의 Server-Timing 헤더로 내보내고
+# - 항상 saju_stage_seconds 히스토그램에 누적한다 (백그라운드 작업 스레드에서도 동작).
+#
+# gunicorn 워커가 여러 개여도 /metrics 가 전체 합계를 보여주도록, 프로세스마다 자기 값을
+# METRICS_DIR/metrics-<pid>.json 에 주기적으로(flush_interval 초) 저장하고, /metrics 는
+# 살아 있는 프로세스의 파일을 모두 읽어 합친다. 종료된 프로세스의 파일은 지운다 (카운터가 리셋된 것으로 보임).
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'metrics')
+# 초 단위 히스토그램 경계 (LLM 호출까지 포함하도록 120초까지)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    'saju_request_seconds': ('histogram', "HTTP 요청 전체 처리 시간 (초)"),
+    'saju_requests_total': ('counter', "HTTP 요청 수"),
+    'saju_stage_seconds': ('histogram', "요청 처리 구간별 시간 (초)"),
+    'saju_llm_seconds': ('histogram', "OpenAI 호출 시간 (초)"),
+    'saju_llm_errors_total': ('counter', "OpenAI 호출 실패 수 (kind=timeout|error)"),
+    'saju_llm_ttft_seconds': ('histogram', "스트리밍 OpenAI 호출의 첫 토큰까지 시간 (초)"),
+    'saju_llm_tokens_total': ('counter',
+                              "OpenAI 사용 토큰 수 (call, kind=prompt|cached|completion, cached 는 prompt 중 "
+                              "접두어 캐시 적중분)"),
+    'saju_ai_leaders_total': ('counter', "직접 LLM 을 호출한 AI 분석 요청 수 (single-flight leader)"),
+    'saju_ai_coalesced_total': ('counter', "다른 요청의 결과를 함께 받은 AI 분석 요청 수 (scope=local|remote)"),
+    'saju_ai_policy_events_total': ('counter',
+                                    "AI 호출 정책 이벤트 수 (event=retries|hedges|hedges_won|short_circuited|"
+                                    "deadline_exceeded)"),
+    'saju_ai_breaker_transitions_total': ('counter', "AI 서킷 브레이커 상태 전환 수 (state=open|half_open|closed)"),
+    'saju_ai_queue_wait_seconds': ('histogram', "AI 호출 입장 대기 시간 (초, priority, outcome=admitted|rejected)"),
+    'saju_ai_admission_total': ('counter', "AI 호출 입장 결과 수 (priority, outcome=admitted|rejected)"),
+}
+
+
+class Metrics:
+    def __init__(self, directory=DEFAULT_DIR, buckets=DEFAULT_BUCKETS, flush_interval=1.0):
+        self.directory = directory
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        # (이름, 라벨 튜플) → [버킷별 개수..., 합계, 개수] / 카운터 값
+        self._histograms = {}
+        self._counters = {}
+        self._dirty = False
+        self._last_flush = 0.0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls):
+        # METRICS_DIR 이 빈 문자열이면 파일을 쓰지 않는다 (단일 프로세스 값만 보임)
+        return cls(directory=os.getenv('METRICS_DIR', DEFAULT_DIR),
+                   flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0)))
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            row = self._histograms.get(key)
+            if row is None:
+                row = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            row[bisect.bisect_left(self.buckets, seconds)] += 1
+            row[-2] += seconds
+            row[-1] += 1
+            self._dirty = True
+        self._maybe_flush()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._dirty = True
+        self._maybe_flush()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe('saju_stage_seconds', elapsed, stage=name)
+            if has_request_context():
+                g.setdefault('server_timing', []).append((name, elapsed))
+
+    def _maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def _snapshot(self):
+        return {
+            'histograms': [[name, list(labels), row] for (name, labels), row in self._histograms.items()],
+            'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+        }
+
+    def flush(self):
+        if not self.directory:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._dirty:
+                return
+            self._dirty = False
+            raw = json.dumps(self._snapshot())
+        path = self._path(os.getpid())
+        tmp = f'{path}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                f.write(raw)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"메트릭 저장 오류: {e}")
+
+    def _collect(self):
+        # 이 프로세스와 살아 있는 다른 프로세스의 값을 합친다.
+        with self._lock:
+            snapshots = [self._snapshot()]
+        if self.directory:
+            for filename in os.listdir(self.directory):
+                if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                    continue
+                pid = int(filename[len('metrics-'):-len('.json')])
+                if pid == os.getpid():
+                    continue
+                path = os.path.join(self.directory, filename)
+                if not _pid_alive(pid):
+                    with contextlib.suppress(OSError):
+                        os.remove(path)
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+        histograms, counters = {}, {}
+        for snap in snapshots:
+            for name, labels, row in snap['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(row))
+                for i, value in enumerate(row):
+                    total[i] += value
+            for name, labels, value in snap['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render(self):
+        # Prometheus 텍스트 형식 (text/plain; version=0.0.4)
+        histograms, counters = self._collect()
+        lines = []
+        for name, (kind, text) in HELP.items():
+            series = histograms if kind == 'histogram' else counters
+            keys = sorted(key for key in series if key[0] == name)
+            if not keys:
+                continue
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in keys:
+                labels = key[1]
+                if kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {series[key]}')
+                    continue
+                row = series[key]
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), row):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {round(row[-2], 6)}')
+                lines.append(f'{name}_count{_labels(labels)} {row[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, le=None):
+    pairs = list(labels)
+    if le is not None:
+        pairs.append(('le', le))
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RequestProfiler:
+    # 요청 일부(sample_rate)만 cProfile 로 감싸 PROFILE_DIR 에 .prof 파일로 남긴다.
+    # 결과 확인: python -m pstats <파일> 또는 snakeviz 등
+    def __init__(self, sample_rate=0.0, directory=None):
+        self.sample_rate = sample_rate
+        self.directory = directory or os.path.join(os.path.dirname(DEFAULT_DIR), 'profiles')
+
+    @classmethod
+    def from_env(cls):
+        return cls(sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+                   directory=os.getenv('PROFILE_DIR'))
+
+    def start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 다른 요청이 이미 프로파일링 중인 경우 (Python 3.12+ 는 프로파일러를 하나만 허용)
+            return None
+        return profile
+
+    def finish(self, profile, endpoint):
+        profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{endpoint}.prof')
+        profile.dump_stats(path)
+        return path
+
+
+registry = Metrics.from_env()
+stage = registry.stage
+observe = registry.observe
+inc = registry.inc
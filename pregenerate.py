@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import text_store
+from ai_analysis import SECTION_SPECS, AIAnalysis
+from batch import RateLimiter
+from chart import BRANCHES, BRANCH_ELEMENTS, STEMS, STEM_ELEMENTS
+from saju_logic import SajuLogic
+
+# 사전 생성 해설 만들기 (오프라인)
+#
+# text_store.NAMESPACES 의 모든 조합(일간 10, 일간×성별 20, 오행 강약 20, 일간×대운 천간 100, 시기×60갑자 240)에
+# 대해 LLM 으로 해설을 한 번씩 생성하여 data/texts.bin 에 저장한다. 실제 API 대신 로컬 대역 서버로도 만들 수 있다.
+#
+#   python pregenerate.py --workers 8 --rpm 60
+#   OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=fake python pregenerate.py   (benchmarks/fake_openai.py)
+#
+# 기존 파일이 같은 판이면 이미 있는 글은 건너뛰고 빠진 슬롯만 만든다 (--force 로 전부 다시).
+# 중간 결과는 --save-every 건마다 저장하므로 중단되어도 다시 실행하면 이어서 만든다.
+
+ELEMENT_NAMES = {'wood': '목(木)', 'fire': '화(火)', 'earth': '토(土)', 'metal': '금(金)', 'water': '수(水)'}
+PERIOD_NAMES = {'year': '년주', 'month': '월주', 'day': '일주', 'hour': '시주'}
+SPECS = dict(SECTION_SPECS)
+
+SYSTEM_PROMPT = "당신은 현대적 감각을 가진 사주 분석 전문가입니다. 반드시 JSON 형식으로만 답변하며, 값은 항상 문자열이어야 합니다."
+
+
+def stem_label(idx):
+    return f"{STEMS[idx]}{ELEMENT_NAMES[STEM_ELEMENTS[idx]][0]}"
+
+
+def gmhs_spec(period):
+    # SECTION_SPECS 의 gmhs 지시문에서 해당 시기 줄만 꺼낸다.
+    for line in SPECS['gmhs'].splitlines():
+        if line.strip().startswith(f'- {period}:'):
+            return line.strip()[len(f'- {period}:'):].strip()
+    raise KeyError(period)
+
+
+def enumerate_slots(saju):
+    # (슬롯 번호, 조건 설명, 작성 지시문) 을 차례로 내보낸다.
+    for name, size in text_store.NAMESPACES:
+        base = text_store.NAMESPACE_BASE[name]
+        for index in range(size):
+            if name in ('personality_deep', 'social_analysis', 'wealth_strategy'):
+                yield base + index, f"- 본원(일간): {stem_label(index)}", SPECS[name]
+            elif name == 'love_romance':
+                day_master, gender = divmod(index, 2)
+                yield (base + index, f"- 본원(일간): {stem_label(day_master)}\n- 성별: {'남성' if gender == 0 else '여성'}",
+                       SPECS[name])
+            elif name == 'health_analysis':
+                strongest, weakest = divmod(index, 5)
+                if strongest == weakest:
+                    continue
+                yield (base + index,
+                       f"- 가장 강한 오행: {ELEMENT_NAMES[text_store.ELEMENTS[strongest]]}\n"
+                       f"- 가장 약한 오행: {ELEMENT_NAMES[text_store.ELEMENTS[weakest]]}", SPECS[name])
+            elif name == 'daewoon_trend':
+                day_master, stem = divmod(index, 10)
+                advice = saju._get_daewoon_advice(day_master, stem)
+                yield (base + index,
+                       f"- 본원(일간): {stem_label(day_master)}\n- 현재 대운 천간: {stem_label(stem)}\n"
+                       f"- 대운 십성 요약: {advice}",
+                       SPECS[name].replace('{current_daewun}', f"{STEMS[stem]} 대운"))
+            elif name == 'gmhs':
+                period_idx, cycle = divmod(index, 60)
+                period = text_store.PERIODS[period_idx]
+                stem, branch = cycle % 10, cycle % 12
+                yield (base + index,
+                       f"- {PERIOD_NAMES[period]}: {STEMS[stem]}{BRANCHES[branch]} "
+                       f"(천간 {ELEMENT_NAMES[STEM_ELEMENTS[stem]]}, 지지 {ELEMENT_NAMES[BRANCH_ELEMENTS[branch]]})",
+                       f"[생애주기 분석] {gmhs_spec(period)}")
+
+
+def build_messages(description, spec):
+    # 조합 하나에 대한 공통 해설 요청. 응답은 {"text": "..."}
+    prompt = f"""
+# Role: 2030 맞춤형 라이프 전략가 & 현대 명리학 마스터
+아래 조건을 가진 모든 사람에게 공통으로 읽힐 해설을 씁니다. 이름, 나이 등 개인 정보는 언급하지 마세요.
+
+# Input Data
+{description}
+
+# Output JSON Structure
+다음 키를 가진 JSON 형식으로 출력하세요. **최소 8~12문장 이상의 풍부한 장문**으로 작성하세요.
+
+1. text: {spec}
+
+# Instruction for Quality
+1. [Tone]: 전문 용어(십성, 오행 등)를 현대적인 심리학 용어와 비유(예: 단단한 원석, 촉촉한 단비)로 풀어내어 공감을 극대화하세요.
+2. [Volume]: 한 권의 자기계발서나 위로의 편지처럼 느껴지도록 풍성하게 작성하세요.
+"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate(ai, slots, texts, workers, limiter, path, save_every):
+    # 빠진 슬롯을 동시에 생성하여 texts 에 채운다. 반환값: (성공 수, 실패 수)
+    def run(slot, description, spec):
+        limiter.acquire()
+        data = ai._complete_json(build_messages(description, spec), call='pregenerate', priority='background')
+        text = str(data.get('text', '')).strip()
+        if not text:
+            raise ValueError("빈 응답")
+        return slot, text
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, *item) for item in slots]
+        for future in as_completed(futures):
+            try:
+                slot, text = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"생성 실패: {e}", file=sys.stderr)
+                continue
+            texts[slot] = text
+            done += 1
+            if done % save_every == 0:
+                text_store.write_store(texts, path)
+                print(f"{done}/{len(slots)} 저장", file=sys.stderr)
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="조합별 AI 해설을 미리 생성하여 data/texts.bin 에 저장")
+    parser.add_argument('-o', '--output', default=text_store.STORE_PATH, help="저장소 파일 경로")
+    parser.add_argument('-w', '--workers', type=int, default=8, help="동시 요청 수")
+    parser.add_argument('--rpm', type=float, default=60, help="분당 요청 수 제한")
+    parser.add_argument('--only', choices=[name for name, _ in text_store.NAMESPACES], action='append',
+                        help="이 이름공간만 생성 (여러 번 지정 가능)")
+    parser.add_argument('--limit', type=int, default=0, help="이번 실행에서 생성할 최대 개수 (0 이면 전부)")
+    parser.add_argument('--save-every', type=int, default=20, help="중간 저장 간격 (건)")
+    parser.add_argument('--force', action='store_true', help="이미 있는 글도 다시 생성")
+    args = parser.parse_args(argv)
+
+    ai = AIAnalysis()
+    if not ai.client:
+        raise SystemExit("OPENAI_API_KEY 가 필요합니다 (로컬 대역 서버를 쓸 때는 OPENAI_BASE_URL 과 임의의 키)")
+
+    texts = {}
+    if os.path.exists(args.output) and not args.force:
+        try:
+            store = text_store.TextStore(args.output)
+            if store.version == text_store.TEXTS_VERSION:
+                texts = store.texts()
+        except ValueError as e:
+            print(f"기존 저장소를 무시합니다: {e}", file=sys.stderr)
+
+    wanted = set(args.only or [name for name, _ in text_store.NAMESPACES])
+    slots = [item for item in enumerate_slots(SajuLogic())
+             if item[0] not in texts and _namespace(item[0]) in wanted]
+    if args.limit:
+        slots = slots[:args.limit]
+    print(f"생성할 글 {len(slots)}개 (기존 {len(texts)}개)", file=sys.stderr)
+
+    started = time.perf_counter()
+    done, failed = generate(ai, slots, texts, max(1, args.workers), RateLimiter(args.rpm), args.output,
+                            max(1, args.save_every))
+    filled = text_store.write_store(texts, args.output)
+    total = sum(1 for _ in enumerate_slots(SajuLogic()))
+    print(f"{done}개 생성, 실패 {failed}개, {time.perf_counter() - started:.1f}s. "
+          f"{args.output}: {filled}/{total}개 채움 (판 {text_store.TEXTS_VERSION})", file=sys.stderr)
+    return 0 if filled == total else 1
+
+
+def _namespace(slot):
+    for name, size in text_store.NAMESPACES:
+        if slot < text_store.NAMESPACE_BASE[name] + size:
+            return name
+    raise IndexError(slot)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,371 @@
+import asyncio
+import collections
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+# OpenAI 호출 지연 정책 (마감 시간, 재시도, 헤징, 서킷 브레이커)
+#
+# - 마감 시간: 분석 한 건(single 요청 하나, 또는 fan-out 묶음 전체)에 쓸 수 있는 총 시간. 재시도와 헤징도
+#   이 안에서만 하며, 각 시도의 timeout 은 남은 시간으로 줄어든다.
+# - 재시도: 429 / 5xx / 연결 오류만 지수 백오프(full jitter)로 다시 시도한다. Retry-After 가 있으면 따른다.
+#   (OpenAI SDK 자체 재시도는 끄고 여기서만 재시도한다: max_retries=0)
+# - 헤징: 최근 성공 지연 시간의 p95 가 지나도 응답이 없으면 같은 요청을 하나 더 보내 먼저 온 응답을 쓴다.
+# - 서킷 브레이커: 429 / 5xx / 연결 오류 / 시간 초과가 연속으로 쌓이면 열림(open) 상태가 되어 LLM 을 기다리지 않고 바로 실패한다.
+#   (AIAnalysis 는 이때 결정적 해석을 돌려준다.) reset_timeout 후 시험 요청 하나로 회복 여부를 본다.
+# 브레이커 상태와 재시도/헤징 횟수는 워커 프로세스별이며 /api/ai/stats 와 /metrics 로 볼 수 있다.
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    __slots__ = ('expires',)
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probing = False
+
+    def is_open(self):
+        # 열려 있고 아직 시험 요청을 보낼 때가 아니면 True
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(self.HALF_OPEN)
+            # 반쯤 열림: 시험 요청 하나만 통과시킨다.
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                                and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                self._transition(self.OPEN)
+
+    def release(self):
+        # 상태와 연속 실패 수는 그대로 두고, 반쯤 열림의 시험 요청 자리만 돌려준다.
+        with self._lock:
+            self._probing = False
+
+    def _transition(self, state):
+        print(f"AI 서킷 브레이커: {self.state} → {state} (연속 실패 {self.failures}회)")
+        self.state = state
+        metrics.inc('saju_ai_breaker_transitions_total', state=state)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'trips': self.trips,
+                'open_for_seconds': (round(time.monotonic() - self.opened_at, 1)
+                                     if self.state != self.CLOSED and self.opened_at else 0)
+            }
+
+
+class LatencyPolicy:
+    def __init__(self, deadline=90.0, attempt_timeout=120.0, max_retries=2, backoff_base=0.5, backoff_max=8.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_delay=1.0, hedge_min_samples=20,
+                 breaker=None):
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        # 호출 종류(single/section/stream)별 최근 성공 시도 지연 시간 (헤징 지연 계산용)
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=200))
+        self._counts = collections.Counter()
+        self._hedge_pool = None
+
+    @classmethod
+    def from_env(cls):
+        breaker = CircuitBreaker(failure_threshold=int(os.getenv('AI_BREAKER_FAILURES', 5)),
+                                 reset_timeout=float(os.getenv('AI_BREAKER_RESET', 30)))
+        return cls(deadline=float(os.getenv('AI_DEADLINE', 90)),
+                   attempt_timeout=float(os.getenv('AI_ATTEMPT_TIMEOUT', 120)),
+                   max_retries=int(os.getenv('AI_MAX_RETRIES', 2)),
+                   backoff_base=float(os.getenv('AI_BACKOFF_BASE', 0.5)),
+                   backoff_max=float(os.getenv('AI_BACKOFF_MAX', 8)),
+                   hedge=os.getenv('AI_HEDGE', '0') == '1',
+                   hedge_min_delay=float(os.getenv('AI_HEDGE_MIN_DELAY', 1.0)),
+                   breaker=breaker)
+
+    def new_deadline(self):
+        return Deadline(self.deadline)
+
+    def short_circuit(self, name='single'):
+        # 브레이커가 열려 있으면 True. 호출하는 쪽은 LLM 을 기다리지 않고 결정적 해석을 바로 쓴다.
+        if not self.breaker.is_open():
+            return False
+        self._count('short_circuited', name)
+        return True
+
+    def call(self, fn, deadline=None, name='single', hedge=True):
+        # fn(timeout) 을 정책에 따라 호출한다. 실패하면 마지막 예외, 브레이커가 열려 있으면 CircuitOpenError,
+        # 남은 시간이 없으면 DeadlineExceeded 를 올린다.
+        deadline = deadline or self.new_deadline()
+        attempt = 0
+        while True:
+            timeout = self._begin_attempt(deadline, name)
+            started = time.monotonic()
+            try:
+                delay = self._hedge_delay(name) if hedge else None
+                if delay is None or delay >= timeout:
+                    result = fn(timeout)
+                else:
+                    result = self._hedged(fn, deadline, delay, name)
+            except Exception as e:
+                delay = self._after_failure(e, attempt, deadline, name)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # KeyboardInterrupt 등으로 끝나도 시험 요청 자리는 돌려준다.
+                self.breaker.release()
+                raise
+            self._after_success(name, time.monotonic() - started)
+            return result
+
+    async def call_async(self, fn, deadline=None, name='single', hedge=True):
+        # call 의 asyncio 버전. fn(timeout) 은 코루틴 함수이며, 헤징에서 진 요청은 취소한다.
+        deadline = deadline or self.new_deadline()
+        attempt = 0
+        while True:
+            timeout = self._begin_attempt(deadline, name)
+            started = time.monotonic()
+            try:
+                delay = self._hedge_delay(name) if hedge else None
+                if delay is None or delay >= timeout:
+                    result = await fn(timeout)
+                else:
+                    result = await self._hedged_async(fn, deadline, delay, name)
+            except Exception as e:
+                delay = self._after_failure(e, attempt, deadline, name)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # 취소(CancelledError)되어도 시험 요청 자리는 돌려준다.
+                self.breaker.release()
+                raise
+            self._after_success(name, time.monotonic() - started)
+            return result
+
+    def _begin_attempt(self, deadline, name):
+        # 마감을 먼저 본다. allow() 는 반쯤 열림에서 시험 요청 자리를 차지하므로, 보내지 않을 시도가 잡으면 안 된다.
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            self._count('deadline_exceeded', name)
+            raise DeadlineExceeded("AI 분석 마감 시간 초과")
+        if not self.breaker.allow():
+            self._count('short_circuited', name)
+            raise CircuitOpenError("AI 서킷 브레이커가 열려 있습니다")
+        return min(self.attempt_timeout, remaining)
+
+    def _after_failure(self, error, attempt, deadline, name):
+        # 실패를 기록하고, 다시 시도할 경우 대기 시간을 돌려준다 (None 이면 포기).
+        # 시도가 보내진 뒤의 실패는 모두 record_failure 를 거쳐 반쯤 열림의 시험 요청 자리가 항상 풀린다.
+        # (헤징 대기 중 마감 초과는 실패로 센다.)
+        if isinstance(error, CircuitOpenError):
+            return None
+        self.record_failure(error)
+        if isinstance(error, DeadlineExceeded):
+            return None
+        if not is_retryable(error) or attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        delay = max(delay, _retry_after(error))
+        if delay >= deadline.remaining():
+            self._count('deadline_exceeded', name)
+            return None
+        self._count('retries', name)
+        return delay
+
+    def record_failure(self, error):
+        # 서비스 상태를 나타내는 실패(429/5xx/연결 오류/시간 초과, 마감 초과)만 브레이커에 센다.
+        # 400 이나 응답 JSON 해석 오류는 그 요청 하나의 문제이므로 세지 않는다 (시험 요청이었다면 자리만 돌려준다).
+        if is_retryable(error) or isinstance(error, DeadlineExceeded):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _after_success(self, name, seconds):
+        self.breaker.record_success()
+        with self._lock:
+            self._latencies[name].append(seconds)
+
+    def expected_seconds(self, name):
+        # 최근 성공 시도 지연 시간의 p95 (표본이 없으면 0). 입장 제어가 마감에서 미리 떼어 두는 응답 시간.
+        # stream 은 연결되어 첫 응답이 올 때까지의 시간이다.
+        with self._lock:
+            values = sorted(self._latencies[name])
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * self.hedge_quantile))]
+
+    def _hedge_delay(self, name):
+        # 최근 성공 지연 시간의 p95 (표본이 적으면 None = 헤징 안 함)
+        if not self.hedge:
+            return None
+        with self._lock:
+            values = sorted(self._latencies[name])
+        if len(values) < self.hedge_min_samples:
+            return None
+        p = values[min(len(values) - 1, int(len(values) * self.hedge_quantile))]
+        return max(self.hedge_min_delay, p)
+
+    def _hedged(self, fn, deadline, delay, name):
+        # 첫 요청이 delay 안에 끝나지 않으면 두 번째 요청을 보내 먼저 성공한 결과를 쓴다.
+        # (동기 HTTP 요청은 취소할 수 없으므로 진 요청은 자기 timeout 까지 백그라운드에서 끝난다.)
+        pool = self._get_hedge_pool()
+        primary = pool.submit(fn, min(self.attempt_timeout, deadline.remaining()))
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        self._count('hedges', name)
+        hedge = pool.submit(fn, min(self.attempt_timeout, deadline.remaining()))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            # 마감이 지나면 remaining() 이 0 이므로 기다리지 않고 바로 돌아온다.
+            done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                self._count('deadline_exceeded', name)
+                raise DeadlineExceeded("AI 분석 마감 시간 초과")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedges_won', name)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _hedged_async(self, fn, deadline, delay, name):
+        primary = asyncio.ensure_future(fn(min(self.attempt_timeout, deadline.remaining())))
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        self._count('hedges', name)
+        hedge = asyncio.ensure_future(fn(min(self.attempt_timeout, deadline.remaining())))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=deadline.remaining(),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._count('deadline_exceeded', name)
+                    raise DeadlineExceeded("AI 분석 마감 시간 초과")
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count('hedges_won', name)
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    def _get_hedge_pool(self):
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='ai-hedge')
+            return self._hedge_pool
+
+    def _count(self, event, name):
+        with self._lock:
+            self._counts[event] += 1
+        metrics.inc('saju_ai_policy_events_total', event=event, call=name)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            'deadline_seconds': self.deadline,
+            'max_retries': self.max_retries,
+            'hedge': self.hedge,
+            'hedge_delay_seconds': {name: self._hedge_delay(name) for name in list(self._latencies)},
+            'breaker': self.breaker.stats(),
+            **{event: counts.get(event, 0)
+               for event in ['retries', 'hedges', 'hedges_won', 'short_circuited', 'deadline_exceeded']}
+        }
+
+
+def is_retryable(error):
+    # 429, 5xx, 연결 오류/시간 초과만 재시도한다 (400, 401 등은 다시 보내도 같다).
+    # openai 를 아직 가져오지 않았다면 SDK 예외일 수 없으므로 SDK 를 가져오지 않고 False.
+    openai = sys.modules.get('openai')
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, openai.APIConnectionError)
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return 0.0
+    try:
+        return float(response.headers.get('retry-after', 0))
+    except (TypeError, ValueError):
+        return 0.0
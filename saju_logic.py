@@ -1,23 +1,186 @@
 import datetime
+import functools
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+import jeolgi
+from chart import Chart, BRANCHES, BRANCH_ELEMENTS, CYCLE_INDEX, PILLAR_DICTS, STEMS, STEM_ELEMENTS
+
+# 계산 규칙이나 해석 문구(결정적 결과)를 바꾸면 올린다. GET /api/chart 의 ETag 와 결과 화면 조각 캐시 키에 들어간다.
+RULESET_VERSION = 1
+
+# 정적 조회표. 모듈을 읽을 때 한 번만 만들어 모든 SajuLogic 인스턴스가 공유한다 (인스턴스를 만들 때나
+# 메서드를 부를 때마다 다시 만들지 않는다). 튜플, 읽기 전용 numpy 배열, 읽기 전용 매핑(MappingProxyType)이므로
+# 한 요청이 고쳐 다른 요청에 새는 일이 없다.
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+# 배치 계산용 오행 인덱스 테이블 (0: wood, 1: fire, 2: earth, 3: metal, 4: water)
+OHAENG_KEYS = ('wood', 'fire', 'earth', 'metal', 'water')
+ELEMENT_INDEX = MappingProxyType({name: i for i, name in enumerate(OHAENG_KEYS)})
+STEM_ELEM_IDX = _frozen(np.array([0, 0, 1, 1, 2, 2, 3, 3, 4, 4], dtype=np.int8))
+BRANCH_ELEM_IDX = _frozen(np.array([4, 2, 0, 0, 2, 1, 1, 2, 3, 3, 2, 4], dtype=np.int8))
+# (천간 * 12 + 지지) → 해당 기둥의 오행 개수를 오행당 4비트로 묶은 값
+_elem_bits = 1 << (4 * np.arange(5, dtype=np.int32))
+PILLAR_OHAENG_PACKED = _frozen((_elem_bits[STEM_ELEM_IDX][:, None] + _elem_bits[BRANCH_ELEM_IDX][None, :]).ravel())
+
+# 배치 계산용 간지 조회표. get_gan_zhi의 규칙을 그대로 펼쳐 둔 것이다.
+_cycle = np.arange(60)
+CYCLE_STEM = _frozen((_cycle % 10).astype(np.int8))
+CYCLE_BRANCH = _frozen((_cycle % 12).astype(np.int8))
+MONTH_DAYS = _frozen(np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int32))
+# [년 60갑자 * 13 + 보정 월] → 월간 (년상기월법)
+_months = np.arange(13)
+MONTH_STEM_TABLE = _frozen(
+    ((np.array([2, 4, 6, 8, 0])[_cycle % 10 % 5][:, None] + (_months - 2) % 12) % 10).astype(np.int8).ravel())
+MONTH_BRANCH_TABLE = _frozen((_months % 12).astype(np.int8))
+# [일 60갑자 * 24 + 시] → 시간 (일상기시법)
+HOUR_BRANCH_TABLE = _frozen(((np.arange(24) + 1) // 2 % 12).astype(np.int8))
+HOUR_STEM_TABLE = _frozen(
+    ((np.array([0, 2, 4, 6, 8])[_cycle % 10 % 5][:, None] + HOUR_BRANCH_TABLE) % 10).astype(np.int8).ravel())
+
+# 궁합 점수표 (get_compatibility, gunghap.CompatibilityIndex 공용)
+# 천간: 합(갑기, 을경, 병신, 정임, 무계) +15, 오행 상생 +5, 상극 -5, 같은 오행 0
+# 지지 관계: 0 없음, 1 육합(자축, 인해, 묘술, 진유, 사신, 오미), 2 삼합(신자진, 해묘미, 인오술, 사유축), 3 충
+_stem_rel = (STEM_ELEM_IDX[None, :] - STEM_ELEM_IDX[:, None]) % 5
+_stem_hap = (np.arange(10)[None, :] - np.arange(10)[:, None]) % 10 == 5
+GUNGHAP_STEM_POINTS = _frozen(np.where(_stem_hap, 15, np.array([0, 5, -5, -5, 5])[_stem_rel]).astype(np.int16))
+_b = np.arange(12)
+GUNGHAP_BRANCH_RELATION = _frozen(np.select(
+    [(_b[:, None] + _b[None, :]) % 12 == 1, (_b[:, None] % 4 == _b[None, :] % 4) & (_b[:, None] != _b[None, :]),
+     (_b[:, None] - _b[None, :]) % 12 == 6], [1, 2, 3], 0).astype(np.int8))
+GUNGHAP_BRANCH_NAMES = (None, '육합', '삼합', '충')
+GUNGHAP_DAY_BRANCH_POINTS = _frozen(np.array([0, 10, 7, -10], dtype=np.int16)[GUNGHAP_BRANCH_RELATION])
+GUNGHAP_YEAR_BRANCH_POINTS = _frozen(np.array([0, 6, 4, -6], dtype=np.int16)[GUNGHAP_BRANCH_RELATION])
+
+# 지지 음양 (0=양, 1=음). 자(음), 축(음), 인(양), 묘(음), 진(양), 사(양), 오(음), 미(음), 신(양), 유(음), 술(양), 해(양)
+ZHI_POLARITY = (1, 1, 0, 1, 0, 0, 1, 1, 0, 1, 0, 0)
+# [상대 오행 - 나의 오행 (mod 5)] → (음양이 같을 때, 다를 때) 십성
+TEN_GOD_NAMES = (
+    ('비견', '겁재'),
+    ('식신', '상관'),
+    ('편재', '정재'),
+    ('편관', '정관'),
+    ('편인', '정인'),
+)
+# 배치 계산용 십성 번호 (TEN_GOD_NAMES 를 펼친 순서: 0 비견, 1 겁재, 2 식신, ..., 9 정인)
+TEN_GOD_ORDER = tuple(name for pair in TEN_GOD_NAMES for name in pair)
+# [일간, 상대 천간] / [일간, 상대 지지] → 십성 번호. _determine_god 과 같은 규칙 (음양이 같으면 짝수 번호)
+_me = np.arange(10)[:, None]
+TEN_GOD_STEM_TABLE = _frozen(((STEM_ELEM_IDX[None, :] - STEM_ELEM_IDX[_me]) % 5 * 2
+                              + (_me % 2 != np.arange(10)[None, :] % 2)).astype(np.int8))
+TEN_GOD_BRANCH_TABLE = _frozen(((BRANCH_ELEM_IDX[None, :] - STEM_ELEM_IDX[_me]) % 5 * 2
+                                + ((_me % 2 == 0) != (np.array(ZHI_POLARITY)[None, :] == 0))).astype(np.int8))
+
+DAEWOON_ADVICES = MappingProxyType({
+    '비견': "나와 뜻을 같이하는 동료나 경쟁자가 나타나는 시기입니다. 협력을 통해 성취를 이룰 수 있으나, 독단적인 결정은 피하는 것이 좋습니다.",
+    '겁재': "강한 경쟁 심리가 발동하거나 재물 운용에 주의가 필요한 시기입니다. 겉으로는 화려해 보일 수 있으나 내실을 다지는 지혜가 필요합니다.",
+    '식신': "나의 재능과 기술을 마음껏 발휘하는 시기입니다. 자연스러운 의식주 안정이 따르며, 창의적인 활동이 큰 성과를 거둘 수 있습니다.",
+    '상관': "변화를 추구하고 자신을 표현하려는 욕구가 강해집니다. 뛰어난 언변과 재치로 인정받을 수 있으나, 구설수를 조심해야 합니다.",
+    '편재': "큰 재물을 다루거나 사업적인 기회가 찾아오는 시기입니다. 활동 무대가 넓어지며 역동적인 성과를 기대할 수 있습니다.",
+    '정재': "안정적인 수입과 재물 축적이 이루어지는 시기입니다. 꼼꼼하고 성실한 태도로 인정을 받으며, 가정의 안정이 찾아옵니다.",
+    '편관': "강한 책임감과 리더십을 발휘해야 하는 시기입니다. 난관이 있을 수 있으나 이를 극복하면 큰 명예와 권위를 얻게 됩니다.",
+    '정관': "명예와 승진, 합격운이 따르는 시기입니다. 원칙을 준수하고 반듯한 생활을 함으로써 사회적 신용이 높아집니다.",
+    '편인': "특수한 기술이나 철학, 종교적인 분야에 관심이 깊어집니다. 남들이 보지 못하는 이면을 꿰뚫어보는 직관력이 발달합니다.",
+    '정인': "학문 탐구와 문서운이 좋은 시기입니다. 귀인의 도움을 받거나 자격증 취득, 계약 성사 등 긍정적인 결실이 있습니다."
+})
+
+CORE_TRAITS = MappingProxyType({
+    '갑': "🌲 곧게 뻗은 소나무 (갑목)\n리더십이 강하고 추진력이 뛰어나며, 한번 결심하면 굽히지 않는 강직한 성품입니다.",
+    '을': "🌿 강인한 생명력의 꽃 (을목)\n유연하고 적응력이 뛰어나며, 어떠한 환경에서도 살아남는 끈기와 생활력이 강합니다.",
+    '병': "☀️ 세상을 비추는 태양 (병화)\n열정적이고 화려하며, 숨김없는 솔직함으로 주변 사람들에게 활력을 불어넣는 리더입니다.",
+    '정': "🕯️ 은근하게 타오르는 촛불 (정화)\n따뜻하고 섬세하며, 남을 배려하는 헌신적인 마음과 예리한 통찰력을 겸비했습니다.",
+    '무': "⛰️ 묵직한 태산 (무토)\n믿음직스럽고 포용력이 넓으며, 신용을 중시하여 주변 사람들로부터 깊은 신뢰를 받습니다.",
+    '기': "🌱 비옥한 텃밭 (기토)\n실속 있고 현실적이며, 어머니와 같은 포용력으로 인재를 기르고 결실을 맺는 능력이 있습니다.",
+    '경': "🪨 단단한 원석 (경금)\n의리가 강하고 결단력이 있으며, 공과 사가 분명하여 혁명적인 변화를 이끌어내는 힘이 있습니다.",
+    '신': "💎 반짝이는 보석 (신금)\n섬세하고 예리하며, 남다른 미적 감각과 자존심으로 자신만의 분야에서 빛을 발합니다.",
+    '임': "🌊 드넓은 바다 (임수)\n지혜롭고 유연하며, 깊은 속내와 포용력으로 세상을 넓게 바라보는 통찰력이 있습니다.",
+    '계': "🌧️ 촉촉한 단비 (계수)\n총명하고 감수성이 풍부하며, 상황에 따라 변신하는 지혜와 부드러운 카리스마가 있습니다."
+})
+
+# 오늘의 운세: [오늘 천간 오행 - 일간 오행 (mod 5)] → (제목, 설명)
+TODAY_FORTUNES = (
+    ("🤝 어깨를 나란히 하는 날", "주변 사람들과 협력하면 좋은 성과가 있습니다. 친구나 동료와의 만남이 즐거운 하루입니다."),
+    ("🎨 재능이 꽃피는 날", "창의력이 솟아나고 표현력이 좋아지는 날입니다. 새로운 아이디어를 내거나 취미 생활을 즐겨보세요."),
+    ("💰 결실을 맺는 날", "노력한 만큼 보상이 따르는 날입니다. 금전적인 이득이나 뜻밖의 선물이 있을 수 있습니다."),
+    ("👑 명예가 드높은 날", "책임감 있는 행동으로 인정받는 하루입니다. 직장에서 칭찬을 듣거나 승진의 기운이 있습니다."),
+    ("📚 귀인의 도움이 있는 날", "마음이 편안하고 문서운이 좋은 날입니다. 윗사람의 도움을 받거나 배움의 즐거움을 느낄 수 있습니다."),
+)
 
 class SajuLogic:
-    def __init__(self):
-        self.CHEONGAN = ['갑', '을', '병', '정', '무', '기', '경', '신', '임', '계']
-        self.JIJI = ['자', '축', '인', '묘', '진', '사', '오', '미', '신', '유', '술', '해']
-        
-        # Stem (Cheongan) Elements
-        # 갑을=wood, 병정=fire, 무기=earth, 경신=metal, 임계=water
-        self.STEM_OHAENG = ['wood', 'wood', 'fire', 'fire', 'earth', 'earth', 'metal', 'metal', 'water', 'water']
-        
-        # Branch (Jiji) Elements
-        # 자=water, 축=earth, 인묘=wood, 진=earth, 사오=fire, 미=earth, 신유=metal, 술=earth, 해=water
-        self.BRANCH_OHAENG = ['water', 'earth', 'wood', 'wood', 'earth', 'fire', 'fire', 'earth', 'metal', 'metal', 'earth', 'water']
+    LUCK_GRANULARITIES = ('decade', 'year', 'month')
+    # 정적 조회표 (모듈 수준 상수를 그대로 가리킨다. self.CHEONGAN 처럼 인스턴스에서도 읽을 수 있다)
+    CHEONGAN = STEMS
+    JIJI = BRANCHES
+    # 갑을=wood, 병정=fire, 무기=earth, 경신=metal, 임계=water
+    STEM_OHAENG = STEM_ELEMENTS
+    # 자=water, 축=earth, 인묘=wood, 진=earth, 사오=fire, 미=earth, 신유=metal, 술=earth, 해=water
+    BRANCH_OHAENG = BRANCH_ELEMENTS
+    OHAENG_KEYS = OHAENG_KEYS
+    STEM_ELEM_IDX = STEM_ELEM_IDX
+    BRANCH_ELEM_IDX = BRANCH_ELEM_IDX
+    PILLAR_OHAENG_PACKED = PILLAR_OHAENG_PACKED
+    CYCLE_STEM = CYCLE_STEM
+    CYCLE_BRANCH = CYCLE_BRANCH
+    MONTH_DAYS = MONTH_DAYS
+    MONTH_STEM_TABLE = MONTH_STEM_TABLE
+    MONTH_BRANCH_TABLE = MONTH_BRANCH_TABLE
+    HOUR_BRANCH_TABLE = HOUR_BRANCH_TABLE
+    HOUR_STEM_TABLE = HOUR_STEM_TABLE
+    GUNGHAP_STEM_POINTS = GUNGHAP_STEM_POINTS
+    GUNGHAP_BRANCH_RELATION = GUNGHAP_BRANCH_RELATION
+    GUNGHAP_BRANCH_NAMES = GUNGHAP_BRANCH_NAMES
+    GUNGHAP_DAY_BRANCH_POINTS = GUNGHAP_DAY_BRANCH_POINTS
+    GUNGHAP_YEAR_BRANCH_POINTS = GUNGHAP_YEAR_BRANCH_POINTS
+    TEN_GOD_ORDER = TEN_GOD_ORDER
+    TEN_GOD_STEM_TABLE = TEN_GOD_STEM_TABLE
+    TEN_GOD_BRANCH_TABLE = TEN_GOD_BRANCH_TABLE
+
+    def __init__(self, interpret_cache_size=4096):
+        # interpret() 캐시: 날짜와 무관한 해석은 (원국 인덱스, 성별, 일) 로 LRU 캐시하고,
+        # 오늘의 운세는 일간(10가지)별로 하루에 한 번만 계산한다.
+        self._interpret_core_cached = functools.lru_cache(maxsize=interpret_cache_size)(self._interpret_core)
+        self._today_lock = threading.Lock()
+        self._today_date = None
+        self._today_cache = {}
+        self._today_hits = 0
+        self._today_misses = 0
+        # 운 타임라인용 일간별 간지 조회표 (iter_luck_timeline)
+        self._luck_pillar_cache = {}
+        # 역조회용 절월(節月) 구간 색인 (find_birth_datetimes, 처음 쓸 때 만든다)
+        self._month_index = None
 
     def get_gan_zhi(self, year, month, day, hour, minute):
+        y_s, y_b, m_s, m_b, d_s, d_b, h_s, h_b = self._pillar_indices(year, month, day, hour, minute)
+        return {
+            'year': self._make_pillar(y_s, y_b),
+            'month': self._make_pillar(m_s, m_b),
+            'day': self._make_pillar(d_s, d_b),
+            'hour': self._make_pillar(h_s, h_b)
+        }
+
+    def get_chart(self, year, month, day, hour, minute):
+        # get_gan_zhi 와 같은 원국을 간결한 Chart(24비트 정수 하나)로 돌려준다. 대량 보관용.
+        return Chart.from_indices(*self._pillar_indices(year, month, day, hour, minute))
+
+    def _pillar_indices(self, year, month, day, hour, minute):
+        # (년간, 년지, 월간, 월지, 일간, 일지, 시간, 시지) 인덱스
         # 1. Year Pillar
         # Ipchun (Approx Feb 4) check for simple lunar year cut-off
         is_before_lichun = (month < 2) or (month == 2 and day < 4)
         calc_year = year - 1 if is_before_lichun else year
+
+        # 절기표 범위(1900~2100년) 안이면 실제 입춘/절입 시각으로 년과 월을 정한다.
+        # (위의 2월 4일 / 5일 기준은 표 범위 밖에서만 쓰는 근사치)
+        term_year_month = jeolgi.saju_year_month(year, month, day, hour, minute)
+        if term_year_month is not None:
+            calc_year = term_year_month[0]
         
         # 4 AD was Kap-Ja (0,0) ? No, standard algo is (Year - 4) % 60 for 1984 -> Kap-Ja
         # 1984 - 4 = 1980. 1980 % 60 = 0. Correct.
@@ -35,6 +198,9 @@ class SajuLogic:
         target_month = month
         if day < 5:
             target_month = month - 1 if month > 1 else 12
+        if term_year_month is not None:
+            # 절기표의 월지 → 같은 규칙의 target_month (자월=12, 축월=1, 인월=2, ...)
+            target_month = term_year_month[1] or 12
             
         # Month Branch: Tiger(寅, 2) is 1st month in Saju usually? 
         # But indices are 0=Rat.
@@ -86,22 +252,12 @@ class SajuLogic:
         hour_start_stem = hour_start_stems[day_stem_idx % 5]
         hour_stem_idx = (hour_start_stem + hour_branch_idx) % 10
         
-        def make_pillar(s_idx, b_idx):
-            return {
-                'gan': self.CHEONGAN[s_idx],
-                'zhi': self.JIJI[b_idx],
-                'gan_idx': s_idx,
-                'zhi_idx': b_idx,
-                'gan_element': self.STEM_OHAENG[s_idx],
-                'zhi_element': self.BRANCH_OHAENG[b_idx]
-            }
+        return (year_stem_idx, year_branch_idx, month_stem_idx, month_branch_idx,
+                day_stem_idx, day_branch_idx, hour_stem_idx, hour_branch_idx)
 
-        return {
-            'year': make_pillar(year_stem_idx, year_branch_idx),
-            'month': make_pillar(month_stem_idx, month_branch_idx),
-            'day': make_pillar(day_stem_idx, day_branch_idx),
-            'hour': make_pillar(hour_stem_idx, hour_branch_idx)
-        }
+    def _make_pillar(self, s_idx, b_idx):
+        # 60갑자별로 미리 만들어 둔 기둥 dict 를 복사한다 (chart.PILLAR_DICTS)
+        return PILLAR_DICTS[CYCLE_INDEX[s_idx * 12 + b_idx]].copy()
 
     def get_ohaeng_distribution(self, pillars):
         dist = {'wood': 0, 'fire': 0, 'earth': 0, 'metal': 0, 'water': 0}
@@ -110,6 +266,98 @@ class SajuLogic:
             dist[pillars[key]['zhi_element']] += 1
         return dist
 
+    def get_gan_zhi_batch(self, years, months, days, hours, minutes):
+        # get_gan_zhi의 벡터화 버전. 입력은 같은 길이의 정수 배열이며,
+        # 결과는 기둥별 {'gan_idx', 'zhi_idx'} int8 배열로 돌려준다.
+        # 계산 규칙은 스칼라 경로와 한 줄씩 대응하므로 결과가 항상 일치해야 한다.
+        y = np.asarray(years, dtype=np.int32)
+        m = np.asarray(months, dtype=np.int32)
+        d = np.asarray(days, dtype=np.int32)
+        h = np.asarray(hours, dtype=np.int32)
+        mi = np.asarray(minutes, dtype=np.int32)
+        y, m, d, h, mi = np.broadcast_arrays(y, m, d, h, mi)
+
+        # 스칼라 경로의 datetime.date와 동일하게 잘못된 날짜/시각은 거부한다.
+        # (% 연산은 느리므로 배열 전체에는 비교/나눗셈/표 조회만 사용)
+        m_safe = np.where((m >= 1) & (m <= 12), m, 0)
+        max_day = self.MONTH_DAYS[m_safe]
+        feb29 = (m == 2) & (d == 29)
+        if feb29.any():
+            fy = y[feb29]
+            leap = ((fy // 4 * 4 == fy) & (fy // 100 * 100 != fy)) | (fy // 400 * 400 == fy)
+            if not leap.all():
+                raise ValueError("invalid date in batch input")
+        if not np.all((m_safe > 0) & (d >= 1) & (d <= max_day + feb29) & (y >= 1) & (y <= 9999)
+                      & (h >= 0) & (h <= 23) & (mi >= 0) & (mi <= 59)):
+            raise ValueError("invalid date in batch input")
+
+        # 일수 계산 (1970-01-01 기준). datetime.date 대신 그레고리력 일수 공식으로 한 번에 계산
+        yy = y - (m <= 2)
+        era = yy // 400
+        yoe = yy - era * 400
+        doy = (153 * np.where(m > 2, m - 3, m + 9) + 2) // 5 + d - 1
+        doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+        days_1970 = era * 146097 + doe - 719468
+
+        # 1. 년주 / 2. 월주
+        # 절기표 범위 밖에서는 스칼라 경로와 같은 근사치(입춘 2월 4일, 매월 5일)를 쓴다.
+        is_before_lichun = (m < 2) | ((m == 2) & (d < 4))
+        calc_year = y - is_before_lichun
+        target_month = np.where(d < 5, np.where(m > 1, m - 1, 12), m)
+
+        minutes_1900 = ((days_1970.astype(np.int64) + 25567) * 1440 + h * 60 + mi) - jeolgi.KST_OFFSET_MIN
+        term_year, term_branch, in_range = jeolgi.saju_year_month_batch(minutes_1900)
+        calc_year = np.where(in_range, term_year, calc_year)
+        target_month = np.where(in_range, np.where(term_branch == 0, 12, term_branch), target_month)
+
+        year_idx = calc_year - 4
+        year_idx = year_idx - year_idx // 60 * 60
+        month_stem = self.MONTH_STEM_TABLE[year_idx * 13 + target_month]
+        month_branch = self.MONTH_BRANCH_TABLE[target_month]
+
+        # 3. 일주 (2000-01-01 = 무오, 54번째)
+        day_idx = days_1970 - 10957 + 54  # 1970-01-01 → 2000-01-01
+        day_idx = day_idx - day_idx // 60 * 60
+
+        # 4. 시주
+        hour_stem = self.HOUR_STEM_TABLE[day_idx * 24 + h]
+        hour_branch = self.HOUR_BRANCH_TABLE[h]
+
+        return {
+            'year': {'gan_idx': self.CYCLE_STEM[year_idx], 'zhi_idx': self.CYCLE_BRANCH[year_idx]},
+            'month': {'gan_idx': month_stem, 'zhi_idx': month_branch},
+            'day': {'gan_idx': self.CYCLE_STEM[day_idx], 'zhi_idx': self.CYCLE_BRANCH[day_idx]},
+            'hour': {'gan_idx': hour_stem, 'zhi_idx': hour_branch}
+        }
+
+    def get_ohaeng_distribution_batch(self, pillars):
+        # get_gan_zhi_batch 결과를 받아 N×5 오행 개수 행렬을 만든다.
+        # 열 순서는 OHAENG_KEYS (wood, fire, earth, metal, water) 순서다.
+        # 기둥마다 오행 개수를 4비트씩 묶은 정수 하나를 표에서 꺼내 더한 뒤
+        # (최대 8이라 자리 올림이 없다) 마지막에 한 번만 N×5로 풀어낸다.
+        packed = None
+        for key in ['year', 'month', 'day', 'hour']:
+            pair = pillars[key]['gan_idx'].astype(np.int32) * 12 + pillars[key]['zhi_idx']
+            part = self.PILLAR_OHAENG_PACKED[pair]
+            packed = part if packed is None else packed + part
+        counts = np.empty((len(packed), 5), dtype=np.int8)
+        for e in range(5):
+            counts[:, e] = (packed >> (4 * e)) & 0xF
+        return counts
+
+    def get_ten_gods_batch(self, pillars):
+        # _get_all_sip_seong 의 벡터화 버전. get_gan_zhi_batch 결과 → N×8 십성 번호 행렬 (TEN_GOD_ORDER 순서).
+        # 열 순서는 년간, 년지, 월간, 월지, 일간, 일지, 시간, 시지이며 일간('나') 열은 -1 이다.
+        day_gan = pillars['day']['gan_idx'].astype(np.int32)
+        stem_table = self.TEN_GOD_STEM_TABLE.ravel()
+        branch_table = self.TEN_GOD_BRANCH_TABLE.ravel()
+        gods = np.empty((len(day_gan), 8), dtype=np.int8)
+        for i, key in enumerate(['year', 'month', 'day', 'hour']):
+            gods[:, 2 * i] = stem_table[day_gan * 10 + pillars[key]['gan_idx']]
+            gods[:, 2 * i + 1] = branch_table[day_gan * 12 + pillars[key]['zhi_idx']]
+        gods[:, 4] = -1
+        return gods
+
     def _determine_god(self, me_idx, target_idx, me_pol, target_pol):
         # 0: Wood, 1: Fire, 2: Earth, 3: Metal, 4: Water
         diff = (target_idx - me_idx) % 5
@@ -121,23 +369,14 @@ class SajuLogic:
         # Diff 2: I control Target. SamePol=PyeonJae, DiffPol=JeongJae
         # Diff 3: Target controls Me. SamePol=PyeonGwan, DiffPol=JeongGwan
         # Diff 4: Target produces Me. SamePol=PyeonIn, DiffPol=JeongIn
-        
-        mapping = {
-            0: {True: '비견', False: '겁재'},
-            1: {True: '식신', False: '상관'},
-            2: {True: '편재', False: '정재'},
-            3: {True: '편관', False: '정관'},
-            4: {True: '편인', False: '정인'},
-        }
-        return mapping[diff][is_same_pol]
+        return TEN_GOD_NAMES[diff][0 if is_same_pol else 1]
 
     def _get_all_sip_seong(self, pillars):
         me_pillar = pillars['day']
         me_idx = me_pillar['gan_idx'] // 2 # 0,0,1,1,2,2.. -> 0,1,2,3,4 (Elem Index)? 
         # No, wait. STEM_OHAENG is ['wood', 'wood'...]
         # Better use map: wood=0, fire=1...
-        elem_map = {'wood':0, 'fire':1, 'earth':2, 'metal':3, 'water':4}
-        me_elem_idx = elem_map[me_pillar['gan_element']]
+        me_elem_idx = ELEMENT_INDEX[me_pillar['gan_element']]
         me_pol = (me_pillar['gan_idx'] % 2 == 0) # Even=Yang, Odd=Yin in List? 
         # CHEONGAN = [Kap, Eul, ...] -> Kap(0) wood, Eul(1) wood.
         # 0 is Yang, 1 is Yin.
@@ -171,18 +410,18 @@ class SajuLogic:
         # My me_pol calculation: gan_idx % 2 == 0. 0(Gap) is + (Yang). So Even=Yang=True.
         # Spec array: 0 for Yang. So if val==0 -> True (Yang).
         
-        zhi_pol_map = [1, 1, 0, 1, 0, 0, 1, 1, 0, 1, 0, 0]
-        
+        # 지지 음양표는 모듈 상수 ZHI_POLARITY (위 spec 배열, 0=양)
+
         for key in ['year', 'month', 'day', 'hour']:
             # Gan
-            target_gan_elem = elem_map[pillars[key]['gan_element']]
+            target_gan_elem = ELEMENT_INDEX[pillars[key]['gan_element']]
             target_gan_pol = (pillars[key]['gan_idx'] % 2 == 0) # True(Yang) if even
             gan_god = self._determine_god(me_elem_idx, target_gan_elem, me_pol, target_gan_pol)
             
             # Zhi
-            target_zhi_elem = elem_map[pillars[key]['zhi_element']]
+            target_zhi_elem = ELEMENT_INDEX[pillars[key]['zhi_element']]
             # Use spec map: 0->Yang(True), 1->Yin(False)
-            target_zhi_is_yang = (zhi_pol_map[pillars[key]['zhi_idx']] == 0)
+            target_zhi_is_yang = (ZHI_POLARITY[pillars[key]['zhi_idx']] == 0)
             zhi_god = self._determine_god(me_elem_idx, target_zhi_elem, me_pol, target_zhi_is_yang)
             
             ten_gods[key] = {'gan': gan_god, 'zhi': zhi_god}
@@ -194,30 +433,18 @@ class SajuLogic:
     def _get_daewoon_advice(self, day_master_gan_idx, daewoon_gan_idx):
         # Determine god of daewoon stem relative to master
         # Recalculate god
-        elem_map = {'wood':0, 'fire':1, 'earth':2, 'metal':3, 'water':4}
-        me_elem = elem_map[self.STEM_OHAENG[day_master_gan_idx]]
+        me_elem = ELEMENT_INDEX[self.STEM_OHAENG[day_master_gan_idx]]
         me_pol = (day_master_gan_idx % 2 == 0)
         
-        target_elem = elem_map[self.STEM_OHAENG[daewoon_gan_idx]]
+        target_elem = ELEMENT_INDEX[self.STEM_OHAENG[daewoon_gan_idx]]
         target_pol = (daewoon_gan_idx % 2 == 0)
         
         god = self._determine_god(me_elem, target_elem, me_pol, target_pol)
         
-        advices = {
-            '비견': "나와 뜻을 같이하는 동료나 경쟁자가 나타나는 시기입니다. 협력을 통해 성취를 이룰 수 있으나, 독단적인 결정은 피하는 것이 좋습니다.",
-            '겁재': "강한 경쟁 심리가 발동하거나 재물 운용에 주의가 필요한 시기입니다. 겉으로는 화려해 보일 수 있으나 내실을 다지는 지혜가 필요합니다.",
-            '식신': "나의 재능과 기술을 마음껏 발휘하는 시기입니다. 자연스러운 의식주 안정이 따르며, 창의적인 활동이 큰 성과를 거둘 수 있습니다.",
-            '상관': "변화를 추구하고 자신을 표현하려는 욕구가 강해집니다. 뛰어난 언변과 재치로 인정받을 수 있으나, 구설수를 조심해야 합니다.",
-            '편재': "큰 재물을 다루거나 사업적인 기회가 찾아오는 시기입니다. 활동 무대가 넓어지며 역동적인 성과를 기대할 수 있습니다.",
-            '정재': "안정적인 수입과 재물 축적이 이루어지는 시기입니다. 꼼꼼하고 성실한 태도로 인정을 받으며, 가정의 안정이 찾아옵니다.",
-            '편관': "강한 책임감과 리더십을 발휘해야 하는 시기입니다. 난관이 있을 수 있으나 이를 극복하면 큰 명예와 권위를 얻게 됩니다.",
-            '정관': "명예와 승진, 합격운이 따르는 시기입니다. 원칙을 준수하고 반듯한 생활을 함으로써 사회적 신용이 높아집니다.",
-            '편인': "특수한 기술이나 철학, 종교적인 분야에 관심이 깊어집니다. 남들이 보지 못하는 이면을 꿰뚫어보는 직관력이 발달합니다.",
-            '정인': "학문 탐구와 문서운이 좋은 시기입니다. 귀인의 도움을 받거나 자격증 취득, 계약 성사 등 긍정적인 결실이 있습니다."
-        }
-        return f"[{god}] {advices.get(god, '')}"
+        return f"[{god}] {DAEWOON_ADVICES.get(god, '')}"
 
-    def calculate_daewoon_list(self, year_gan_idx, month_gan_idx, month_zhi_idx, gender, day_num, day_master_gan_idx):
+    def _daewoon_start(self, year_gan_idx, gender, day_num):
+        # (진행 방향, 첫 대운 나이)
         # 1. Direction
         is_yang_year = (year_gan_idx % 2 == 0)
         is_male = (gender == 'male')
@@ -225,11 +452,15 @@ class SajuLogic:
             step = 1 # Forward
         else:
             step = -1 # Backward
-            
-        daewoon = []
+
         # Start age: day digit. If 0 -> 10. Spec: (day % 10) or 10
         start_age_seed = (day_num % 10)
         if start_age_seed == 0: start_age_seed = 10
+        return step, start_age_seed
+
+    def calculate_daewoon_list(self, year_gan_idx, month_gan_idx, month_zhi_idx, gender, day_num, day_master_gan_idx):
+        step, start_age_seed = self._daewoon_start(year_gan_idx, gender, day_num)
+        daewoon = []
         
         for i in range(8):
             current_gan_idx = (month_gan_idx + step * (i+1)) % 10
@@ -253,7 +484,225 @@ class SajuLogic:
             
         return daewoon
 
+    GUNGHAP_BASE = 45
+    GUNGHAP_ELEMENT_MAX = 20
+
+    def gunghap_element_points(self, combined):
+        # 두 원국을 합친 오행 개수(16글자)가 고를수록 높다 (0~20).
+        # 불균형 = Σ|5 * 개수 - 16| (0~128). 정수 연산만 쓰므로 numpy 배열(마지막 축 = 오행)에도 그대로 쓴다.
+        imbalance = abs(5 * np.asarray(combined, dtype=np.int16) - 16).sum(axis=-1)
+        return (self.GUNGHAP_ELEMENT_MAX * (128 - imbalance) + 64) // 128
+
+    def get_compatibility(self, pillars_a, pillars_b):
+        # 두 원국(get_gan_zhi 형식)의 궁합 점수 (대략 25~95, 높을수록 좋음)와 항목별 내역.
+        # 일간끼리의 천간 관계, 일지끼리 / 년지(띠)끼리의 합·충, 합친 오행의 균형을 본다.
+        a_day, b_day = pillars_a['day'], pillars_b['day']
+        stem = int(self.GUNGHAP_STEM_POINTS[a_day['gan_idx'], b_day['gan_idx']])
+        day_rel = int(self.GUNGHAP_BRANCH_RELATION[a_day['zhi_idx'], b_day['zhi_idx']])
+        year_rel = int(self.GUNGHAP_BRANCH_RELATION[pillars_a['year']['zhi_idx'], pillars_b['year']['zhi_idx']])
+        dist_a = self.get_ohaeng_distribution(pillars_a)
+        dist_b = self.get_ohaeng_distribution(pillars_b)
+        elements = int(self.gunghap_element_points([dist_a[k] + dist_b[k] for k in self.OHAENG_KEYS]))
+        points = {
+            'day_stem': stem,
+            'day_branch': int(self.GUNGHAP_DAY_BRANCH_POINTS[a_day['zhi_idx'], b_day['zhi_idx']]),
+            'year_branch': int(self.GUNGHAP_YEAR_BRANCH_POINTS[pillars_a['year']['zhi_idx'], pillars_b['year']['zhi_idx']]),
+            'elements': elements
+        }
+        return {
+            'score': self.GUNGHAP_BASE + sum(points.values()),
+            'points': points,
+            'relations': {
+                'day_stem': '천간합' if stem == 15 else {0: '비화', 5: '상생', -5: '상극'}[stem],
+                'day_branch': self.GUNGHAP_BRANCH_NAMES[day_rel],
+                'year_branch': self.GUNGHAP_BRANCH_NAMES[year_rel]
+            }
+        }
+
+    def _get_month_index(self):
+        # 절기표의 절입 구간(절 → 다음 절)마다 (시작 분, 끝 분, 년주, 월주 60갑자). 1900 소한 ~ 2100 동지, 약 2,400개.
+        if self._month_index is None:
+            table = jeolgi.get_table()
+            terms = table['array']
+            starts = terms[0::2].astype(np.int64)
+            ends = np.append(terms[2::2], terms[-1]).astype(np.int64)  # 마지막(대설) 구간은 표 끝(동지)에서 자른다
+            j = np.arange(len(starts))
+            term = 2 * j % 24
+            year_cycle = (table['first_year'] + j // 12 - (term < 2) - 4) % 60
+            branch = np.array(jeolgi.TERM_MONTH_BRANCH, dtype=np.int32)[term]
+            stem = self.MONTH_STEM_TABLE[year_cycle * 13 + np.where(branch == 0, 12, branch)]
+            month_cycle = np.array(CYCLE_INDEX, dtype=np.int32)[stem * 12 + branch]
+            self._month_index = {'starts': starts, 'ends': ends, 'year': year_cycle.astype(np.int8),
+                                 'month': month_cycle.astype(np.int8)}
+        return self._month_index
+
+    def find_birth_datetimes(self, pillars, start=None, end=None, limit=None):
+        # 주어진 원국(일부만 있어도 됨)이 나오는 출생 시각 구간 목록 [(시작, 끝), ...] (한국 표준시 datetime, 끝은 포함 안 함).
+        #   pillars: {'year' | 'month' | 'day' | 'hour': {'gan_idx', 'zhi_idx'}} 중 아는 기둥만 (get_gan_zhi 형식)
+        #   start, end: 찾을 범위 (기본: 절기표 전체 1900-01-06 ~ 2100-12-21)
+        # 전수 조사 대신 각 주기의 산술 구조를 쓴다.
+        #   년/월주: 절입 구간 색인(약 2,400개)에서 일치하는 구간만 고른다 (월주는 5년마다 되풀이)
+        #   일주: (54 + 2000-01-01 부터 일수) % 60 이므로 60일 간격의 등차수열
+        #   시주: 시지 → 하루 안의 2시간 창 (자시는 00시와 23시 두 창), 시간은 일간으로 정해지므로 가능한 일간을 좁힌다
+        # 결과는 구간 순서대로이며 이어진 구간은 합친다. 없는 간지(천간/지지 음양 불일치)면 ValueError.
+        cycles = {}
+        for key in ('year', 'month', 'day', 'hour'):
+            if pillars.get(key) is not None:
+                index = CYCLE_INDEX[pillars[key]['gan_idx'] * 12 + pillars[key]['zhi_idx']]
+                if index < 0:
+                    raise ValueError(f"invalid {key} pillar")
+                cycles[key] = index
+        month_index = self._get_month_index()
+        starts, ends = month_index['starts'], month_index['ends']
+        lo = starts[0] if start is None else max(starts[0], jeolgi.to_minutes(start.year, start.month, start.day,
+                                                                              start.hour, start.minute))
+        hi = ends[-1] if end is None else min(ends[-1], jeolgi.to_minutes(end.year, end.month, end.day,
+                                                                          end.hour, end.minute))
+        mask = (ends > lo) & (starts < hi)
+        if 'year' in cycles:
+            mask &= month_index['year'] == cycles['year']
+        if 'month' in cycles:
+            mask &= month_index['month'] == cycles['month']
+        starts, ends = _merge_ranges(np.maximum(starts[mask], lo), np.minimum(ends[mask], hi))
+
+        if 'day' in cycles or 'hour' in cycles:
+            day_cycles = np.array([cycles['day']] if 'day' in cycles else range(60))
+            if 'hour' in cycles:
+                # 일상기시법: 시간 = (일간별 자시 천간 + 시지) % 10 → 맞는 일간만 남긴다
+                branch = cycles['hour'] % 12
+                hour_stem = self.HOUR_STEM_TABLE[day_cycles * 24 + (2 * branch if branch else 0)]
+                day_cycles = day_cycles[hour_stem == cycles['hour'] % 10]
+                windows = [(0, 60), (1380, 1440)] if branch == 0 else [((2 * branch - 1) * 60, (2 * branch + 1) * 60)]
+            else:
+                windows = [(0, 1440)]
+            # 한국 표준시 날짜 번호 n (1900-01-01 = 0) 의 일주 = (54 + n - 36524) % 60, 그날은 [n * 1440 - 540, ...) 분
+            offset = jeolgi.KST_OFFSET_MIN
+            first_day = (starts[0] + offset) // 1440 if len(starts) else 0
+            last_day = (ends[-1] + offset) // 1440 if len(ends) else -1
+            days = [np.arange(first_day + (cycle - 54 + 36524 - first_day) % 60, last_day + 1, 60)
+                    for cycle in day_cycles]
+            days = np.sort(np.concatenate(days)) if days else np.empty(0, dtype=np.int64)
+            win_lo = (days[:, None] * 1440 - offset + np.array([w[0] for w in windows])).ravel()
+            win_hi = (days[:, None] * 1440 - offset + np.array([w[1] for w in windows])).ravel()
+            # 맞는 절입 구간들은 서로 한 달 이상 떨어져 있으므로 하루 안의 창은 많아야 한 구간과 겹친다.
+            k = np.searchsorted(starts, win_hi) - 1
+            inside = k >= 0
+            k = np.where(inside, k, 0)
+            clipped_lo = np.maximum(win_lo, starts[k]) if len(starts) else win_lo
+            clipped_hi = np.minimum(win_hi, ends[k]) if len(ends) else win_hi
+            keep = inside & (clipped_lo < clipped_hi)
+            starts, ends = _merge_ranges(clipped_lo[keep], clipped_hi[keep])
+
+        if limit is not None:
+            starts, ends = starts[:limit], ends[:limit]
+        return [(jeolgi.from_minutes(a), jeolgi.from_minutes(b)) for a, b in zip(starts.tolist(), ends.tolist())]
+
+    def _luck_pillars(self, day_master_gan_idx):
+        # 60갑자 인덱스 → 운(運) 기둥 dict (간지, 오행, 일간 기준 십성). 일간별로 한 번만 만든다.
+        table = self._luck_pillar_cache.get(day_master_gan_idx)
+        if table is None:
+            me_elem = ELEMENT_INDEX[self.STEM_OHAENG[day_master_gan_idx]]
+            me_pol = (day_master_gan_idx % 2 == 0)
+            stem_gods = [self._determine_god(me_elem, ELEMENT_INDEX[self.STEM_OHAENG[s]], me_pol, s % 2 == 0)
+                         for s in range(10)]
+            branch_gods = [self._determine_god(me_elem, ELEMENT_INDEX[self.BRANCH_OHAENG[b]], me_pol,
+                                               ZHI_POLARITY[b] == 0)
+                           for b in range(12)]
+            table = tuple(dict(PILLAR_DICTS[i], ten_god={'gan': stem_gods[i % 10], 'zhi': branch_gods[i % 12]})
+                          for i in range(60))
+            self._luck_pillar_cache[day_master_gan_idx] = table
+        return table
+
+    def iter_luck_timeline(self, pillars, gender, birth_year, start, end, granularity='month', day_num=4):
+        # 대운(decade) / 세운(year) / 월운(month) 타임라인을 [start, end) 와 겹치는 기간만 차례로 만들어 내보낸다.
+        # 생성기이므로 소비한 만큼만 계산하며, 구간 밖의 기간은 만들지 않는다.
+        #   start, end: 한국 표준시 datetime. 기간 경계는 절입 시각이다 (월운: 12절, 세운: 입춘).
+        #   대운은 calculate_daewoon_list 와 같은 규칙(방향, 첫 대운 나이 = day_num 끝자리)으로,
+        #   한국 나이(birth_year 기준)로 시작 나이가 되는 해의 입춘부터 10년씩이다.
+        #   day_num 은 interpret() 의 user_info['day'] 와 같은 값 (기본 4).
+        # 항목: start, end ('YYYY-MM-DDTHH:MM'), age(한국 나이), decade(첫 대운 전이면 None), year, month, term.
+        # 세운 단위에는 month/term 이, 대운 단위에는 year/month/term 이 없다 (대운 단위의 age 는 대운 시작 나이).
+        # 간지 dict 는 항목 사이에 공유되므로 읽기 전용으로 다룰 것. 절기표(1900~2100년) 범위 밖이면 ValueError.
+        if granularity not in self.LUCK_GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(self.LUCK_GRANULARITIES)}")
+        table = jeolgi.get_table()
+        terms = table['view']
+        last = len(terms) - 1
+        first_year = table['first_year']
+        end_min = jeolgi.to_minutes(end.year, end.month, end.day, end.hour, end.minute)
+        i = jeolgi.find_term(jeolgi.to_minutes(start.year, start.month, start.day, start.hour, start.minute))
+        if i is None:
+            raise ValueError("start is outside the jeolgi table (1900~2100)")
+
+        luck = self._luck_pillars(pillars['day']['gan_idx'])
+        step, seed = self._daewoon_start(pillars['year']['gan_idx'], gender, day_num)
+        natal_month = CYCLE_INDEX[pillars['month']['gan_idx'] * 12 + pillars['month']['zhi_idx']]
+
+        def stamp(index):
+            return jeolgi.from_minutes(terms[index]).isoformat(timespec='minutes')
+
+        def decade(age):
+            if age < seed:
+                return None
+            k = (age - seed) // 10
+            return dict(luck[(natal_month + step * (k + 1)) % 60], age=seed + 10 * k)
+
+        if granularity == 'decade':
+            # k 번째 대운은 (birth_year + seed + 10k - 1) 년 입춘부터. 표 앞쪽에서 잘리는 대운은 건너뛴다.
+            year_offset, term = divmod(i, 24)
+            age = first_year + year_offset - (1 if term < 2 else 0) - birth_year + 1
+            k = max(0, (age - seed) // 10)
+            while True:
+                first = (birth_year + seed + 10 * k - 1 - first_year) * 24 + 2
+                if first >= 0:
+                    if first + 240 > last or terms[first] >= end_min:
+                        return
+                    yield {'start': stamp(first), 'end': stamp(first + 240), 'age': seed + 10 * k,
+                           'decade': decade(seed + 10 * k)}
+                k += 1
+
+        # 월운은 절(짝수 번호 절기), 세운은 입춘(번호 2)에서 시작하도록 맞춘다.
+        span = 2 if granularity == 'month' else 24
+        i -= (i % 2) if granularity == 'month' else (i - 2) % 24
+        if i < 0:
+            i += span
+        begin = None
+        while i + span <= last and terms[i] < end_min:
+            year_offset, term = divmod(i, 24)
+            saju_year = first_year + year_offset - (1 if term < 2 else 0)
+            year_cycle = (saju_year - 4) % 60
+            age = saju_year - birth_year + 1
+            # 앞 기간의 끝이 다음 기간의 시작이므로 시각 문자열은 경계마다 한 번만 만든다.
+            begin, finish = begin or stamp(i), stamp(i + span)
+            item = {'start': begin, 'end': finish, 'age': age, 'decade': decade(age), 'year': luck[year_cycle]}
+            if granularity == 'month':
+                branch = jeolgi.TERM_MONTH_BRANCH[term]
+                stem = self.MONTH_STEM_TABLE[year_cycle * 13 + (branch or 12)]
+                item['month'] = luck[CYCLE_INDEX[stem * 12 + branch]]
+                item['term'] = jeolgi.term_name(term)
+            yield item
+            begin = finish
+            i += span
+
     def interpret(self, pillars, ohaeng, user_info):
+        # 날짜와 무관한 해석은 (원국 인덱스, 성별, 일) 키로 캐시된 _interpret_core 결과를 쓰고,
+        # 오늘의 운세만 따로 붙인다. ohaeng 은 원국으로 정해지는 값(get_ohaeng_distribution)이므로 키에 넣지 않는다.
+        # 캐시된 해석은 호출 간에 공유되므로 호출자가 덮어쓰는 최상위 키, gmhs 각 시기, today_luck 만 복사해서 돌려준다.
+        # (ten_gods, daewoon, ohaeng_analysis 는 읽기 전용으로 다룰 것)
+        key = tuple(pillars[k][f] for k in ['year', 'month', 'day', 'hour'] for f in ['gan_idx', 'zhi_idx'])
+        core = self._interpret_core_cached(key, user_info['gender'], user_info.get('day', 4))
+        result = dict(core)
+        result['gmhs'] = {period: dict(block) for period, block in core['gmhs'].items()}
+        result['today_luck'] = self.get_today_fortune_cached(pillars['day']['gan_idx'], user_info['gender'])
+        return result
+
+    def _interpret_core(self, key, gender, day):
+        # key: (년간, 년지, 월간, 월지, 일간, 일지, 시간, 시지) 인덱스. 결과는 캐시되므로 날짜에 의존하면 안 된다.
+        pillars = {p_key: self._make_pillar(key[i * 2], key[i * 2 + 1])
+                   for i, p_key in enumerate(['year', 'month', 'day', 'hour'])}
+        ohaeng = self.get_ohaeng_distribution(pillars)
+        user_info = {'gender': gender, 'day': day}
+
         # 1. Ten Gods
         ten_gods = self._get_all_sip_seong(pillars)
         
@@ -334,18 +783,13 @@ class SajuLogic:
             'balance_text': "오행이 골고루 분포되어 있어 안정적인 삶을 기대할 수 있습니다." # Placeholder logic
         }
 
-        # Today's Luck (Simple Rotation based on DayGan vs Date?)
-        # Logic says: `get_today_fortune(day_master_element, gender)`
-        # I need today's element. I'll calc today.
-        today_fortune = self.get_today_fortune(pillars['day']['gan_idx'], user_info['gender'])
-
+        # Today's Luck 은 날짜에 따라 바뀌므로 interpret() 에서 따로 붙인다 (get_today_fortune_cached)
         return {
             'core': core,
             'advice': advice,
             'wealth': wealth,
             'love': love,
             'career': "직업운 분석 텍스트입니다.", # Placeholder
-            'today_luck': today_fortune,
             'gmhs': gmhs,
             'ohaeng_analysis': ohaeng_analysis,
             'daewoon': daewoon_list,
@@ -353,19 +797,7 @@ class SajuLogic:
         }
 
     def _get_core_trait(self, master_gan):
-        traits = {
-            '갑': "🌲 곧게 뻗은 소나무 (갑목)\n리더십이 강하고 추진력이 뛰어나며, 한번 결심하면 굽히지 않는 강직한 성품입니다.",
-            '을': "🌿 강인한 생명력의 꽃 (을목)\n유연하고 적응력이 뛰어나며, 어떠한 환경에서도 살아남는 끈기와 생활력이 강합니다.",
-            '병': "☀️ 세상을 비추는 태양 (병화)\n열정적이고 화려하며, 숨김없는 솔직함으로 주변 사람들에게 활력을 불어넣는 리더입니다.",
-            '정': "🕯️ 은근하게 타오르는 촛불 (정화)\n따뜻하고 섬세하며, 남을 배려하는 헌신적인 마음과 예리한 통찰력을 겸비했습니다.",
-            '무': "⛰️ 묵직한 태산 (무토)\n믿음직스럽고 포용력이 넓으며, 신용을 중시하여 주변 사람들로부터 깊은 신뢰를 받습니다.",
-            '기': "🌱 비옥한 텃밭 (기토)\n실속 있고 현실적이며, 어머니와 같은 포용력으로 인재를 기르고 결실을 맺는 능력이 있습니다.",
-            '경': "🪨 단단한 원석 (경금)\n의리가 강하고 결단력이 있으며, 공과 사가 분명하여 혁명적인 변화를 이끌어내는 힘이 있습니다.",
-            '신': "💎 반짝이는 보석 (신금)\n섬세하고 예리하며, 남다른 미적 감각과 자존심으로 자신만의 분야에서 빛을 발합니다.",
-            '임': "🌊 드넓은 바다 (임수)\n지혜롭고 유연하며, 깊은 속내와 포용력으로 세상을 넓게 바라보는 통찰력이 있습니다.",
-            '계': "🌧️ 촉촉한 단비 (계수)\n총명하고 감수성이 풍부하며, 상황에 따라 변신하는 지혜와 부드러운 카리스마가 있습니다."
-        }
-        return traits.get(master_gan, "알 수 없음")
+        return CORE_TRAITS.get(master_gan, "알 수 없음")
 
     def _get_detailed_advice(self, dist):
         max_elem = max(dist, key=dist.get)
@@ -380,10 +812,60 @@ class SajuLogic:
     def _get_love_text(self, dist, gender):
         return "💘 **애정운**: 진실된 마음으로 다다가면 좋은 인연을 만날 수 있습니다. 상대방을 배려하는 마음이 중요합니다."
         
-    def get_today_fortune(self, day_master_gan_idx, gender):
+    def get_today_fortune_cached(self, day_master_gan_idx, gender):
+        # 오늘의 운세는 날짜와 일간으로만 정해지므로 (성별 무관) 하루에 일간별로 한 번만 계산한다.
+        now = datetime.datetime.now()
+        with self._today_lock:
+            if self._today_date != now.date():
+                self._today_date = now.date()
+                self._today_cache = {}
+            fortune = self._today_cache.get(day_master_gan_idx)
+            if fortune is None:
+                self._today_misses += 1
+                fortune = self.get_today_fortune(day_master_gan_idx, gender, now)
+                self._today_cache[day_master_gan_idx] = fortune
+            else:
+                self._today_hits += 1
+        return dict(fortune)
+
+    def get_daily_fortunes(self, date):
+        # 그날의 일간별(10가지) 오늘의 운세 목록. 인덱스 = 일간. 성별과 무관하다 (daily_fortune.py 일괄 발송용)
+        now = datetime.datetime.combine(date, datetime.time())
+        return [self.get_today_fortune(day_master, 'male', now) for day_master in range(10)]
+
+    def interpret_cache_stats(self):
+        info = self._interpret_core_cached.cache_info()
+        total = info.hits + info.misses
+        with self._today_lock:
+            today = {
+                'date': self._today_date.isoformat() if self._today_date else None,
+                'entries': len(self._today_cache),
+                'hits': self._today_hits,
+                'misses': self._today_misses
+            }
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': round(info.hits / total, 4) if total else 0.0,
+            'entries': info.currsize,
+            'max_entries': info.maxsize,
+            'today_luck': today
+        }
+
+    def prewarm_interpret_cache(self, births):
+        # births: (year, month, day, hour, minute, gender) 목록. 해당 원국의 해석을 미리 캐시에 넣는다.
+        # 반환값: 처리한 건수
+        count = 0
+        for year, month, day, hour, minute, gender in births:
+            pillars = self.get_gan_zhi(year, month, day, hour, minute)
+            self.interpret(pillars, self.get_ohaeng_distribution(pillars), {'gender': gender})
+            count += 1
+        return count
+
+    def get_today_fortune(self, day_master_gan_idx, gender, now=None):
         # Calc today GAN from Date?
         # Just use a simple calc based on current date for variation.
-        now = datetime.datetime.now()
+        now = now or datetime.datetime.now()
         # Reference: 2000-01-01 was Mu-O (Gan Idx 4)
         ref = datetime.datetime(2000,1,1)
         diff = (now - ref).days
@@ -412,18 +894,18 @@ class SajuLogic:
         
         rel_diff = (today_elem_idx - me_elem_idx) % 5
         
-        fortunes = {
-            0: {"title": "🤝 어깨를 나란히 하는 날", "desc": "주변 사람들과 협력하면 좋은 성과가 있습니다. 친구나 동료와의 만남이 즐거운 하루입니다."},
-            1: {"title": "🎨 재능이 꽃피는 날", "desc": "창의력이 솟아나고 표현력이 좋아지는 날입니다. 새로운 아이디어를 내거나 취미 생활을 즐겨보세요."},
-            2: {"title": "💰 결실을 맺는 날", "desc": "노력한 만큼 보상이 따르는 날입니다. 금전적인 이득이나 뜻밖의 선물이 있을 수 있습니다."},
-            3: {"title": "👑 명예가 드높은 날", "desc": "책임감 있는 행동으로 인정받는 하루입니다. 직장에서 칭찬을 듣거나 승진의 기운이 있습니다."},
-            4: {"title": "📚 귀인의 도움이 있는 날", "desc": "마음이 편안하고 문서운이 좋은 날입니다. 윗사람의 도움을 받거나 배움의 즐거움을 느낄 수 있습니다."}
-        }
-        
-        base = fortunes[rel_diff]
+        title, desc = TODAY_FORTUNES[rel_diff]
         return {
             'date': today_title,
             'pillar': pillar_str,
-            'title': base['title'],
-            'desc': base['desc']
+            'title': title,
+            'desc': desc
         }
+
+
+def _merge_ranges(starts, ends):
+    # 정렬된 [시작, 끝) 구간들 중 맞닿은 것을 합친다.
+    if len(starts) < 2:
+        return starts, ends
+    breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+    return starts[np.r_[0, breaks]], ends[np.r_[breaks - 1, len(ends) - 1]]
@@ -0,0 +1,198 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 합치기 없이 스레드 간에만 동작
+    fcntl = None
+
+import metrics
+
+# 동일 AI 분석 요청 합치기 (single-flight)
+#
+# 같은 입력(analysis_cache.make_cache_key)으로 동시에 들어온 AI 분석 요청 중 첫 요청(leader)만
+# LLM 을 호출하고, 나머지는 그 결과를 기다려 함께 받는다.
+# - 같은 프로세스: leader 가 끝날 때 Future 로 결과를 나눠 준다 (스레드는 acquire, asyncio 는 acquire_async).
+# - 다른 gunicorn 워커: leader 가 LOCK_DIR/<키>.lock 에 flock 을 잡고 있는 동안 다른 워커는 기다렸다가,
+#   잠금을 얻은 뒤 recheck()(공유 SQLite 캐시 조회)로 결과를 확인한다. 결과가 없으면(실패, 캐시 꺼짐 등)
+#   직접 leader 가 되어 호출한다.
+#
+#   flight = coalescer.acquire(key, recheck=cache_get)
+#   if not flight.leader:
+#       return flight.result
+#   try:
+#       result = ...LLM 호출...
+#   finally:
+#       coalescer.release(flight, result)
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'flight')
+
+
+class Flight:
+    __slots__ = ('key', 'leader', 'result', 'future', 'lock_fd')
+
+    def __init__(self, key, leader, result=None, future=None, lock_fd=None):
+        self.key = key
+        self.leader = leader
+        self.result = result
+        self.future = future
+        self.lock_fd = lock_fd
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=DEFAULT_DIR, wait_timeout=180.0, poll_interval=0.05):
+        self.lock_dir = lock_dir if fcntl else None
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # 키 → 진행 중인 호출의 결과를 받을 Future (스레드와 asyncio 양쪽에서 기다릴 수 있다)
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced_local = 0
+        self.coalesced_remote = 0
+        self.lock_timeouts = 0
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        # AI_COALESCE=0 이면 합치지 않는다 (None 반환). AI_COALESCE_DIR='' 이면 프로세스 간 합치기를 끈다.
+        if os.getenv('AI_COALESCE', '1') == '0':
+            return None
+        return cls(lock_dir=os.getenv('AI_COALESCE_DIR', DEFAULT_DIR),
+                   wait_timeout=float(os.getenv('AI_COALESCE_TIMEOUT', 180)))
+
+    def acquire(self, key, recheck=None):
+        # leader 이면 Flight.leader=True 로 돌려주며, 호출자는 끝난 뒤 반드시 release() 해야 한다.
+        # 아니면 다른 호출의 결과(Flight.result, 실패했으면 None)를 기다렸다가 돌려준다.
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                result = future.result(self.wait_timeout)
+            except concurrent.futures.TimeoutError:
+                print(f"AI 요청 합치기 대기 시간 초과: {key[:12]}")
+                result = None
+            return self._follow(key, result, 'local')
+
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        while True:
+            lock_fd, busy = self._try_lock(key)
+            if not busy:
+                break
+            waited = True
+            if time.monotonic() >= deadline:
+                self._count('lock_timeouts')
+                break
+            time.sleep(self.poll_interval)
+        # 다른 워커가 같은 요청을 처리하고 있었다. 공유 저장소에 결과가 있으면 그것을 쓴다.
+        result = recheck() if waited and recheck is not None else None
+        return self._lead(key, future, lock_fd, result)
+
+    async def acquire_async(self, key, recheck=None):
+        # acquire 의 asyncio 버전. 기다리는 동안 이벤트 루프나 실행기 스레드를 막지 않는다.
+        # recheck 는 블로킹 함수여도 되며 스레드에서 실행한다.
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.wait_timeout)
+            except asyncio.TimeoutError:
+                print(f"AI 요청 합치기 대기 시간 초과: {key[:12]}")
+                result = None
+            return self._follow(key, result, 'local')
+
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        while True:
+            lock_fd, busy = self._try_lock(key)
+            if not busy:
+                break
+            waited = True
+            if time.monotonic() >= deadline:
+                self._count('lock_timeouts')
+                break
+            await asyncio.sleep(self.poll_interval)
+        result = await asyncio.to_thread(recheck) if waited and recheck is not None else None
+        return self._lead(key, future, lock_fd, result)
+
+    def release(self, flight, result):
+        if not flight.leader:
+            return
+        self._unlock_file(flight.key, flight.lock_fd)
+        self._publish(flight.key, flight.future, result)
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = concurrent.futures.Future()
+            return future, True
+
+    def _lead(self, key, future, lock_fd, remote_result):
+        if remote_result is not None:
+            self._unlock_file(key, lock_fd)
+            self._publish(key, future, remote_result)
+            return self._follow(key, remote_result, 'remote')
+        self._count('leaders')
+        metrics.inc('saju_ai_leaders_total')
+        return Flight(key, True, future=future, lock_fd=lock_fd)
+
+    def _follow(self, key, result, scope):
+        self._count(f'coalesced_{scope}')
+        metrics.inc('saju_ai_coalesced_total', scope=scope)
+        return Flight(key, False, result)
+
+    def _publish(self, key, future, result):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        future.set_result(result)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _try_lock(self, key):
+        # 키별 잠금 파일에 flock 을 시도한다. 반환값: (파일 디스크립터 또는 None, 다른 프로세스가 잡고 있는지)
+        if not self.lock_dir:
+            return None, False
+        path = os.path.join(self.lock_dir, f'{key}.lock')
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None, True
+            # 잠금을 잡기 전에 이전 leader 가 파일을 지웠으면 새 파일로 다시 시도한다.
+            try:
+                same_file = os.stat(path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                same_file = False
+            if same_file:
+                return fd, False
+            os.close(fd)
+
+    def _unlock_file(self, key, fd):
+        if fd is None:
+            return
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(os.path.join(self.lock_dir, f'{key}.lock'))
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'coalesced_local': self.coalesced_local,
+                'coalesced_remote': self.coalesced_remote,
+                'lock_timeouts': self.lock_timeouts,
+                'in_flight': len(self._calls),
+                'cross_process': self.lock_dir is not None
+            }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 저장소 최상위 모듈(saju_logic, resilience 등)을 바로 가져올 수 있게 한다.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
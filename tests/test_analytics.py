@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+import analytics
+from gunghap import GENDER_CODES
+from saju_logic import OHAENG_KEYS, TEN_GOD_ORDER, SajuLogic
+
+
+def test_convert_skips_years_outside_birth_column(tmp_path):
+    path = str(tmp_path / 'births.bin')
+    lines = ['birth_date,birth_time,gender',
+             '1990-05-15,10:30,male',
+             '5983-01-01,00:00,female',
+             '5984-01-01,00:00,female',
+             '9999-12-31,23:59,male',
+             '2000-02-30,00:00,male']
+    written, skipped = analytics.convert(iter(lines), 'csv', path)
+    assert (written, skipped) == (2, 3)
+    columns = analytics.open_births(path)
+    assert columns['count'] == 2
+    assert columns['births'].tolist() == [analytics.to_birth_minutes(1990, 5, 15, 10, 30),
+                                          analytics.to_birth_minutes(5983, 1, 1, 0, 0)]
+    assert columns['genders'].tolist() == [0, 1]
+
+
+def test_writer_rejects_out_of_range_block_without_corrupting_file(tmp_path):
+    path = str(tmp_path / 'births.bin')
+    with analytics.BirthsWriter(path) as writer:
+        writer.write([0, 1], [0, 1])
+        with pytest.raises(ValueError):
+            writer.write([2, analytics.BIRTH_MAX + 1], [0, 1])
+    columns = analytics.open_births(path)
+    assert columns['count'] == 2
+    assert columns['births'].tolist() == [0, 1]
+
+
+def _scalar_aggregates(births, genders, cohort_years):
+    # get_gan_zhi / get_ohaeng_distribution / _get_all_sip_seong / _daewoon_start 로 한 건씩 집계한다.
+    saju = SajuLogic(interpret_cache_size=0)
+    expected = analytics.Aggregates(cohort_years)
+    expected.records = len(births)
+    ohaeng = {}
+    gender_names = {code: name for name, code in GENDER_CODES.items()}
+    for birth, gender in zip(births, genders):
+        year, month, day, hour, minute = (int(v) for v in analytics.civil_from_minutes(birth))
+        if year < 1:
+            expected.skipped += 1
+            continue
+        pillars = saju.get_gan_zhi(year, month, day, hour, minute)
+        dist = saju.get_ohaeng_distribution(pillars)
+        hist = ohaeng.setdefault(year // cohort_years, np.zeros((5, 9), dtype=np.int64))
+        for e, key in enumerate(OHAENG_KEYS):
+            hist[e, dist[key]] += 1
+        stem = pillars['day']['gan_idx']
+        expected.day_masters[stem] += 1
+        for key, gods in saju._get_all_sip_seong(pillars).items():
+            for part in ('gan', 'zhi'):
+                if not (key == 'day' and part == 'gan'):
+                    expected.ten_gods[stem, TEN_GOD_ORDER.index(gods[part])] += 1
+        if gender not in gender_names:
+            expected.unknown_gender += 1
+            continue
+        step, _ = saju._daewoon_start(pillars['year']['gan_idx'], gender_names[gender], day)
+        expected.daewoon[gender, 0 if step == 1 else 1] += 1
+    first, last = min(ohaeng), max(ohaeng)
+    expected.cohort_first = first
+    expected.ohaeng = np.zeros((last - first + 1, 5, 9), dtype=np.int64)
+    for cohort, hist in ohaeng.items():
+        expected.ohaeng[cohort - first] = hist
+    return expected.to_dict()
+
+
+@pytest.fixture(scope='module')
+def births_file(tmp_path_factory):
+    rng = np.random.default_rng(23)
+    count = 5000
+    births = rng.integers(analytics.to_birth_minutes(1850, 1, 1, 0, 0),
+                          analytics.to_birth_minutes(2150, 12, 31, 23, 59), count)
+    # 1년 이전(건너뜀)과 큰 연도
+    births[:3] = [analytics.BIRTH_MIN, analytics.to_birth_minutes(5000, 6, 1, 12, 0), analytics.BIRTH_MAX]
+    genders = rng.choice(np.array([0, 1, analytics.UNKNOWN_GENDER], dtype=np.int8), count, p=[0.45, 0.45, 0.1])
+    path = str(tmp_path_factory.mktemp('analytics') / 'births.bin')
+    analytics.write_births(path, births, genders)
+    return path, births, genders
+
+
+@pytest.mark.parametrize('cohort_years', [1, 10])
+def test_aggregates_match_scalar_path(births_file, cohort_years):
+    path, births, genders = births_file
+    total, _ = analytics.run(path, workers=1, chunk_rows=777, cohort_years=cohort_years, progress_interval=0)
+    assert total.to_dict() == _scalar_aggregates(births, genders, cohort_years)
+
+
+def test_aggregates_independent_of_workers_and_chunks(births_file):
+    path, _, _ = births_file
+    single, _ = analytics.run(path, workers=1, chunk_rows=5000, progress_interval=0)
+    pooled, _ = analytics.run(path, workers=2, chunk_rows=333, max_pending=3, progress_interval=0)
+    assert pooled.to_dict() == single.to_dict()
@@ -0,0 +1,123 @@
+import json
+import random
+import sqlite3
+
+import pytest
+
+import daily_fortune
+
+DATE = '2024-05-01'
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _users(count):
+    rng = random.Random(11)
+    rows = []
+    for i in range(count):
+        date = f'{rng.randint(1940, 2010)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        if i % 37 == 0:
+            date = '2001-02-30'
+        rows.append((f'u{i}', rng.choice(['김민준', '이서연', 'Kim, "J"', '']), date))
+    return rows
+
+
+def _write_input(tmp_path, fmt, rows):
+    if fmt == 'csv':
+        path = tmp_path / 'users.csv'
+        lines = ['id,name,birth_date'] + [f'{i},"{n.replace(chr(34), chr(34) * 2)}",{d}' for i, n, d in rows]
+        lines.insert(50, 'broken')
+    elif fmt == 'ndjson':
+        path = tmp_path / 'users.ndjson'
+        lines = [json.dumps({'id': i, 'name': n, 'birth_date': d}, ensure_ascii=False) for i, n, d in rows]
+        lines.insert(50, '{not json')
+    else:
+        path = tmp_path / 'users.db'
+        with sqlite3.connect(path) as conn:
+            conn.execute('CREATE TABLE users (id TEXT, name TEXT, birth_date TEXT)')
+            conn.executemany('INSERT INTO users VALUES (?, ?, ?)', rows)
+        return ['--sqlite', str(path)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return [str(path)]
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(daily_fortune, 'BLOCK_BYTES', 256)
+    monkeypatch.setattr(daily_fortune, 'BLOCK_ROWS', 7)
+
+
+def _run(source, output, *extra):
+    return daily_fortune.main(source + ['-o', str(output), '--date', DATE, '--checkpoint-every', '10',
+                                        '--progress-interval', '1000', *extra])
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson', 'sqlite'])
+@pytest.mark.parametrize('crash_at', [1, 3, 6, 11])
+def test_resume_after_interrupt_is_byte_identical(tmp_path, monkeypatch, small_blocks, fmt, crash_at):
+    source = _write_input(tmp_path, fmt, _users(300))
+    reference = tmp_path / 'reference.ndjson'
+    assert _run(source, reference) == 0
+
+    output = tmp_path / 'fortunes.ndjson'
+    render_block = daily_fortune.render_block
+    calls = []
+
+    def crashing(*args):
+        calls.append(1)
+        if len(calls) == crash_at:
+            raise Interrupted()
+        return render_block(*args)
+
+    monkeypatch.setattr(daily_fortune, 'render_block', crashing)
+    with pytest.raises(Interrupted):
+        _run(source, output)
+    monkeypatch.setattr(daily_fortune, 'render_block', render_block)
+
+    assert _run(source, output) == 0
+    assert output.read_bytes() == reference.read_bytes()
+    state = json.loads((tmp_path / 'fortunes.ndjson.ckpt').read_text())
+    assert state['done'] and state['output_bytes'] == len(reference.read_bytes())
+    # 완료된 체크포인트가 있으면 다시 쓰지 않는다.
+    assert _run(source, output) == 0
+    assert output.read_bytes() == reference.read_bytes()
+
+
+def test_resume_truncates_lines_written_after_last_checkpoint(tmp_path, monkeypatch, small_blocks):
+    source = _write_input(tmp_path, 'csv', _users(300))
+    reference = tmp_path / 'reference.ndjson'
+    _run(source, reference)
+    output = tmp_path / 'fortunes.ndjson'
+    render_block = daily_fortune.render_block
+    calls = []
+
+    def crashing(*args):
+        calls.append(1)
+        if len(calls) == 6:
+            raise Interrupted()
+        return render_block(*args)
+
+    monkeypatch.setattr(daily_fortune, 'render_block', crashing)
+    with pytest.raises(Interrupted):
+        _run(source, output, '--checkpoint-every', '25')
+    monkeypatch.setattr(daily_fortune, 'render_block', render_block)
+    state = json.loads((tmp_path / 'fortunes.ndjson.ckpt').read_text())
+    assert output.stat().st_size > state['output_bytes'] > 0
+
+    _run(source, output)
+    assert output.read_bytes() == reference.read_bytes()
+
+
+def test_output_lines(tmp_path, small_blocks):
+    rows = _users(100)
+    source = _write_input(tmp_path, 'ndjson', rows)
+    output = tmp_path / 'fortunes.ndjson'
+    _run(source, output)
+    lines = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    valid = [row for row in rows if row[2] != '2001-02-30']
+    assert [(line['id'], line['name']) for line in lines] == [(i, n) for i, n, _ in valid]
+    assert {line['day'] for line in lines} == {DATE}
+    state = json.loads((tmp_path / 'fortunes.ndjson.ckpt').read_text())
+    assert (state['written'], state['skipped']) == (len(valid), len(rows) - len(valid) + 1)
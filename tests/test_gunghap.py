@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+import pytest
+
+from chart import Chart, pack_batch
+from gunghap import CompatibilityIndex
+from saju_logic import SajuLogic
+
+SIZE = 2000
+
+
+@pytest.fixture(scope='module')
+def population():
+    saju = SajuLogic(interpret_cache_size=0)
+    rng = np.random.default_rng(7)
+    years = rng.integers(1930, 2020, SIZE)
+    months = rng.integers(1, 13, SIZE)
+    days = rng.integers(1, 29, SIZE)
+    hours = rng.integers(0, 24, SIZE)
+    minutes = rng.integers(0, 60, SIZE)
+    codes = pack_batch(saju.get_gan_zhi_batch(years, months, days, hours, minutes))
+    genders = rng.integers(0, 2, SIZE).astype(np.int8)
+    charts = [Chart(int(code)).to_dict() for code in codes]
+    return saju, codes, genders, charts
+
+
+def _expected(saju, query, charts, genders, k, gender=None, exclude=()):
+    # get_compatibility 로 전부 계산해 정렬한 상위 k (점수 내림차순, 같은 점수는 행 번호 순)
+    wanted = {'male': 0, 'female': 1}.get(gender)
+    scored = [(-saju.get_compatibility(query, chart)['score'], row) for row, chart in enumerate(charts)
+              if row not in exclude and (wanted is None or genders[row] == wanted)]
+    scored.sort()
+    return [row for _, row in scored[:k]], [-score for score, _ in scored[:k]]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scores_match_get_compatibility(population, seed):
+    saju, codes, _, charts = population
+    query = charts[seed * 97]
+    index = CompatibilityIndex(codes, saju=saju)
+    expected = [saju.get_compatibility(query, chart)['score'] for chart in charts]
+    assert index.scores(Chart.from_pillars(query)).tolist() == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('gender', [None, 'male', 'female'])
+def test_top_k_matches_sorted_scores(population, seed, gender):
+    saju, codes, genders, charts = population
+    rng = random.Random(seed)
+    query = charts[rng.randrange(SIZE)]
+    exclude = set(rng.sample(range(SIZE), 20))
+    k = rng.choice([1, 10, 100, 500])
+    index = CompatibilityIndex(codes, genders, saju=saju)
+    rows, scores = index.top_k(query, k=k, gender=gender, exclude=exclude)
+    assert (rows.tolist(), scores.tolist()) == _expected(saju, query, charts, genders, k, gender, exclude)
+
+
+def test_top_k_workers_match_single_thread(population, monkeypatch):
+    saju, codes, genders, charts = population
+    # 작은 모집단에서도 여러 구간으로 나뉘게 한다.
+    monkeypatch.setattr('gunghap.BUILD_CHUNK', 256)
+    index = CompatibilityIndex(codes, genders, saju=saju)
+    query = charts[3]
+    single = index.top_k(query, k=50, gender='female', exclude={1, 2, 3})
+    multi = index.top_k(query, k=50, gender='female', exclude={1, 2, 3}, workers=4)
+    assert [a.tolist() for a in single] == [a.tolist() for a in multi]
+
+
+def test_top_k_larger_than_population(population):
+    saju, codes, _, charts = population
+    index = CompatibilityIndex(codes[:30], saju=saju)
+    rows, scores = index.top_k(charts[0], k=100)
+    assert sorted(rows.tolist()) == list(range(30))
+    assert scores.tolist() == _expected(saju, charts[0], charts[:30], None, 100)[1]
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import app
+import asgi
+
+FORM = {'name': '홍길동', 'gender': 'male', 'birth_date': '1990-05-15', 'birth_time': '10:30'}
+
+
+def _analysis():
+    yield {'type': 'delta', 'path': 'total_summary', 'text': '첫'}
+    yield {'type': 'delta', 'path': 'total_summary', 'text': '문단'}
+    yield {'type': 'section', 'path': 'total_summary', 'value': '첫문단'}
+    yield {'type': 'delta', 'path': 'daewoon_trend', 'text': '흐름'}
+    yield {'type': 'section', 'path': 'daewoon_trend', 'value': '흐름'}
+    yield {'type': 'done', 'result': {'total_summary': '첫문단', 'daewoon_trend': '흐름'}}
+
+
+def _finished_job():
+    job = app.jobs.submit(app.build_chart(FORM), _analysis)
+    while not app.jobs.wait_events(job, job['next_event'], timeout=1)[1]:
+        pass
+    return job
+
+
+def _parse(stream):
+    events = []
+    for block in stream.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if fields:
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+EXPECTED = [('2', 'section', {'path': 'total_summary', 'value': '첫문단'}),
+            ('4', 'section', {'path': 'daewoon_trend', 'value': '흐름'}),
+            (None, 'end', {'status': 'done', 'ai_ready': True})]
+
+
+def test_flask_events_after_compaction():
+    job = _finished_job()
+    client = app.app.test_client()
+    assert _parse(client.get(f'/api/jobs/{job["id"]}/events').get_data(as_text=True)) == EXPECTED
+    resumed = client.get(f'/api/jobs/{job["id"]}/events', headers={'Last-Event-ID': '2'})
+    assert _parse(resumed.get_data(as_text=True)) == EXPECTED[1:]
+
+
+def _asgi_get(path, headers=()):
+    sent = []
+
+    async def run():
+        async def receive():
+            await asyncio.sleep(5)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers), 'query_string': b''}
+        await asyncio.wait_for(asgi.application(scope, receive, send), 5)
+
+    asyncio.run(run())
+    return sent
+
+
+def test_asgi_events_match_flask():
+    job = _finished_job()
+    sent = _asgi_get(f'/api/jobs/{job["id"]}/events')
+    assert sent[0]['status'] == 200
+    assert (b'content-type', b'text/event-stream; charset=utf-8') in sent[0]['headers']
+    body = b''.join(m.get('body', b'') for m in sent[1:]).decode('utf-8')
+    assert _parse(body) == EXPECTED
+    sent = _asgi_get(f'/api/jobs/{job["id"]}/events', headers=[(b'last-event-id', b'2')])
+    assert _parse(b''.join(m.get('body', b'') for m in sent[1:]).decode('utf-8')) == EXPECTED[1:]
+
+
+def test_asgi_events_stream_while_running():
+    gate = threading.Event()
+
+    def slow():
+        yield {'type': 'section', 'path': 'total_summary', 'value': '먼저'}
+        gate.wait(5)
+        yield {'type': 'done', 'result': {'total_summary': '먼저'}}
+
+    job = app.jobs.submit(app.build_chart(FORM), slow)
+    threading.Timer(0.3, gate.set).start()
+    sent = _asgi_get(f'/api/jobs/{job["id"]}/events')
+    events = _parse(b''.join(m.get('body', b'') for m in sent[1:]).decode('utf-8'))
+    assert events == [('0', 'section', {'path': 'total_summary', 'value': '먼저'}),
+                      (None, 'end', {'status': 'done', 'ai_ready': True})]
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_pending_result_page_polls_without_streaming(monkeypatch, stream):
+    monkeypatch.setattr(app, 'AI_STREAM', stream)
+    gate = threading.Event()
+
+    def pending():
+        gate.wait(5)
+        return None
+
+    job = app.jobs.submit(app.build_chart(FORM), pending)
+    try:
+        html = app.app.test_client().get(f'/result/{job["id"]}').get_data(as_text=True)
+    finally:
+        gate.set()
+    assert ('EventSource' in html) == stream
+    assert (f"fetch('/api/jobs/{job['id']}')" in html) == (not stream)
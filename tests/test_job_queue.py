@@ -0,0 +1,54 @@
+import threading
+
+from job_queue import JobQueue
+
+
+def _stream(gate):
+    yield {'type': 'delta', 'path': 'a', 'text': '가'}
+    yield {'type': 'delta', 'path': 'b', 'text': '다'}
+    yield {'type': 'delta', 'path': 'a', 'text': '나'}
+    gate.wait(5)
+    yield {'type': 'section', 'path': 'a', 'value': '가나'}
+    yield {'type': 'done', 'result': {'a': '가나'}}
+
+
+def _wait_done(queue, job):
+    while not queue.wait_events(job, job['next_event'], timeout=1)[1]:
+        pass
+
+
+def test_section_compacts_its_deltas_and_keeps_event_ids():
+    queue = JobQueue(max_workers=1)
+    gate = threading.Event()
+    job = queue.submit({}, _stream, gate)
+    while job['next_event'] < 3:
+        queue.wait_events(job, job['next_event'], timeout=1)
+    events, _ = queue.wait_events(job, 0, timeout=0)
+    assert [seq for seq, _ in events] == [0, 1, 2]
+    gate.set()
+    _wait_done(queue, job)
+
+    events, finished = queue.wait_events(job, 0, timeout=0)
+    assert finished
+    assert events == [(1, {'type': 'delta', 'path': 'b', 'text': '다'}),
+                      (3, {'type': 'section', 'path': 'a', 'value': '가나'})]
+    # 지워진 번호 뒤에서 재연결해도 이후 이벤트만 받는다.
+    assert queue.wait_events(job, 2, timeout=0)[0] == [events[1]]
+    assert queue.wait_events(job, 4, timeout=0) == ([], True)
+    assert job['result'] == {'a': '가나'}
+
+
+def test_events_stay_bounded_by_sections():
+    def many():
+        for i in range(20):
+            path = f's{i}'
+            for _ in range(200):
+                yield {'type': 'delta', 'path': path, 'text': '.'}
+            yield {'type': 'section', 'path': path, 'value': '.' * 200}
+        yield {'type': 'done', 'result': {}}
+
+    queue = JobQueue(max_workers=1)
+    job = queue.submit({}, many)
+    _wait_done(queue, job)
+    assert job['next_event'] == 20 * 201
+    assert [e['type'] for _, e in job['events']] == ['section'] * 20
@@ -0,0 +1,96 @@
+import json
+import random
+
+import pytest
+
+from json_stream import IncrementalJSONParser, JSONStreamError
+
+ALPHABET = 'ab가나다 "\\/\n\t\u0001é😀𝄞'
+
+
+def _random_string(rng):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+
+
+def _random_value(rng, depth=0):
+    kind = rng.choice(['object', 'array'] if depth == 0 else
+                      ['object', 'array', 'string', 'string', 'int', 'float', 'literal'] if depth < 4 else
+                      ['string', 'int', 'float', 'literal'])
+    if kind == 'object':
+        return {f'k{i}{rng.choice("xy가")}': _random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+    if kind == 'array':
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    if kind == 'string':
+        return _random_string(rng)
+    if kind == 'int':
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if kind == 'float':
+        return rng.uniform(-1e3, 1e3)
+    return rng.choice([True, False, None])
+
+
+def _leaves(value, path=()):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _leaves(item, path + (key,))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _leaves(item, path + (i,))
+    else:
+        yield '.'.join(map(str, path)), value
+
+
+def _chunks(rng, text):
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.choice([1, 1, 2, 3, 7, 20])
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+def _parse(chunks):
+    parser = IncrementalJSONParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.close())
+    return events
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_chunked_events_match_document(seed):
+    rng = random.Random(seed)
+    doc = _random_value(rng)
+    text = json.dumps(doc, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+    events = _parse(_chunks(rng, text))
+
+    values = [(path, value) for kind, path, value in events if kind == 'value']
+    assert values == list(_leaves(doc))
+    assert values == [(path, value) for kind, path, value in _parse([text]) if kind == 'value']
+    # delta 를 이어 붙이면 완성된 문자열 값의 앞부분이다.
+    final = dict(values)
+    deltas = {}
+    for kind, path, value in events:
+        if kind == 'delta':
+            deltas[path] = deltas.get(path, '') + value
+    for path, text_so_far in deltas.items():
+        assert final[path].startswith(text_so_far)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_truncated_document_is_incomplete(seed):
+    rng = random.Random(seed)
+    text = json.dumps(_random_value(rng), ensure_ascii=False)
+    cut = rng.randint(0, len(text) - 1)
+    parser = IncrementalJSONParser()
+    with pytest.raises(JSONStreamError):
+        for chunk in _chunks(rng, text[:cut]):
+            parser.feed(chunk)
+        parser.close()
+
+
+@pytest.mark.parametrize('text', ['{"a" 1}', '{"a": tru}', '[1,,2]', '{"a": 1} x', '{"a": "\\q"}', '{1: 2}'])
+def test_malformed_documents_raise(text):
+    with pytest.raises(JSONStreamError):
+        _parse(_chunks(random.Random(0), text))
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, LatencyPolicy
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def _half_open(breaker):
+    # 열림 → reset_timeout 경과 (다음 allow() 가 반쯤 열림으로 바꾼다)
+    _trip(breaker)
+    time.sleep(breaker.reset_timeout + 0.01)
+
+
+def _hedging_policy(breaker, deadline=0.2):
+    policy = LatencyPolicy(deadline=deadline, hedge=True, hedge_min_samples=1, hedge_min_delay=0.02,
+                           breaker=breaker)
+    policy._latencies['single'].append(0.02)
+    return policy
+
+
+def test_breaker_opens_after_threshold_and_short_circuits():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    policy = LatencyPolicy(breaker=breaker)
+    assert policy.short_circuit()
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda timeout: 'never')
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    _half_open(breaker)
+    assert not breaker.is_open()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    _half_open(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+
+
+def test_probe_past_deadline_reopens_then_recovers():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    policy = _hedging_policy(breaker)
+    _half_open(breaker)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda timeout: time.sleep(1))
+    # 헤징 대기는 마감에서 끝나고, 시험 요청 자리를 쥔 채 반쯤 열림에 남지 않는다.
+    assert time.monotonic() - started < 0.5
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(breaker.reset_timeout + 0.01)
+    assert policy.call(lambda timeout: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_past_deadline_async_reopens_then_recovers():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    policy = _hedging_policy(breaker)
+    _half_open(breaker)
+
+    async def slow(timeout):
+        await asyncio.sleep(1)
+
+    async def ok(timeout):
+        return 'ok'
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(policy.call_async(slow))
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(breaker.reset_timeout + 0.01)
+    assert asyncio.run(policy.call_async(ok)) == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_expired_deadline_does_not_take_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    policy = LatencyPolicy(breaker=breaker)
+    _half_open(breaker)
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda timeout: 'never', deadline=Deadline(0))
+    assert policy.call(lambda timeout: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_errors_do_not_trip_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    policy = LatencyPolicy(breaker=breaker)
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            policy.call(lambda timeout: json.loads('{'))
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_non_retryable_probe_failure_releases_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    policy = LatencyPolicy(breaker=breaker)
+    _half_open(breaker)
+    with pytest.raises(ValueError):
+        policy.call(lambda timeout: json.loads('{'))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.call(lambda timeout: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,60 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import jeolgi
+from analytics import civil_from_minutes
+from saju_logic import SajuLogic
+
+START = datetime.datetime(1999, 11, 20, 7, 13)
+END = datetime.datetime(2001, 2, 10, 17, 41)
+
+
+@pytest.fixture(scope='module')
+def brute():
+    # START ~ END 의 모든 분에 대한 원국 (get_gan_zhi_batch)
+    saju = SajuLogic(interpret_cache_size=0)
+    minutes = np.arange(jeolgi.to_minutes(START.year, START.month, START.day, START.hour, START.minute),
+                        jeolgi.to_minutes(END.year, END.month, END.day, END.hour, END.minute))
+    pillars = saju.get_gan_zhi_batch(*civil_from_minutes(minutes + jeolgi.KST_OFFSET_MIN))
+    return saju, minutes, pillars
+
+
+def _ranges(minutes, match):
+    # 일치하는 분들을 이어진 구간 [(시작, 끝)] 으로 묶는다 (끝은 포함 안 함).
+    edges = np.diff(np.concatenate([[0], match.astype(np.int8), [0]]))
+    starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return [(jeolgi.from_minutes(minutes[a]), jeolgi.from_minutes(minutes[b - 1] + 1)) for a, b in zip(starts, stops)]
+
+
+def _query(pillars, row, keys):
+    return {key: {'gan_idx': int(pillars[key]['gan_idx'][row]), 'zhi_idx': int(pillars[key]['zhi_idx'][row])}
+            for key in keys}
+
+
+@pytest.mark.parametrize('keys', [('year', 'month', 'day', 'hour'), ('year', 'month'), ('month',), ('day',),
+                                  ('hour',), ('day', 'hour'), ('month', 'hour'), ('year', 'day')])
+@pytest.mark.parametrize('row', [0, 123457, 301234, 599999])
+def test_matches_brute_force(brute, keys, row):
+    saju, minutes, pillars = brute
+    query = _query(pillars, row, keys)
+    match = np.ones(len(minutes), dtype=bool)
+    for key, value in query.items():
+        match &= (pillars[key]['gan_idx'] == value['gan_idx']) & (pillars[key]['zhi_idx'] == value['zhi_idx'])
+    expected = _ranges(minutes, match)
+    assert expected
+    assert saju.find_birth_datetimes(query, START, END) == expected
+
+
+def test_limit_and_no_match(brute):
+    saju, minutes, pillars = brute
+    query = _query(pillars, 0, ('day',))
+    assert saju.find_birth_datetimes(query, START, END, limit=2) == saju.find_birth_datetimes(query, START, END)[:2]
+    # 경자년(1960)은 START ~ END 에 없다.
+    assert saju.find_birth_datetimes({'year': {'gan_idx': 6, 'zhi_idx': 0}}, START, END) == []
+
+
+def test_invalid_pillar_raises():
+    with pytest.raises(ValueError):
+        SajuLogic(interpret_cache_size=0).find_birth_datetimes({'day': {'gan_idx': 0, 'zhi_idx': 1}})
@@ -0,0 +1,72 @@
+import datetime
+import random
+
+import numpy as np
+import pytest
+
+import jeolgi
+from saju_logic import OHAENG_KEYS, SajuLogic
+
+KEYS = ('year', 'month', 'day', 'hour')
+
+
+@pytest.fixture(scope='module')
+def saju():
+    return SajuLogic(interpret_cache_size=0)
+
+
+def _random_births(rng, count, first_year, last_year):
+    first = datetime.date(first_year, 1, 1).toordinal()
+    last = datetime.date(last_year, 12, 31).toordinal()
+    rows = []
+    for _ in range(count):
+        date = datetime.date.fromordinal(rng.randint(first, last))
+        rows.append((date.year, date.month, date.day, rng.randint(0, 23), rng.randint(0, 59)))
+    return rows
+
+
+def _term_boundary_births(rng, count):
+    # 절기가 바뀌는 분 앞뒤 (월주/년주가 바뀌는 곳)
+    size = (jeolgi.LAST_YEAR - jeolgi.FIRST_YEAR + 1) * 24
+    rows = []
+    for index in rng.sample(range(1, size - 1), count):
+        for offset in (-1, 0, 1):
+            t = jeolgi.from_minutes(jeolgi.term_minutes(index) + offset)
+            rows.append((t.year, t.month, t.day, t.hour, t.minute))
+    return rows
+
+
+def _check(saju, rows):
+    columns = [np.array(column) for column in zip(*rows)]
+    batch = saju.get_gan_zhi_batch(*columns)
+    counts = saju.get_ohaeng_distribution_batch(batch)
+    for i, row in enumerate(rows):
+        pillars = saju.get_gan_zhi(*row)
+        for key in KEYS:
+            assert (batch[key]['gan_idx'][i], batch[key]['zhi_idx'][i]) == \
+                (pillars[key]['gan_idx'], pillars[key]['zhi_idx']), (row, key)
+        dist = saju.get_ohaeng_distribution(pillars)
+        assert counts[i].tolist() == [dist[key] for key in OHAENG_KEYS], row
+
+
+def test_batch_matches_scalar_inside_term_table(saju):
+    _check(saju, _random_births(random.Random(1), 3000, jeolgi.FIRST_YEAR, jeolgi.LAST_YEAR))
+
+
+def test_batch_matches_scalar_at_term_boundaries(saju):
+    _check(saju, _term_boundary_births(random.Random(2), 500))
+
+
+def test_batch_matches_scalar_outside_term_table(saju):
+    rng = random.Random(3)
+    rows = _random_births(rng, 1000, 1, jeolgi.FIRST_YEAR - 1) + _random_births(rng, 1000, jeolgi.LAST_YEAR + 1, 9999)
+    rows += [(1, 1, 1, 0, 0), (9999, 12, 31, 23, 59), (2000, 2, 29, 23, 30), (1900, 1, 1, 0, 0)]
+    _check(saju, rows)
+
+
+@pytest.mark.parametrize('row', [(2023, 2, 29, 0, 0), (2000, 13, 1, 0, 0), (2000, 4, 31, 0, 0), (0, 1, 1, 0, 0)])
+def test_batch_rejects_invalid_dates_like_scalar(saju, row):
+    with pytest.raises(ValueError):
+        saju.get_gan_zhi(*row)
+    with pytest.raises(ValueError):
+        saju.get_gan_zhi_batch(*[np.array(column) for column in zip((1990, 5, 15, 10, 30), row)])
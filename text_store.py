@@ -0,0 +1,167 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from chart import STEMS, cycle_index
+
+# 사전 생성 해설문 저장소 (data/texts.bin)
+#
+# AI 섹션 중 개인화가 필요 없는 것은 작은 이산 입력(일간, 대운 천간, 기둥 간지 등)으로만 정해지므로,
+# 가능한 조합을 모두 미리 생성해(pregenerate.py) 이 파일에 저장하고 런타임에는 mmap 으로 읽기만 한다.
+# 실시간 LLM 호출은 개인화된 total_summary 에만 쓴다.
+#
+# 파일 구조: 24바이트 헤더 + uint32[slots + 1] 오프셋 + UTF-8 본문
+#   헤더 = magic(b'TXTS'), format(u16), reserved(u16), version(u32), slots(u32), layout_crc(u32), body_size(u32)
+#   슬롯 i 의 글 = 본문[offset[i]:offset[i + 1]] (길이 0 이면 아직 생성되지 않음)
+#   슬롯 번호 = 이름공간 시작 번호 + 이름공간 안의 인덱스 (NAMESPACES 순서대로 빈틈없이 배치)
+# version 은 글 내용의 판(TEXTS_VERSION)으로, 달라지면 런타임은 파일을 쓰지 않는다 (AI 결과 캐시 키에도 들어감).
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'texts.bin')
+FORMAT_VERSION = 1
+# 생성 프롬프트나 조합 규칙을 바꾸면 올리고 pregenerate.py 로 다시 만든다.
+TEXTS_VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')
+
+# (AI 섹션 이름, 조합 수). 인덱스 규칙은 slot_keys() 참고.
+NAMESPACES = (
+    ('personality_deep', 10),   # 일간
+    ('social_analysis', 10),    # 일간
+    ('wealth_strategy', 10),    # 일간
+    ('love_romance', 20),       # 일간 * 2 + 성별(남 0, 여 1)
+    ('health_analysis', 25),    # 가장 강한 오행 * 5 + 가장 약한 오행 (같은 오행 조합은 없음)
+    ('daewoon_trend', 100),     # 일간 * 10 + 현재 대운 천간
+    ('gmhs', 240),              # 시기(년/월/일/시) * 60 + 해당 기둥 60갑자
+)
+NAMESPACE_BASE = {}
+_base = 0
+for _name, _size in NAMESPACES:
+    NAMESPACE_BASE[_name] = _base
+    _base += _size
+SLOT_COUNT = _base
+LAYOUT_CRC = zlib.crc32(repr(NAMESPACES).encode('utf-8'))
+
+ELEMENTS = ('wood', 'fire', 'earth', 'metal', 'water')
+PERIODS = ('year', 'month', 'day', 'hour')
+
+
+class TextStore:
+    def __init__(self, path=STORE_PATH):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, _, version, slots, crc, body_size = HEADER.unpack_from(self._mm, 0)
+        if magic != b'TXTS' or fmt != FORMAT_VERSION or slots != SLOT_COUNT or crc != LAYOUT_CRC:
+            raise ValueError(f"text store format mismatch: {path}")
+        self.path = path
+        self.version = version
+        self._body = HEADER.size + (slots + 1) * 4
+        if self._body + body_size > len(self._mm):
+            raise ValueError(f"text store truncated: {path}")
+        self._offsets = memoryview(self._mm)[HEADER.size:self._body].cast('I')
+        self.filled = sum(1 for slot in range(slots) if self._offsets[slot] != self._offsets[slot + 1])
+
+    def get(self, namespace, index):
+        # 글이 없으면 None
+        slot = NAMESPACE_BASE[namespace] + index
+        start, end = self._offsets[slot], self._offsets[slot + 1]
+        if start == end:
+            return None
+        return self._mm[self._body + start:self._body + end].decode('utf-8')
+
+    def texts(self):
+        # 슬롯 번호 → 글 (비어 있는 슬롯 제외). 다시 만들 때 기존 글을 이어 쓰는 데 쓴다.
+        offsets, body = self._offsets, self._body
+        return {slot: self._mm[body + offsets[slot]:body + offsets[slot + 1]].decode('utf-8')
+                for slot in range(SLOT_COUNT) if offsets[slot] != offsets[slot + 1]}
+
+    def stats(self):
+        return {'path': self.path, 'version': self.version, 'slots': SLOT_COUNT, 'filled': self.filled,
+                'bytes': len(self._mm)}
+
+
+def write_store(texts, path=STORE_PATH, version=TEXTS_VERSION):
+    # texts: 슬롯 번호 → 글. 임시 파일에 쓴 뒤 교체하므로 실행 중인 워커는 이전 파일을 계속 읽는다.
+    offsets = [0]
+    chunks = []
+    for slot in range(SLOT_COUNT):
+        raw = texts.get(slot, '').encode('utf-8')
+        chunks.append(raw)
+        offsets.append(offsets[-1] + len(raw))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(b'TXTS', FORMAT_VERSION, 0, version, SLOT_COUNT, LAYOUT_CRC, offsets[-1]))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.writelines(chunks)
+    os.replace(tmp, path)
+    return sum(1 for raw in chunks if raw)
+
+
+_store = None
+_store_lock = threading.Lock()
+_store_checked = False
+
+
+def get_store():
+    # 현재 판(TEXTS_VERSION)의 저장소가 있으면 열어서 돌려준다. 없거나 판이 다르면 None.
+    # TEXT_STORE=0 이면 쓰지 않는다. TEXT_STORE_PATH 로 경로를 바꿀 수 있다.
+    global _store, _store_checked
+    if _store_checked:
+        return _store
+    with _store_lock:
+        if not _store_checked:
+            path = os.getenv('TEXT_STORE_PATH', STORE_PATH)
+            if os.getenv('TEXT_STORE', '1') != '0' and os.path.exists(path):
+                try:
+                    store = TextStore(path)
+                    if store.version == TEXTS_VERSION:
+                        _store = store
+                    else:
+                        print(f"사전 생성 해설 판이 다릅니다 ({store.version} != {TEXTS_VERSION}): {path}")
+                except (OSError, ValueError) as e:
+                    print(f"사전 생성 해설을 열 수 없습니다: {e}")
+            _store_checked = True
+    return _store
+
+
+def slot_keys(pillars, interpretations, gender):
+    # 원국과 결정적 해석에서 이름공간별 인덱스를 구한다.
+    day_master = pillars['day']['gan_idx']
+    percentages = interpretations['ohaeng_analysis']['percentages']
+    strongest = max(ELEMENTS, key=lambda e: percentages.get(e, 0))
+    weakest = min(ELEMENTS, key=lambda e: percentages.get(e, 0))
+    daewoon_stem = STEMS.index(interpretations['daewoon'][0]['gan'])
+    keys = {
+        'personality_deep': day_master,
+        'social_analysis': day_master,
+        'wealth_strategy': day_master,
+        'love_romance': day_master * 2 + (0 if gender == 'male' else 1),
+        'health_analysis': ELEMENTS.index(strongest) * 5 + ELEMENTS.index(weakest),
+        'daewoon_trend': day_master * 10 + daewoon_stem,
+    }
+    for i, period in enumerate(PERIODS):
+        keys[f'gmhs.{period}'] = i * 60 + cycle_index(pillars[period]['gan_idx'], pillars[period]['zhi_idx'])
+    return keys
+
+
+def pregenerated_sections(pillars, interpretations, gender, store=None):
+    # 사전 생성된 글로 AI 출력과 같은 구조의 섹션(total_summary, today_luck 제외)을 만든다.
+    # 저장소가 없거나 빠진 글이 하나라도 있으면 None (이때는 기존처럼 전체를 LLM 이 쓴다).
+    store = store or get_store()
+    if store is None:
+        return None
+    sections = {'gmhs': {}}
+    for name, index in slot_keys(pillars, interpretations, gender).items():
+        namespace, _, period = name.partition('.')
+        text = store.get(namespace, index)
+        if text is None:
+            return None
+        if period:
+            sections['gmhs'][period] = text
+        else:
+            sections[name] = text
+    # 대운 글은 천간 조합으로만 만들었으므로 실제 대운 간지와 시작 나이를 앞에 붙인다.
+    first = interpretations['daewoon'][0]
+    sections['daewoon_trend'] = f"{first['age']}세 대운 ({first['gan']}{first['zhi']})\n{sections['daewoon_trend']}"
+    return sections